@@ -0,0 +1,174 @@
+from contextlib import redirect_stdout
+from time import perf_counter
+from json import dumps, loads
+import tracemalloc
+import tempfile
+import sys
+import io
+import os
+import clear_assessments as etl
+from ndjson_io import open_ndjson
+from synthetic_assessments import write_assessments
+
+SCALES = [10000, 100000, 1000000] # Assessments generated for each run
+DATA_DIR = "" # Directory where the generated inputs are kept between runs. Empty to generate them in a temporary directory
+MEASURE_MEMORY = True # Run each scale a second time under tracemalloc, to record the peak memory of each stage
+PROCESSES = 1 # PROCESSES of clear_assessments.py in the end-to-end stage. tracemalloc only sees the main process
+BENCHMARK_FILE = "" # JSON lines file to append the results to. Empty to only print them
+BASELINE_FILE = "" # Results of a previous run (e.g. an earlier BENCHMARK_FILE) to compare with. Empty to not compare
+TOLERANCE = 0.25 # Relative increase of time or peak memory over the baseline reported as a regression
+NOISE = {"seconds": 0.05, "peak_mb": 1.0} # Smaller increases are ignored, as short stages vary more than TOLERANCE between runs
+
+def run_stages(json_file: str):
+    """
+    Runs the stages of clear_assessments.py one by one on a file, in the current directory, whose
+    parent has a data directory for the outputs.
+
+    Parameters:
+        json_file (str): The input file.
+
+    Yields:
+        str: The name of each stage, once it is finished.
+    """
+    dataframe = etl.json_to_dataframe(json_file)
+    yield "json_to_dataframe"
+    etl.rename_uses(dataframe)
+    yield "rename_uses"
+    dataframe = etl.map_risk_categories(dataframe.dropna(subset=['red_list_category']))
+    yield "map_risk_categories"
+    dataframe.to_csv("../data/assessments.csv")
+    yield "assessments.csv"
+    unique_ids = list(dataframe['taxon.sis_id'].unique())
+    for column in ['use_and_trade', 'locations']:
+        etl.create_dict_uses_by_id(dataframe, column, unique_ids)
+    yield "create_dict_uses_by_id"
+    species = etl.latest_assessments(dataframe, unique_ids)
+    yield "latest_assessments"
+    etl.save_latest_assessments(species)
+    etl.create_dataframe_uses_by_id(species)
+    etl.create_dataframe_countries_by_id(species)
+    etl.create_dataframe_threats_by_id(species)
+    yield "tables.csv"
+    del dataframe, species
+    if etl.COLUMNAR_FORMAT:
+        etl.save_columnar_outputs()
+        yield "columnar"
+    if etl.DATABASE_FILE:
+        etl.save_database(etl.DATABASE_FILE)
+        yield "database"
+    etl.JSON_FILES = [json_file]
+    etl.MANIFEST_FILE = "../data/manifest.npz" # In the temporary directory, so main is a full run that also writes the manifest
+    etl.PROCESSES = PROCESSES
+    with redirect_stdout(io.StringIO()):
+        etl.main()
+    yield "main"
+
+def measure(json_file: str, memory: bool) -> dict:
+    """
+    Times the stages of clear_assessments.py, or records their peak memory.
+
+    Parameters:
+        json_file (str): The input file.
+        memory (bool): Record the peak memory of each stage with tracemalloc, instead of its time.
+
+    Returns:
+        dict: Seconds, or peak megabytes allocated, of each stage.
+    """
+    results = {}
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, "data"))
+        os.makedirs(os.path.join(directory, "work"))
+        os.chdir(os.path.join(directory, "work"))
+        if memory:
+            tracemalloc.start()
+        try:
+            start = perf_counter()
+            for stage in run_stages(os.path.abspath(os.path.join(previous_directory, json_file))):
+                if memory:
+                    results[stage] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+                    tracemalloc.reset_peak()
+                else:
+                    results[stage] = round(perf_counter() - start, 3)
+                    start = perf_counter()
+        finally:
+            if memory:
+                tracemalloc.stop()
+            os.chdir(previous_directory)
+    return results
+
+def run_scale(assessments: int, data_dir: str) -> dict:
+    """
+    Generates an input of a number of assessments, unless it was kept from a previous run, and
+    benchmarks the stages of clear_assessments.py on it.
+
+    Parameters:
+        assessments (int): Number of assessments.
+        data_dir (str): Directory of the inputs.
+
+    Returns:
+        dict: Number of records of the input, and seconds and peak megabytes of each stage.
+    """
+    json_file = os.path.join(data_dir, f"synthetic-{assessments}.json.gz")
+    if not os.path.exists(json_file):
+        partial_file = os.path.join(data_dir, f"synthetic-{assessments}.partial.json.gz") # Compressed by extension
+        write_assessments(partial_file, assessments)
+        os.replace(partial_file, json_file)
+    with open_ndjson(json_file) as file:
+        records = sum(1 for line in file)
+    seconds = measure(json_file, memory=False)
+    peak = measure(json_file, memory=True) if MEASURE_MEMORY else {}
+    return {"assessments": assessments,
+            "records": records,
+            "stages": {stage: {"seconds": seconds[stage], "peak_mb": peak.get(stage)} for stage in seconds}}
+
+def regressions(result: dict, baseline: dict) -> list:
+    """
+    Parameters:
+        result (dict): Result of run_scale.
+        baseline (dict): Result of a previous run at the same scale.
+
+    Returns:
+        list: Descriptions of the stages whose time or peak memory grew by more than TOLERANCE and NOISE.
+    """
+    found = []
+    for stage, values in result["stages"].items():
+        previous = baseline["stages"].get(stage, {})
+        for key in ["seconds", "peak_mb"]:
+            if values.get(key) is None or not previous.get(key):
+                continue
+            if values[key] > previous[key] * (1 + TOLERANCE) and values[key] - previous[key] > NOISE[key]:
+                found.append(f"{stage}: {key} {previous[key]} -> {values[key]}")
+    return found
+
+def main():
+    baselines = {}
+    if BASELINE_FILE:
+        with open(BASELINE_FILE) as file:
+            for line in file:
+                result = loads(line)
+                baselines[result["assessments"]] = result # The last result of each scale
+    found = []
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        data_dir = DATA_DIR or temporary_directory
+        os.makedirs(data_dir, exist_ok=True)
+        for assessments in SCALES:
+            result = run_scale(assessments, data_dir)
+            print(f"{assessments} assessments ({result['records']} records)")
+            print(f"  {'stage':<24} {'time (s)':>9} {'peak (MB)':>10}")
+            for stage, values in result["stages"].items():
+                peak = values["peak_mb"] if values["peak_mb"] is not None else "-"
+                print(f"  {stage:<24} {values['seconds']:>9} {peak:>10}")
+            if BENCHMARK_FILE:
+                with open(BENCHMARK_FILE, "a") as file:
+                    file.write(dumps(result))
+                    file.write("\n")
+            if assessments in baselines:
+                for regression in regressions(result, baselines[assessments]):
+                    print(f"  Regression in {regression}")
+                    found.append(regression)
+    if found:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,52 +1,121 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
+import io
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from array import array
+from glob import glob
+from hashlib import blake2b
+from heapq import merge
+from multiprocessing import Pool
+import numpy as np
 import pandas as pd
 
-# Auxiliar Functions
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "webscraping"))
+from ndjson_io import open_binary, open_ndjson
+from assessment_record import AssessmentRecord, COLUMNS, decode
 
-def create_list_of_items(dictionary: dict) -> list:
-    """
-    Converts a dictionary into a list of item pairs, where each key is paired with each of its values.
-    
-    Args:
-        dictionary (dict): A dictionary where each key maps to a list of values.
-        
-    Returns:
-        list: A list of lists, where each inner list contains a key-value pair from the dictionary.
-    """
-    rows = []
-    for key, values in dictionary.items():
-        for value in values:
-            rows.append([key, value])
-    return rows
+JSON_FILES = ['../data/assessments.json.gz'] # Assessment files, read in order as if they were one. Glob patterns are expanded, e.g. for crawler shards
+CHUNK_SIZE = 50000 # Assessments read, normalised and cleaned at once. Memory grows with this and the number of species, not the input size. 0 to read the whole file at once
+PROCESSES = 4 # Processes cleaning the assessments in parallel, each one the species of a partition. 1 to clean them in this process
+MANIFEST_FILE = '../data/manifest.npz' # Hashes of the assessments of each species in the last run. Only the species that changed since are processed again. Empty to always process all of them
+
+COLUMNAR_FORMAT = "parquet" # Also write the outputs as typed "parquet" or "feather" files, which the dashboard reads instead of the CSV files. Empty for CSV only
+
+# Types of the columnar outputs. Repeated names are stored as categories, each one once per file
+CATEGORY_COLUMNS = ['risk_category', 'taxon.scientific_name', 'taxon.kingdom_name', 'taxon.phylum_name', 'taxon.class_name',
+                    'taxon.order_name', 'taxon.family_name', 'Use', 'Country', 'Presence', 'Threat']
+COLUMN_TYPES = {'assessment_id': 'Int64', 'taxon.sis_id': 'int32', 'ID': 'int32', 'year_published': 'Int16'}
+LIST_COLUMNS = ['locations', 'use_and_trade', 'threats'] # Left out of the columnar files. Uses, countries and threats have their own tables
+
+STAR_SCHEMA = True # Also write integer coded tables to ../data/star: dimensions, dictionaries of names and facts keyed by species. Requires COLUMNAR_FORMAT
+RISK_CATEGORIES = ['NE', 'LC', 'LT', 'VU', 'EN', 'CR', 'RE', 'EW', 'EX'] # Keys of the categories, from least to most severe
+TAXONOMY_COLUMNS = ['taxon.kingdom_name', 'taxon.phylum_name', 'taxon.class_name', 'taxon.order_name', 'taxon.family_name']
+
+DATABASE_FILE = '../data/assessments.db' # Also write the outputs to an indexed SQLite database, which the dashboard queries instead of loading the tables. Empty to not write it
+# Indexes of the database, by table, for the filters and joins of the dashboard. Each one also covers the columns it reads
+DATABASE_INDEXES = {'assessments': [['taxon.sis_id', 'year_published', 'risk_category'], ['year_published', 'taxon.sis_id'],
+                                    ['taxon.scientific_name'], TAXONOMY_COLUMNS + ['taxon.scientific_name', 'taxon.sis_id']],
+                    'latest_assessments': [['taxon.sis_id']],
+                    'uses': [['ID', 'Use']],
+                    'countries': [['Country', 'ID'], ['ID', 'Country']],
+                    'threats': [['ID', 'Threat']]}
+
+SIS_ID = re.compile(r'"sis_id": (\d+)') # Species ID of a line written by json.dumps, read without decoding the line
+SIS_ID_BYTES = re.compile(SIS_ID.pattern.encode())
 
 # Reading Assessments
 
 def json_to_dataframe(json_file: str) -> pd.DataFrame:
     """
-    Reads a JSON file and converts it into a Pandas DataFrame.
+    Reads a JSON file and converts it into a Pandas DataFrame. Each line is decoded and validated by AssessmentRecord, so a malformed
+    line raises MalformedRecord.
     
     Args:
-        json_file (str): The path to the JSON file where each line is a JSON object.
+        json_file (str): The path to the JSON file where each line is a JSON object. Files ending in .gz or .zst are decompressed while reading.
         
     Returns:
         pd.DataFrame: A DataFrame containing the structured data from the JSON file.
     """
     data = []
-    with open(json_file, 'r') as file:
+    with open_ndjson(json_file) as file:
         for line in file:
-            data.append(json.loads(line))
-    dataframe = pd.json_normalize(data)
+            data.append(AssessmentRecord.row_from_json(line))
+    dataframe = pd.DataFrame.from_records(data, columns=COLUMNS)
     return dataframe
 
+def json_to_dataframes(json_files: list, chunk_size: int, partition: int = 0, partitions: int = 1, sis_ids: set = None):
+    """
+    Reads JSON files in chunks of a fixed number of assessments, converting each one into a Pandas DataFrame.
+
+    Args:
+        json_files (list): The paths to the JSON files, read in order, where each line is a JSON object. Files ending in .gz or .zst are
+            decompressed while reading.
+        chunk_size (int): Number of assessments of each chunk, 0 for a single chunk.
+        partition (int): Only assessments of species whose ID modulo partitions is partition are read.
+        partitions (int): Number of partitions of the species.
+        sis_ids (set): Only assessments of these species are read, or of all species if None.
+
+    Yields:
+        pd.DataFrame: A DataFrame for each chunk, indexed by the position of its lines in the files, as json_to_dataframe would index them.
+    """
+    data = []
+    positions = []
+    position = 0
+    chunks = 0
+    for json_file in json_files:
+        with open_ndjson(json_file) as file:
+            for line in file:
+                if partitions > 1 or sis_ids is not None:
+                    match = SIS_ID.search(line)
+                    sis_id = int(match.group(1)) if match else decode(line)["taxon"]["sis_id"]
+                    if sis_id % partitions != partition or (sis_ids is not None and sis_id not in sis_ids):
+                        position += 1
+                        continue
+                data.append(AssessmentRecord.row_from_json(line))
+                positions.append(position)
+                position += 1
+                if len(data) == chunk_size:
+                    yield pd.DataFrame.from_records(data, columns=COLUMNS).set_axis(pd.Index(positions))
+                    chunks += 1
+                    data = []
+                    positions = []
+    if data or chunks == 0:
+        yield pd.DataFrame.from_records(data, columns=COLUMNS).set_axis(pd.Index(positions, dtype=np.int64))
+
 def rename_uses(df: pd.DataFrame) -> None:
     """
     Renames and standardizes values in the 'use_and_trade' column of a DataFrame.
     
     This function processes a DataFrame to unify different terms in the 'use_and_trade' column, consolidating them into standard categories.
     Unknown or unlisted uses are labeled appropriately.
+
+    All rows are processed at once: the lists are exploded into one row per use, mapped to their category, and grouped back into lists
+    in their original order.
     
     Args:
         df (pd.DataFrame): The DataFrame containing a 'use_and_trade' column, with each entry being a list of uses.
@@ -62,26 +131,30 @@ def rename_uses(df: pd.DataFrame) -> None:
                   'Research',
                   'Handicrafts, jewellery, etc.',
                   'Wearing apparel, accessories']
-    for i in range(len(df)):
-        uses = df.iloc[i]['use_and_trade']
-        new_uses = []
-        for use in uses:
-            if use == "Unknown" and len(uses) <= 1:
-                new_uses = ["Unknown"]
-            elif use in valid_uses:
-                new_uses.append(use)
-            elif use == "Food - human" or use == "Food - animal":
-                if "Food" not in new_uses:
-                    new_uses.append("Food")
-            elif use == 'Manufacturing chemicals' or use == 'Other chemicals':
-                if 'Chemicals' not in new_uses:
-                    new_uses.append('Chemicals')
-            else:
-                if 'Others' not in new_uses:
-                    new_uses.append('Others')
-        if len(uses) == 0:
-            new_uses = ["Unknown"]
-        df.at[i, 'use_and_trade'] = new_uses
+    mapping = {use: use for use in valid_uses}
+    mapping.update({'Food - human': 'Food',
+                    'Food - animal': 'Food',
+                    'Manufacturing chemicals': 'Chemicals',
+                    'Other chemicals': 'Chemicals'})
+    grouped = ['Food', 'Chemicals', 'Others'] # Categories that appear at most once per assessment
+
+    lengths = np.fromiter((len(uses) for uses in df['use_and_trade']), dtype=np.int64, count=len(df))
+    exploded = df['use_and_trade'].explode() # Empty lists become a single NaN row
+    rows = np.repeat(np.arange(len(df)), np.maximum(lengths, 1))
+    uses = exploded.map(mapping).fillna('Others').to_numpy(dtype=object)
+    original = exploded.to_numpy(dtype=object)
+    row_lengths = lengths[rows]
+    uses[(original == "Unknown") & (row_lengths <= 1)] = "Unknown" # "Unknown" alone is kept, with other uses it counts as "Others"
+    uses[row_lengths == 0] = "Unknown"
+
+    # Keep the first occurrence of each grouped category in each row
+    uses_by_row = pd.DataFrame({'row': rows, 'use': uses})
+    keep = ~(uses_by_row.duplicated() & uses_by_row['use'].isin(grouped)).to_numpy()
+    uses, rows = uses[keep], rows[keep]
+    ends = np.cumsum(np.bincount(rows, minlength=len(df))).tolist()
+    uses = uses.tolist()
+    new_uses = [uses[start:end] for start, end in zip([0] + ends[:-1], ends)]
+    df['use_and_trade'] = pd.Series(new_uses, index=df.index, dtype=object)
         
 def map_risk_categories(dataframe: pd.DataFrame) -> pd.DataFrame:
     """
@@ -139,12 +212,14 @@ def map_risk_categories(dataframe: pd.DataFrame) -> pd.DataFrame:
     return dataframe.rename(columns={'red_list_category': 'risk_category'})
     
     
-def clean_assessments(dataframe: pd.DataFrame) -> pd.DataFrame:
+def clean_assessments(dataframe: pd.DataFrame, append: bool = False, csv_file: str = "../data/assessments.csv") -> pd.DataFrame:
     """
     Cleans and processes the assessments dataframe by standardizing data and removing invalid entries.
 
     Parameters:
         dataframe (pd.DataFrame): The dataframe containing species assessments.
+        append (bool): Append the cleaned rows to the CSV file, without header, instead of replacing it.
+        csv_file (str): The CSV file the cleaned dataframe is saved to.
 
     Returns:
         pd.DataFrame: The cleaned dataframe with updated risk categories and no missing risk data.
@@ -156,17 +231,20 @@ def clean_assessments(dataframe: pd.DataFrame) -> pd.DataFrame:
         4. Saves the cleaned dataframe to a CSV file for later use.
     
     Notes:
-        The cleaned dataframe is saved to "../data/assessments.csv".
+        The cleaned dataframe is saved to "../data/assessments.csv" by default.
     """
     rename_uses(dataframe) # Rename and Group Usages
     dataframe = dataframe.dropna(subset=['red_list_category']) # Remove Assessments without Risk Data
     dataframe = map_risk_categories(dataframe) # Clear Risk Categories
-    dataframe.to_csv("../data/assessments.csv")
+    dataframe.to_csv(csv_file, mode="a" if append else "w", header=not append)
     return dataframe
     
 def create_dict_uses_by_id(dataframe: pd.DataFrame, column: str, unique_ids: list) -> dict:
     """
     Creates a dictionary mapping each unique taxon ID to the longest list of values in a specified column.
+
+    The longest list of each species is found in a single grouped pass over the DataFrame. Among lists of the same length, the one of the
+    first assessment is kept.
     
     Args:
         dataframe (pd.DataFrame): The DataFrame containing species data and the specified column.
@@ -176,60 +254,683 @@ def create_dict_uses_by_id(dataframe: pd.DataFrame, column: str, unique_ids: lis
     Returns:
         dict: A dictionary where each key is a taxon ID, and each value is the longest list of values from the specified column.
     """
-    dict_uses_id = {}
-    for i in range(len(unique_ids)):
-        filtered_dataframe = dataframe[dataframe['taxon.sis_id'] == unique_ids[i]]
-        list_of_max_length = []
-        for j in range(len(filtered_dataframe)):
-            list_of_values = filtered_dataframe.iloc[j][column]
-            if len(list_of_values) > len(list_of_max_length):
-                list_of_max_length = list_of_values
-        dict_uses_id[unique_ids[i]] = list_of_max_length
-    return dict_uses_id
+    lengths = dataframe[column].map(len)
+    rows = lengths.groupby(dataframe['taxon.sis_id'], sort=False).idxmax() # Label of the first longest list of each species
+    longest = dict(zip(rows.index, dataframe.loc[rows.to_numpy(), column]))
+    return {i: longest.get(i, []) for i in unique_ids}
+
+def latest_assessments(dataframe: pd.DataFrame, unique_ids: list) -> pd.DataFrame:
+    """
+    Creates a table with one row per species: its most recent assessment, with the longest lists of uses and locations among all its
+    assessments. Among assessments of the same year, or lists of the same length, the first one is kept.
+
+    Args:
+        dataframe (pd.DataFrame): The cleaned DataFrame of assessments, or the rows of previous tables followed by new assessments.
+        unique_ids (list): A list of unique taxon IDs, in the order of the rows of the table.
+
+    Returns:
+        pd.DataFrame: The table, indexed by 'taxon.sis_id'.
+    """
+    years = pd.to_numeric(dataframe['year_published'], errors='coerce').fillna(-1)
+    latest = years.groupby(dataframe['taxon.sis_id'], sort=False).idxmax() # First of the most recent assessments of each species
+    species = dataframe.loc[latest.reindex(unique_ids).to_numpy()].set_index('taxon.sis_id')
+    for column in ['use_and_trade', 'locations']:
+        species[column] = pd.Series(create_dict_uses_by_id(dataframe, column, unique_ids))
+    return species
+
+def create_latest_assessments(dataframe: pd.DataFrame, unique_ids: list) -> pd.DataFrame:
+    """
+    Creates and saves the table of the most recent assessment of each species (see latest_assessments).
+
+    Args:
+        dataframe (pd.DataFrame): The cleaned DataFrame of assessments.
+        unique_ids (list): A list of unique taxon IDs, in the order of the rows of the table.
+
+    Returns:
+        pd.DataFrame: The table, indexed by 'taxon.sis_id'.
+
+    Notes:
+        The table, without the list columns, is saved to "../data/latest_assessments.csv".
+    """
+    species = latest_assessments(dataframe, unique_ids)
+    save_latest_assessments(species)
+    return species
+
+def save_latest_assessments(species: pd.DataFrame) -> None:
+    """
+    Args:
+        species (pd.DataFrame): The table of latest_assessments, saved without the list columns to "../data/latest_assessments.csv".
+    """
+    species.drop(columns=LIST_COLUMNS, errors='ignore').to_csv("../data/latest_assessments.csv")
+
+def empty_latest_assessments() -> pd.DataFrame:
+    """
+    Cleans an empty table of assessments, for inputs without any record, so the outputs are written with their headers only, as with
+    the whole file in memory.
+
+    Returns:
+        pd.DataFrame: The empty table of latest_assessments.
+    """
+    dataframe = clean_assessments(pd.DataFrame.from_records([], columns=COLUMNS))
+    return latest_assessments(dataframe, [])
+
+def process_in_chunks(json_files: list, chunk_size: int, partition: int = 0, partitions: int = 1,
+                      csv_file: str = "../data/assessments.csv", sis_ids: set = None) -> tuple:
+    """
+    Reads, cleans and saves the assessments chunk by chunk, keeping in memory only the current chunk and the table of the latest
+    assessment of each species seen so far, which is updated with each chunk.
 
-def create_dataframe_uses_by_id(dataframe: pd.DataFrame, unique_ids: list) -> None:
+    Args:
+        json_files (list): The paths to the JSON files of assessments.
+        chunk_size (int): Number of assessments of each chunk, 0 for a single chunk.
+        partition (int): Only species whose ID modulo partitions is partition are processed.
+        partitions (int): Number of partitions of the species.
+        csv_file (str): The CSV file the cleaned assessments are saved to.
+        sis_ids (set): Only these species are processed, or all species if None.
+
+    Returns:
+        tuple: The table of latest_assessments for all the assessments read, the same as with the whole file in memory, or None if
+        there are none, and a Series with the position in the files of the first cleaned assessment of each species.
+    """
+    species = None
+    first_positions = None
+    for dataframe in json_to_dataframes(json_files, chunk_size, partition, partitions, sis_ids):
+        if dataframe.empty:
+            continue
+        dataframe = clean_assessments(dataframe, append=species is not None, csv_file=csv_file)
+        positions = dataframe.index.to_series().groupby(dataframe['taxon.sis_id'].to_numpy(), sort=False).min()
+        if species is not None:
+            positions = positions[~positions.index.isin(first_positions.index)]
+            positions = pd.concat([first_positions, positions])
+            # The previous table goes first, so its rows win ties as the earlier assessments would
+            dataframe = pd.concat([species.reset_index(), dataframe], ignore_index=True)
+        first_positions = positions
+        unique_ids = list(dataframe['taxon.sis_id'].unique())
+        species = latest_assessments(dataframe, unique_ids)
+    return species, first_positions
+
+def process_partition(json_files: list, chunk_size: int, partition: int, partitions: int, directory: str) -> tuple:
+    """
+    Cleans the assessments of the species of one partition, in a worker process.
+
+    Args:
+        json_files (list): The paths to the JSON files of assessments.
+        chunk_size (int): Number of assessments of each chunk, 0 for a single chunk.
+        partition (int): Index of the partition.
+        partitions (int): Number of partitions of the species.
+        directory (str): Directory of the partial CSV file of cleaned assessments.
+
+    Returns:
+        tuple: The results of process_in_chunks for the partition, and the path of its partial CSV file.
+    """
+    csv_file = os.path.join(directory, f"assessments.{partition}.csv")
+    species, first_positions = process_in_chunks(json_files, chunk_size, partition, partitions, csv_file)
+    return species, first_positions, csv_file
+
+def merge_csv_files(csv_files: list, output: str) -> None:
+    """
+    Merges CSV files written by clean_assessments, each one sorted by its index column, into one file sorted by index. The files are
+    read by records (see csv_records), so quoted values with line breaks are kept whole.
+
+    Args:
+        csv_files (list): The paths to the CSV files.
+        output (str): The path to the merged CSV file.
+    """
+    files = [open(path, "r", newline="") for path in csv_files]
+    try:
+        records = [csv_records(file) for file in files]
+        header = None
+        for file_records in records:
+            header = next(file_records, None) or header
+        with open(output, "w", newline="") as merged:
+            merged.write(header or "")
+            for record in merge(*records, key=lambda record: int(record.split(",", 1)[0])):
+                merged.write(record)
+    finally:
+        for file in files:
+            file.close()
+
+def process_in_parallel(json_files: list, chunk_size: int, processes: int) -> pd.DataFrame:
+    """
+    Cleans the assessments with a pool of processes, each one handling the species whose ID modulo processes is its partition, so all
+    the assessments of a species are in the same process. The partial CSV files are merged by position in the input, and the partial
+    tables by first appearance of each species, so the outputs are the same as with a single process.
+
+    Args:
+        json_files (list): The paths to the JSON files of assessments.
+        chunk_size (int): Number of assessments of each chunk read by each process, 0 for a single chunk.
+        processes (int): Number of processes and partitions.
+
+    Returns:
+        pd.DataFrame: The table of latest_assessments for all the assessments.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        with Pool(processes) as pool:
+            results = pool.starmap(process_partition, [(json_files, chunk_size, i, processes, directory) for i in range(processes)])
+        results = [result for result in results if result[0] is not None] # Partitions without any species
+        if not results:
+            return empty_latest_assessments()
+        merge_csv_files([csv_file for species, first_positions, csv_file in results], "../data/assessments.csv")
+    first_positions = pd.concat([first_positions for species, first_positions, csv_file in results])
+    species = pd.concat([species for species, first_positions, csv_file in results])
+    return species.iloc[np.argsort(first_positions.reindex(species.index).to_numpy(), kind="stable")]
+
+def uses_by_id(species: pd.DataFrame) -> pd.DataFrame:
+    """
+    Args:
+        species (pd.DataFrame): The table of latest_assessments, including the 'use_and_trade' column.
+
+    Returns:
+        pd.DataFrame: The uses of each species, one per row, in the order of the table.
+    """
+    uses = species['use_and_trade'][species['use_and_trade'].map(len) > 0].explode()
+    return pd.DataFrame({"ID": uses.index, "Use": uses.to_numpy()})
+
+def countries_by_id(species: pd.DataFrame) -> pd.DataFrame:
+    """
+    Args:
+        species (pd.DataFrame): The table of latest_assessments, including the 'locations' column.
+
+    Returns:
+        pd.DataFrame: The countries of each species, one per row, in the order of the table.
+    """
+    locations = species['locations'][species['locations'].map(len) > 0].explode()
+    return pd.DataFrame({"ID": locations.index, "Country": [location['country'] for location in locations],
+                         "Presence": [location.get('presence') for location in locations]})
+
+def threats_by_id(species: pd.DataFrame) -> pd.DataFrame:
+    """
+    Args:
+        species (pd.DataFrame): The table of latest_assessments, including the 'threats' column of the latest assessments.
+
+    Returns:
+        pd.DataFrame: The threats of each species, one per row, in the order of the table.
+    """
+    threats = species['threats'][species['threats'].map(len) > 0].explode()
+    return pd.DataFrame({"ID": threats.index, "Threat": threats.to_numpy()})
+
+def create_dataframe_uses_by_id(species: pd.DataFrame) -> None:
     """
     Creates a DataFrame that maps each taxon ID to its associated uses or trades.
     
     Args:
-        dataframe (pd.DataFrame): The DataFrame containing species data, including the 'use_and_trade' column.
-        unique_ids (list): A list of unique taxon IDs to filter by.
+        species (pd.DataFrame): The table of create_latest_assessments, including the 'use_and_trade' column.
         
     Returns:
         None
     """
-    dict_uses_id = create_dict_uses_by_id(dataframe, 'use_and_trade', unique_ids)
-    rows = create_list_of_items(dict_uses_id)
-    uses_dataframe = pd.DataFrame(rows, columns=["ID", "Use"])
-    uses_dataframe.to_csv("../data/uses.csv")
+    uses_by_id(species).to_csv("../data/uses.csv")
 
-def create_dataframe_countries_by_id(dataframe: pd.DataFrame, unique_ids: list) -> None:
+def create_dataframe_countries_by_id(species: pd.DataFrame) -> None:
     """
-    Creates a DataFrame mapping each taxon ID to the countries in which it is located.
+    Creates a DataFrame mapping each taxon ID to the countries in which it is located, and its presence in each one.
     
     Args:
-        dataframe (pd.DataFrame): The DataFrame containing species data, including the 'locations' column.
-        unique_ids (list): A list of unique taxon IDs to filter by.
+        species (pd.DataFrame): The table of create_latest_assessments, including the 'locations' column.
         
     Returns:
         None
     """
-    dict_countries_id = create_dict_uses_by_id(dataframe, 'locations', unique_ids)
+    countries_by_id(species).to_csv("../data/countries.csv")
+
+def create_dataframe_threats_by_id(species: pd.DataFrame) -> None:
+    """
+    Creates a DataFrame mapping each taxon ID to the threats of its latest assessment.
+
+    Args:
+        species (pd.DataFrame): The table of create_latest_assessments, including the 'threats' column.
+
+    Returns:
+        None
+    """
+    threats_by_id(species).to_csv("../data/threats.csv")
+
+def typed_columns(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the columns of an output table to the types of its columnar file.
+
+    Args:
+        dataframe (pd.DataFrame): An output table, without list columns.
+
+    Returns:
+        pd.DataFrame: The table with the types of COLUMN_TYPES and CATEGORY_COLUMNS, and a default index.
+    """
+    dataframe = dataframe.reset_index(drop=True)
+    for column in dataframe.columns:
+        if column in COLUMN_TYPES:
+            dataframe[column] = pd.to_numeric(dataframe[column], errors='coerce').astype(COLUMN_TYPES[column])
+        elif column in CATEGORY_COLUMNS:
+            dataframe[column] = dataframe[column].astype('category')
+    return dataframe
+
+def save_columnar(dataframe: pd.DataFrame, name: str, typed: bool = True) -> None:
+    """
+    Saves an output table as a columnar file, "../data/<name>.parquet" or "../data/<name>.feather" according to COLUMNAR_FORMAT.
+
+    Args:
+        dataframe (pd.DataFrame): An output table, without list columns.
+        name (str): The name of the file, without extension.
+        typed (bool): Convert the columns with typed_columns, or keep the types of the table.
+    """
+    path = f"../data/{name}.{COLUMNAR_FORMAT}"
+    dataframe = typed_columns(dataframe) if typed else dataframe.reset_index(drop=True)
+    if COLUMNAR_FORMAT == "feather":
+        dataframe.to_feather(path)
+    else:
+        dataframe.to_parquet(path, index=False)
+
+def save_columnar_chunks(name: str) -> None:
+    """
+    Saves a CSV output as a columnar file, reading it in chunks of CHUNK_SIZE rows, so memory does not grow with its size. Each row
+    group of a Parquet file has its own categories, those of its rows. A Feather file has the same categories for all its rows, so
+    they are read first.
+
+    Args:
+        name (str): The name of the table, whose CSV file is "../data/<name>.csv". Its list columns and unnamed index are left out.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    csv_file = f"../data/{name}.csv"
+    columns = pd.read_csv(csv_file, nrows=0).columns
+    usecols = [column for column in columns if column not in LIST_COLUMNS and not column.startswith('Unnamed')]
+    chunk_size = CHUNK_SIZE or 50000
+    categories = [column for column in usecols if column in CATEGORY_COLUMNS]
+    dtype = {column: 'category' for column in categories}
+    if COLUMNAR_FORMAT == "feather" and categories:
+        values = {column: set() for column in categories}
+        for chunk in pd.read_csv(csv_file, usecols=categories, dtype=str, chunksize=chunk_size):
+            for column in categories:
+                values[column].update(chunk[column].dropna().unique())
+        dtype = {column: pd.CategoricalDtype(sorted(values[column])) for column in categories}
+    dtype.update({column: COLUMN_TYPES[column] for column in usecols if column in COLUMN_TYPES})
+
+    # The types of every chunk, whatever values it has: categories as dictionaries of strings, and text columns as strings
+    schema = pa.Schema.from_pandas(pd.read_csv(csv_file, usecols=usecols, dtype=dtype, nrows=0), preserve_index=False)
+    for i, field in enumerate(schema):
+        if field.name in categories:
+            schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), pa.string())))
+        elif pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    path = f"../data/{name}.{COLUMNAR_FORMAT}"
+    if COLUMNAR_FORMAT == "feather":
+        writer = pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression="lz4"))
+    else:
+        writer = pq.ParquetWriter(path, schema)
+    try:
+        for chunk in pd.read_csv(csv_file, usecols=usecols, dtype=dtype, chunksize=chunk_size):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        writer.close()
+
+def save_columnar_outputs() -> None:
+    """
+    Saves the CSV outputs as columnar files, without the list columns of the assessments. The CSV files are read back in chunks, as
+    they are written in chunks, by several processes, or spliced by update_outputs. The star schema is built from the tables of
+    species, which are read whole, as their size depends on the number of species rather than of assessments.
+    """
+    for name in ["assessments", "latest_assessments", "uses", "countries", "threats"]:
+        save_columnar_chunks(name)
+    if STAR_SCHEMA:
+        tables = {name: pd.read_csv(f"../data/{name}.csv", index_col=None if name == "latest_assessments" else 0)
+                  for name in ["latest_assessments", "uses", "countries", "threats"]}
+        save_star_schema(tables["latest_assessments"], tables["uses"], tables["countries"], tables["threats"])
+
+def dictionary(values: pd.Series, categories: list = None) -> tuple:
+    """
+    Encodes names as integer keys.
+
+    Args:
+        values (pd.Series): The names.
+        categories (list): The names in order of their keys, or None to number the names in alphabetical order. Names not in the
+            list get the following keys.
+
+    Returns:
+        tuple: The key of each value, as int32, -1 for missing values, and the names in order of their keys.
+    """
+    names = sorted(values.dropna().unique())
+    if categories is not None:
+        names = list(categories) + [name for name in names if name not in categories]
+    keys = pd.Categorical(values, categories=names).codes.astype(np.int32)
+    return keys, pd.Index(names)
+
+def save_star_schema(species: pd.DataFrame, uses: pd.DataFrame, countries: pd.DataFrame, threats: pd.DataFrame) -> None:
+    """
+    Saves the outputs as a star schema of integer keys, to ../data/star:
+        - species: dimension of the latest assessment of each species, keyed by 'sis_id', with the keys of its risk category and
+          taxonomy.
+        - taxonomy, risk_categories, countries, presences, uses, threats: dictionaries of names, keyed by 'key'.
+        - species_uses, species_countries, species_threats: facts, with the 'sis_id' of a species and the keys of a use, a country
+          and its presence, or a threat.
+    Keys are int32 (int8 for risk categories), -1 for missing values.
+
+    Args:
+        species (pd.DataFrame): The table of latest assessments, as saved to "../data/latest_assessments.csv".
+        uses (pd.DataFrame): The uses of each species.
+        countries (pd.DataFrame): The countries of each species, and its presence in each one.
+        threats (pd.DataFrame): The threats of each species.
+    """
+    os.makedirs("../data/star", exist_ok=True)
+    taxonomy = species[TAXONOMY_COLUMNS].drop_duplicates().sort_values(TAXONOMY_COLUMNS).reset_index(drop=True)
+    taxonomy_keys = species[TAXONOMY_COLUMNS].merge(taxonomy.reset_index(), how='left', on=TAXONOMY_COLUMNS)['index']
+    category_keys, categories = dictionary(species['risk_category'], RISK_CATEGORIES)
+    save_columnar(pd.DataFrame({'sis_id': species['taxon.sis_id'].astype(np.int32),
+                                'assessment_id': pd.to_numeric(species['assessment_id'], errors='coerce').astype('Int64'),
+                                'year_published': pd.to_numeric(species['year_published'], errors='coerce').astype('Int16'),
+                                'risk_category': category_keys.astype(np.int8),
+                                'taxonomy': taxonomy_keys.to_numpy().astype(np.int32),
+                                'scientific_name': species['taxon.scientific_name']}), "star/species", typed=False)
+    save_columnar(taxonomy.rename(columns=lambda column: column[len('taxon.'):]).rename_axis('key').reset_index()
+                  .astype({'key': np.int32}), "star/taxonomy", typed=False)
+    save_columnar(pd.DataFrame({'key': np.arange(len(categories), dtype=np.int32), 'name': categories}), "star/risk_categories", typed=False)
+
+    facts = {'uses': (uses, ['Use']), 'countries': (countries, ['Country', 'Presence']), 'threats': (threats, ['Threat'])}
+    for name, (table, columns) in facts.items():
+        fact = pd.DataFrame({'sis_id': table['ID'].astype(np.int32)})
+        for column in columns:
+            dictionary_name = 'presences' if column == 'Presence' else name
+            keys, names = dictionary(table[column])
+            fact[column.lower()] = keys
+            save_columnar(pd.DataFrame({'key': np.arange(len(names), dtype=np.int32), 'name': names}), f"star/{dictionary_name}",
+                          typed=False)
+        save_columnar(fact, f"star/species_{name}", typed=False)
+
+def save_database(path: str) -> None:
+    """
+    Saves the CSV outputs to an SQLite database, with the tables and column names of the CSV files (without the list columns of
+    the assessments) and the indexes of DATABASE_INDEXES. The CSV files are copied in chunks, so memory does not grow with their
+    size. The database is written to a temporary file that then replaces the previous one, so dashboards reading it are not
+    interrupted.
+
+    Args:
+        path (str): The path to the database file.
+    """
+    partial_file = path + ".partial"
+    if os.path.exists(partial_file):
+        os.remove(partial_file) # Left by an interrupted run
+    columns = pd.read_csv("../data/assessments.csv", nrows=0).columns
+    usecols = [column for column in columns if column not in LIST_COLUMNS and not column.startswith('Unnamed')]
+    connection = sqlite3.connect(partial_file)
+    try:
+        for name in DATABASE_INDEXES:
+            options = {'usecols': usecols} if name == "assessments" else {'index_col': None if name == "latest_assessments" else 0}
+            header = pd.read_csv(f"../data/{name}.csv", nrows=0, **options)
+            types = {column: COLUMN_TYPES[column] for column in header.columns if column in COLUMN_TYPES}
+            header.astype(types).to_sql(name, connection, index=False) # Created with the column types, even if the table is empty
+            for chunk in pd.read_csv(f"../data/{name}.csv", chunksize=CHUNK_SIZE or 50000, **options):
+                chunk.astype(types).to_sql(name, connection, if_exists='append', index=False)
+            for columns in DATABASE_INDEXES[name]:
+                index = f"{name}_{columns[0].split('.')[-1]}"
+                quoted = ", ".join(f'"{column}"' for column in columns)
+                connection.execute(f'CREATE INDEX "{index}" ON "{name}" ({quoted})')
+        connection.execute("ANALYZE") # Statistics for the query planner to choose between the indexes
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(partial_file, path)
+
+# Incremental Updates
+
+def scan_species(json_files: list) -> tuple:
+    """
+    Reads the species of each line of the JSON files, and hashes the lines of each species, without decoding them.
+
+    Args:
+        json_files (list): The paths to the JSON files of assessments.
+
+    Returns:
+        tuple: The manifest of the input: the species ID of each line, the sorted unique species IDs, and the hash of the lines of
+        each species, in order, as rows of 16 bytes. The species of the lines take 8 bytes per line, the rest depends on the number
+        of species.
+    """
+    hashes = {}
+    line_species = array('q')
+    for json_file in json_files:
+        with open_binary(json_file) as file:
+            for line in file:
+                match = SIS_ID_BYTES.search(line)
+                sis_id = int(match.group(1)) if match else decode(line)["taxon"]["sis_id"]
+                line_species.append(sis_id)
+                if sis_id not in hashes:
+                    hashes[sis_id] = blake2b(digest_size=16)
+                hashes[sis_id].update(line if line.endswith(b"\n") else line + b"\n")
+    species = np.array(sorted(hashes), dtype=np.int64)
+    digests = np.frombuffer(b"".join(hashes[sis_id].digest() for sis_id in species.tolist()), dtype=np.uint8).reshape(-1, 16)
+    return np.frombuffer(line_species, dtype=np.int64), species, digests
+
+def save_manifest(manifest: tuple) -> None:
+    """
+    Args:
+        manifest (tuple): The manifest of scan_species, saved to MANIFEST_FILE.
+    """
+    line_species, species, digests = manifest
+    with open(MANIFEST_FILE + ".tmp", "wb") as file:
+        np.savez(file, line_species=line_species, species=species, digests=digests)
+    os.replace(MANIFEST_FILE + ".tmp", MANIFEST_FILE)
+
+def load_manifest() -> tuple:
+    """
+    Returns:
+        tuple: The manifest saved to MANIFEST_FILE.
+    """
+    with np.load(MANIFEST_FILE) as manifest:
+        return manifest['line_species'], manifest['species'], manifest['digests']
+
+def unchanged_lines(manifest: tuple, previous: tuple) -> tuple:
+    """
+    Compares the manifests of two inputs.
+
+    Args:
+        manifest (tuple): The manifest of the current input.
+        previous (tuple): The manifest of the previous input.
+
+    Returns:
+        tuple: The IDs of the species whose lines did not change, and the position in the current input of each line of the previous
+        one, or -1 for lines of species that changed or were removed.
+    """
+    line_species, species, digests = manifest
+    previous_line_species, previous_species, previous_digests = previous
+    common, current, old = np.intersect1d(species, previous_species, assume_unique=True, return_indices=True)
+    unchanged = common[(digests[current] == previous_digests[old]).all(axis=1)]
+    # The k-th line of an unchanged species in the previous input is its k-th line in the current one
+    order = np.argsort(line_species, kind='stable')
+    order = order[np.isin(line_species[order], unchanged)]
+    previous_order = np.argsort(previous_line_species, kind='stable')
+    previous_order = previous_order[np.isin(previous_line_species[previous_order], unchanged)]
+    positions = np.full(len(previous_line_species), -1, dtype=np.int64)
+    positions[previous_order] = order
+    return unchanged, positions
+
+def csv_records(file):
+    """
+    Reads the records of a CSV file as text, without parsing their values.
+
+    Args:
+        file: The CSV file, opened as text with newline="".
+
+    Yields:
+        str: Each record with its line break, including the line breaks inside quoted values.
+    """
+    record = ""
+    for line in file:
+        if not record and '"' not in line:
+            yield line
+            continue
+        record += line
+        if record.count('"') % 2 == 0: # Quotes inside values are doubled
+            yield record
+            record = ""
+
+def splice_assessments(csv_file: str, positions: array, line_species: np.ndarray) -> pd.Series:
+    """
+    Rewrites "../data/assessments.csv" with its rows of unchanged species, renumbered to their position in the current input, and the
+    rows of csv_file, merged in order of position. The rows are copied as they are.
+
+    Args:
+        csv_file (str): The CSV file of the cleaned assessments of the species that changed, or None if there are none.
+        positions (array): The position in the current input of each line of the previous one, -1 for lines that are not kept.
+        line_species (np.ndarray): The species ID of each line of the current input.
+
+    Returns:
+        pd.Series: The position of the first kept row of each unchanged species.
+    """
+    kept = array('q')
+
+    def previous_rows(records):
+        for record in records:
+            comma = record.index(",")
+            position = positions[int(record[:comma])]
+            if position >= 0:
+                kept.append(position)
+                yield position, f"{position}{record[comma:]}"
+
+    def changed_rows(records):
+        for record in records:
+            yield int(record[:record.index(",")]), record
+
+    with open("../data/assessments.csv", "r", newline="") as previous_file, \
+            open(csv_file or os.devnull, "r", newline="") as changed_file, \
+            open("../data/assessments.csv.tmp", "w", newline="") as file:
+        previous = csv_records(previous_file)
+        changed = csv_records(changed_file)
+        file.write(next(previous))
+        next(changed, None)
+        for position, record in merge(previous_rows(previous), changed_rows(changed), key=lambda item: item[0]):
+            file.write(record)
+    os.replace("../data/assessments.csv.tmp", "../data/assessments.csv")
+    kept = np.frombuffer(kept, dtype=np.int64)
+    species, first = np.unique(line_species[kept], return_index=True)
+    return pd.Series(kept[first], index=species)
+
+def splice_table(path: str, id_field: int, changed: str, first_positions: pd.Series, changed_positions: pd.Series) -> None:
+    """
+    Rewrites an output table with its rows of unchanged species and the rows of the species that changed, ordered as a full run would
+    order them: by the first position of each species in the cleaned assessments, keeping the order of the rows of each species.
+    The rows are copied as they are, except for a default index, which is renumbered.
+
+    Args:
+        path (str): The CSV file of the table.
+        id_field (int): The field of the species ID in each row.
+        changed (str): The table of the species that changed, as CSV, or None if there are none.
+        first_positions (pd.Series): The position of the first cleaned assessment of each unchanged species, whose rows are kept.
+        changed_positions (pd.Series): The position of the first cleaned assessment of each species that changed, or None.
+    """
+    first_positions = dict(zip(first_positions.index.tolist(), first_positions.tolist()))
     rows = []
-    for key, values in dict_countries_id.items():
-        for value in values:
-            rows.append([key, value['country']])
-    countries_dataframe = pd.DataFrame(rows, columns=["ID", "Country"])
-    countries_dataframe.to_csv("../data/countries.csv")
-    
+    with open(path, "r", newline="") as file:
+        records = csv_records(file)
+        header = next(records)
+        for record in records:
+            sis_id = int(record.split(",", id_field + 1)[id_field])
+            if sis_id in first_positions:
+                rows.append((first_positions[sis_id], record))
+    if changed is not None:
+        changed_positions = dict(zip(changed_positions.index.tolist(), changed_positions.tolist()))
+        records = csv_records(io.StringIO(changed, newline=""))
+        next(records)
+        for record in records:
+            rows.append((changed_positions[int(record.split(",", id_field + 1)[id_field])], record))
+    rows.sort(key=lambda row: row[0])
+    with open(path + ".tmp", "w", newline="") as file:
+        file.write(header)
+        for i, (position, record) in enumerate(rows):
+            if header.startswith(","): # Default index, renumbered
+                record = f"{i}{record[record.index(','):]}"
+            file.write(record)
+    os.replace(path + ".tmp", path)
+
+def update_outputs(json_files: list, manifest: tuple) -> bool:
+    """
+    Updates the outputs of the previous run, processing only the species whose lines changed since, and splicing them into the
+    outputs. The outputs are the same as those of a full run.
+
+    Args:
+        json_files (list): The paths to the JSON files of assessments.
+        manifest (tuple): The manifest of the current input (see scan_species).
+
+    Returns:
+        bool: False if the outputs cannot be updated and the full run is needed: there is no previous manifest or output, the
+        columns of the outputs changed, or assessments of unchanged species were reordered.
+    """
+    outputs = ["../data/assessments.csv", "../data/latest_assessments.csv", "../data/uses.csv", "../data/countries.csv",
+               "../data/threats.csv"]
+    if not os.path.exists(MANIFEST_FILE) or not all(os.path.exists(path) for path in outputs):
+        return False
+    unchanged, positions = unchanged_lines(manifest, load_manifest())
+    kept = positions[positions >= 0]
+    if np.any(kept[1:] <= kept[:-1]):
+        return False
+    changed = set(np.setdiff1d(manifest[1], unchanged, assume_unique=True).tolist())
+    print(f"{len(changed)} of {len(manifest[1])} species changed")
+    columnar = [f"../data/{name}.{COLUMNAR_FORMAT}" for name in ["assessments", "latest_assessments", "uses", "countries", "threats"]
+                + (["star/species"] if STAR_SCHEMA else [])]
+    if (not changed and len(positions) == len(manifest[0]) and (not COLUMNAR_FORMAT or all(os.path.exists(path) for path in columnar))
+            and (not DATABASE_FILE or os.path.exists(DATABASE_FILE))):
+        return True # The same lines, in the same order
+    os.remove(MANIFEST_FILE) # Until the new one is saved, so an interrupted update is followed by a full run
+
+    with tempfile.TemporaryDirectory(dir="../data") as directory:
+        csv_file = os.path.join(directory, "assessments.csv")
+        species, changed_positions = process_in_chunks(json_files, CHUNK_SIZE, csv_file=csv_file, sis_ids=changed)
+        tables = [None] * 4
+        if species is None:
+            csv_file = None
+        else:
+            tables = [table.to_csv() for table in [species.drop(columns=LIST_COLUMNS, errors='ignore'), uses_by_id(species),
+                                                   countries_by_id(species), threats_by_id(species)]]
+            with open(csv_file, "r", newline="") as file:
+                headers = [file.readline()] + [table[:table.index("\n") + 1] for table in tables]
+            for path, header in zip(outputs, headers):
+                with open(path, "r", newline="") as file:
+                    if file.readline() != header:
+                        return False # The columns of the outputs changed
+        first_positions = splice_assessments(csv_file, array('q', positions.tobytes()), manifest[0])
+
+    for path, id_field, table in zip(outputs[1:], [0, 1, 1, 1], tables):
+        splice_table(path, id_field, table, first_positions, changed_positions)
+    if COLUMNAR_FORMAT:
+        save_columnar_outputs()
+    if DATABASE_FILE:
+        save_database(DATABASE_FILE)
+    return True
+
+def process_all(json_files: list) -> None:
+    """
+    Processes all the assessments and writes the CSV outputs.
+
+    Args:
+        json_files (list): The paths to the JSON files of assessments.
+    """
+    if PROCESSES > 1:
+        species = process_in_parallel(json_files, CHUNK_SIZE, PROCESSES)
+        save_latest_assessments(species)
+    elif CHUNK_SIZE:
+        species, first_positions = process_in_chunks(json_files, CHUNK_SIZE)
+        if species is None:
+            species = empty_latest_assessments()
+        save_latest_assessments(species)
+    else:
+        dataframe = pd.concat([json_to_dataframe(json_file) for json_file in json_files], ignore_index=True) # Read Assessments
+        dataframe = clean_assessments(dataframe)
+        unique_ids = list(dataframe['taxon.sis_id'].unique())
+        species = create_latest_assessments(dataframe, unique_ids)
+    create_dataframe_uses_by_id(species)
+    create_dataframe_countries_by_id(species)
+    create_dataframe_threats_by_id(species)
 
 def main():
-    json_file = '../data/assessments.json'
-    dataframe = json_to_dataframe(json_file) # Read Assessments
-    dataframe = clean_assessments(dataframe)
-    unique_ids = list(dataframe['taxon.sis_id'].unique())
-    create_dataframe_uses_by_id(dataframe, unique_ids)
-    create_dataframe_countries_by_id(dataframe, unique_ids)
+    json_files = [f for pattern in JSON_FILES for f in (sorted(glob(pattern)) or [pattern])]
+    manifest = scan_species(json_files) if MANIFEST_FILE else None
+    if manifest is None or not update_outputs(json_files, manifest):
+        if manifest is not None and os.path.exists(MANIFEST_FILE):
+            os.remove(MANIFEST_FILE)
+        process_all(json_files)
+        if COLUMNAR_FORMAT:
+            save_columnar_outputs()
+        if DATABASE_FILE:
+            save_database(DATABASE_FILE)
+    if manifest is not None:
+        save_manifest(manifest)
     
 if __name__ == '__main__':
     main()
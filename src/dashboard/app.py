@@ -233,7 +233,7 @@ def update_status_graph(n_clicks, n_submit, input_value):
         
     input_value = clean_input(input_value)
 
-    if input_value not in UNIQUE_SPECIES:
+    if not is_species(input_value):
         return dash.no_update, f"Error: '{input_value}' is not a valid species."
 
     status_enum = {'No Risk Data': 0,
@@ -246,7 +246,8 @@ def update_status_graph(n_clicks, n_submit, input_value):
             'Extinct in the Wild': 7,
             'Extinct': 8}
     fig = go.Figure()
-    df_plot = filter_dataframe_by_specie(ASSESSMENT_DATAFRAME, input_value)
+    df_species = DATABASE.species_assessments(input_value) if DATABASE else ASSESSMENT_DATAFRAME
+    df_plot = filter_dataframe_by_specie(df_species, input_value)
     fig.add_trace(go.Scatter(x=df_plot['Years'], y=df_plot['categoriaOrdem'],
                              mode='lines',
                              line=dict(color='darkred'),
@@ -285,7 +286,7 @@ def update_map(n_clicks, n_submit, input_value):
         
     input_value = clean_input(input_value)
 
-    if input_value not in UNIQUE_SPECIES:
+    if not is_species(input_value):
         return dash.no_update, f"Error: '{input_value}' is not a valid UNIQUE_SPECIES."
 
     filtered_gdf = gdf[gdf['sci_name'] == input_value]
@@ -366,7 +367,7 @@ def update_values_mode_checklists(absolute_value, percentage_value):
     [Input("country-dropdown", "value")]
 )
 def update_kingdom_options(selected_countries):
-    kingdoms = ASSESSMENT_DATAFRAME["taxon.kingdom_name"].unique()
+    kingdoms = taxonomy_values("taxon.kingdom_name", [])
     return [{"label": k, "value": k} for k in kingdoms]
 
 # Callbacks to update dropdowns sequentially (kingdom, phylum, class, order, family)
@@ -377,7 +378,7 @@ def update_kingdom_options(selected_countries):
 def update_phylum_options(selected_kingdom, selected_countries):
     if not selected_kingdom:
         return []
-    phyla = ASSESSMENT_DATAFRAME[ASSESSMENT_DATAFRAME["taxon.kingdom_name"] == selected_kingdom]["taxon.phylum_name"].unique()
+    phyla = taxonomy_values("taxon.phylum_name", [selected_kingdom])
     return [{"label": p, "value": p} for p in phyla]
 
 @app.callback(
@@ -387,8 +388,7 @@ def update_phylum_options(selected_kingdom, selected_countries):
 def update_class_options(selected_phylum, selected_kingdom):
     if selected_phylum is None:
         return []
-    classes = ASSESSMENT_DATAFRAME[(ASSESSMENT_DATAFRAME["taxon.kingdom_name"] == selected_kingdom) & 
-                 (ASSESSMENT_DATAFRAME["taxon.phylum_name"] == selected_phylum)]["taxon.class_name"].unique()
+    classes = taxonomy_values("taxon.class_name", [selected_kingdom, selected_phylum])
     return [{"label": c, "value": c} for c in classes]
 
 @app.callback(
@@ -399,10 +399,7 @@ def update_class_options(selected_phylum, selected_kingdom):
 def update_order_options(selected_class, selected_phylum, selected_kingdom):
     if selected_class is None:
         return []
-    df = ASSESSMENT_DATAFRAME
-    orders = df[(df["taxon.kingdom_name"] == selected_kingdom) & 
-                (df["taxon.phylum_name"] == selected_phylum) &
-                (df["taxon.class_name"] == selected_class)]["taxon.order_name"].unique()
+    orders = taxonomy_values("taxon.order_name", [selected_kingdom, selected_phylum, selected_class])
     return [{"label": o, "value": o} for o in orders]
 
 @app.callback(
@@ -413,11 +410,7 @@ def update_order_options(selected_class, selected_phylum, selected_kingdom):
 def update_family_options(selected_order, selected_class, selected_phylum, selected_kingdom):
     if selected_order is None:
         return []
-    df = ASSESSMENT_DATAFRAME
-    families = df[(df["taxon.kingdom_name"] == selected_kingdom) & 
-                  (df["taxon.phylum_name"] == selected_phylum) &
-                  (df["taxon.class_name"] == selected_class) &
-                  (df["taxon.order_name"] == selected_order)]["taxon.family_name"].unique()
+    families = taxonomy_values("taxon.family_name", [selected_kingdom, selected_phylum, selected_class, selected_order])
     return [{"label": f, "value": f} for f in families]
 
 @app.callback(
@@ -429,12 +422,7 @@ def update_family_options(selected_order, selected_class, selected_phylum, selec
 def update_specie_options(selected_family, selected_order, selected_class, selected_phylum, selected_kingdom):
     if selected_family is None:
         return []
-    df = ASSESSMENT_DATAFRAME
-    species = df[(df["taxon.kingdom_name"] == selected_kingdom) & 
-                  (df["taxon.phylum_name"] == selected_phylum) &
-                  (df["taxon.class_name"] == selected_class) &
-                  (df["taxon.order_name"] == selected_order) &
-                  (df["taxon.family_name"] == selected_family)]["taxon.scientific_name"].unique()
+    species = taxonomy_values("taxon.scientific_name", [selected_kingdom, selected_phylum, selected_class, selected_order, selected_family])
     return [{"label": f, "value": f} for f in species]
 
 @app.callback(
@@ -445,7 +433,7 @@ def update_specie_options(selected_family, selected_order, selected_class, selec
      Input("kingdom-dropdown", "value"), Input("country-dropdown", "value")]
 )
 def update_years_options(selected_species, selected_family, selected_order, selected_class, selected_phylum, selected_kingdom, selected_countries):
-    years = filter_years(ASSESSMENT_DATAFRAME, COUNTRIES_DATAFRAME, selected_species, selected_family, selected_order, selected_class, selected_phylum, selected_kingdom, selected_countries)
+    years = FILTERS.filter_years([selected_kingdom, selected_phylum, selected_class, selected_order, selected_family, selected_species], selected_countries)
     return [{"label": f, "value": f} for f in years]
 
 
@@ -467,7 +455,6 @@ def update_graph(selected_species, selected_family, selected_order, selected_cla
 
     """
     
-    filtered_df = ASSESSMENT_DATAFRAME.copy()
     fig = go.Figure()
     total_by_use = {'Food': 0,
                     'Pets/display animals, horticulture': 0,
@@ -485,12 +472,12 @@ def update_graph(selected_species, selected_family, selected_order, selected_cla
     title = ""
     if country_mode: # Generates the stacked bar chart by country
         selected_countries, dict_country_uses, total = update_graph_country(selected_species, selected_family, selected_order, selected_class, selected_phylum, 
-                                                 selected_kingdom, selected_countries, selected_years, filtered_df, total_by_use)
+                                                 selected_kingdom, selected_countries, selected_years, total_by_use)
         create_bars(fig, all_uses, dict_country_uses, selected_countries, total, percentage_mode)
         title = "Species Use by Country"
         
     elif year_mode: # Generates the stacked bar chart by year
-        selected_years, dict_year_uses, total = update_graph_year(selected_species, selected_family, selected_order, selected_class, selected_phylum, selected_kingdom, selected_countries, selected_years, filtered_df, total_by_use)
+        selected_years, dict_year_uses, total = update_graph_year(selected_species, selected_family, selected_order, selected_class, selected_phylum, selected_kingdom, selected_countries, selected_years, total_by_use)
         
         create_bars(fig, all_uses, dict_year_uses, selected_years, total, percentage_mode, years_mode=True)
         title = "Species Use by Year"
@@ -498,23 +485,15 @@ def update_graph(selected_species, selected_family, selected_order, selected_cla
 
     elif category_mode: # Generates the stacked bar chart by risk category
         dict_categories, total = update_graph_risk(selected_species, selected_family, selected_order, selected_class, selected_phylum, 
-                 selected_kingdom, selected_countries, selected_years, filtered_df, total_by_use)
+                 selected_kingdom, selected_countries, selected_years, total_by_use)
         
         create_bars(fig, all_uses, dict_categories, UNIQUE_CATEGORIES, total, percentage_mode)
         title = "Species Use by Risk Category"
         
     else: # Generates the accumulated bar chart
-        if selected_countries: # Filter by countries
-            ids = list(COUNTRIES_DATAFRAME[COUNTRIES_DATAFRAME['Country'].isin(selected_countries)]['ID'].unique())
-            filtered_df = filtered_df[filtered_df["taxon.sis_id"].isin(ids)]
-        filtered_df = filter_taxonomy(filtered_df, selected_kingdom, selected_phylum, selected_class, selected_order, selected_family, selected_species)
-        if selected_years: # Filter by years
-            years_dataframe = filter_some_years(filtered_df, selected_years)
-            ids = list(years_dataframe['taxon.sis_id'].unique())
-            filtered_df = filtered_df[filtered_df['taxon.sis_id'].isin(ids)]
-
         # Count the number of species by use category
-        usage_counts = generate_uses_count(filtered_df, USES_DATAFRAME)
+        taxonomy = [selected_kingdom, selected_phylum, selected_class, selected_order, selected_family, selected_species]
+        usage_counts = FILTERS.uses_count(taxonomy, selected_countries, selected_years)
         for use in usage_counts.keys():
             total_by_use[use] += usage_counts[use]
             total += usage_counts[use]
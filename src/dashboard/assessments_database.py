@@ -0,0 +1,215 @@
+from threading import Lock
+from urllib.parse import quote
+import sqlite3
+import pandas as pd
+
+TAXONOMY_COLUMNS = ['taxon.kingdom_name', 'taxon.phylum_name', 'taxon.class_name', 'taxon.order_name', 'taxon.family_name',
+                    'taxon.scientific_name']
+
+class AssessmentsDatabase:
+    """
+    Read-only connection to the SQLite database written by clear_assessments.py, which answers the filters and aggregations of
+    the dashboard with SQL instead of keeping the tables in memory. Several dashboard processes can open the same file.
+
+    The filters take the selected taxonomy as a list of values, from kingdom to species, where None skips a rank.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): path to the database file
+        """
+        self.connection = sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True, check_same_thread=False)
+        self.lock = Lock() # Callbacks run in several threads, which share the connection
+
+    def query(self, sql: str, parameters=()) -> list:
+        """
+        Args:
+            sql (str): SQL query
+            parameters (iterable): values of its placeholders
+
+        Returns:
+            list: rows of the result, as tuples
+        """
+        with self.lock:
+            return self.connection.execute(sql, list(parameters)).fetchall()
+
+    def unique_years(self) -> list:
+        """
+        Returns:
+            list: sorted years with at least one assessment
+        """
+        rows = self.query('SELECT DISTINCT year_published FROM assessments WHERE year_published IS NOT NULL ORDER BY 1')
+        return [year for year, in rows]
+
+    def unique_countries(self) -> list:
+        """
+        Returns:
+            list: countries with at least one species, in order of appearance
+        """
+        rows = self.query('SELECT Country FROM countries WHERE Country IS NOT NULL GROUP BY Country ORDER BY MIN(rowid)')
+        return [country for country, in rows]
+
+    def is_species(self, species: str) -> bool:
+        """
+        Args:
+            species (str): scientific name of a species
+
+        Returns:
+            bool: whether the species has at least one assessment
+        """
+        return bool(self.query('SELECT 1 FROM assessments WHERE "taxon.scientific_name" = ? LIMIT 1', [species]))
+
+    def species_assessments(self, species: str) -> pd.DataFrame:
+        """
+        Args:
+            species (str): scientific name of a species
+
+        Returns:
+            pd.DataFrame: assessments of the species, with the columns used by filter_dataframe_by_specie
+        """
+        with self.lock:
+            return pd.read_sql_query('SELECT "taxon.scientific_name", year_published, risk_category FROM assessments '
+                                     'WHERE "taxon.scientific_name" = ?', self.connection, params=[species])
+
+    def taxonomy_values(self, column: str, taxonomy: list) -> list:
+        """
+        Args:
+            column (str): taxonomic column, e.g. 'taxon.class_name'
+            taxonomy (list): values of the ranks above it, from kingdom down
+
+        Returns:
+            list: values of the column among the assessments of the given ranks, in order of appearance. Empty if a rank is None.
+        """
+        conditions = " AND ".join(f'"{rank}" = ?' for rank in TAXONOMY_COLUMNS[:len(taxonomy)]) or "1"
+        rows = self.query(f'SELECT "{column}" FROM assessments WHERE {conditions} GROUP BY "{column}" ORDER BY MIN(rowid)', taxonomy)
+        return [value for value, in rows]
+
+    def species_selection(self, taxonomy: list, countries: list = None, years: list = None) -> tuple:
+        """
+        Builds a query of the species matching the filters of the dashboard.
+
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species, or None to not filter by a rank
+            countries (list): selected countries, or None to not filter by country
+            years (list): selected years, or None to not filter by year. Species with an assessment in any of them are kept.
+
+        Returns:
+            tuple: SQL query of the IDs of the species, and the values of its placeholders
+        """
+        conditions = []
+        parameters = []
+        for column, value in zip(TAXONOMY_COLUMNS, taxonomy):
+            if value:
+                conditions.append(f'"{column}" = ?')
+                parameters.append(value)
+        if countries:
+            conditions.append(f'"taxon.sis_id" IN (SELECT ID FROM countries WHERE Country IN ({", ".join("?" * len(countries))}))')
+            parameters.extend(countries)
+        if years:
+            conditions.append('"taxon.sis_id" IN (SELECT "taxon.sis_id" FROM assessments '
+                              f'WHERE year_published IN ({", ".join("?" * len(years))}))')
+            parameters.extend(years)
+        sql = f'SELECT DISTINCT "taxon.sis_id" FROM assessments WHERE {" AND ".join(conditions) or "1"}'
+        return sql, parameters
+
+    def filter_years(self, taxonomy: list, countries: list) -> list:
+        """
+        The ranks are read from kingdom down to the first one not selected, and all of them are ignored if the kingdom is not
+        selected.
+
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species
+            countries (list): selected countries
+
+        Returns:
+            list: sorted years with at least one assessment of the species matching the filters
+        """
+        selected = []
+        for value in taxonomy:
+            if value is None:
+                break
+            selected.append(value)
+        sql, parameters = self.species_selection(selected, countries)
+        rows = self.query(f'SELECT DISTINCT year_published FROM assessments WHERE year_published IS NOT NULL '
+                          f'AND "taxon.sis_id" IN ({sql}) ORDER BY 1', parameters)
+        return [year for year, in rows]
+
+    def uses_count(self, taxonomy: list, countries: list, years: list) -> dict:
+        """
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species
+            countries (list): selected countries
+            years (list): selected years
+
+        Returns:
+            dict: frequencies of uses, without 'Unknown'
+        """
+        sql, parameters = self.species_selection(taxonomy, countries, years)
+        rows = self.query(f"SELECT Use, COUNT(*) FROM uses WHERE ID IN ({sql}) AND Use != 'Unknown' GROUP BY Use", parameters)
+        return dict(rows)
+
+    def grouped_uses_count(self, groups: str, parameters: list, keys: list) -> dict:
+        """
+        Counts the uses of groups of species.
+
+        Args:
+            groups (str): SQL query of (group, ID) rows, each species once per group
+            parameters (list): values of its placeholders
+            keys (list): groups of the result, each one with an empty dictionary if it has no use
+
+        Returns:
+            dict: frequencies of uses of each group, without 'Unknown'
+        """
+        rows = self.query(f"SELECT groups.key, uses.Use, COUNT(*) FROM ({groups}) AS groups JOIN uses ON uses.ID = groups.ID "
+                          f"WHERE uses.Use != 'Unknown' GROUP BY groups.key, uses.Use", parameters)
+        counts = {key: {} for key in keys}
+        for key, use, count in rows:
+            if key in counts:
+                counts[key][use] = count
+        return counts
+
+    def uses_count_by_country(self, taxonomy: list, countries: list, years: list) -> dict:
+        """
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species
+            countries (list): countries to count the uses of
+            years (list): selected years
+
+        Returns:
+            dict: frequencies of uses of the species matching the filters in each country
+        """
+        sql, parameters = self.species_selection(taxonomy, None, years)
+        groups = (f'SELECT DISTINCT Country AS key, ID FROM countries WHERE Country IN ({", ".join("?" * len(countries))}) '
+                  f'AND ID IN ({sql})')
+        return self.grouped_uses_count(groups, list(countries) + parameters, countries)
+
+    def uses_count_by_year(self, taxonomy: list, countries: list, years: list) -> dict:
+        """
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species
+            countries (list): selected countries
+            years (list): years to count the uses of
+
+        Returns:
+            dict: frequencies of uses of the species matching the filters with an assessment in each year
+        """
+        sql, parameters = self.species_selection(taxonomy, countries)
+        groups = (f'SELECT DISTINCT year_published AS key, "taxon.sis_id" AS ID FROM assessments '
+                  f'WHERE year_published IN ({", ".join("?" * len(years))}) AND "taxon.sis_id" IN ({sql})')
+        return self.grouped_uses_count(groups, list(years) + parameters, years)
+
+    def uses_count_by_risk(self, taxonomy: list, countries: list, years: list, categories: list) -> dict:
+        """
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species
+            countries (list): selected countries
+            years (list): selected years
+            categories (list): risk categories to count the uses of
+
+        Returns:
+            dict: frequencies of uses of the species matching the filters with an assessment in each risk category
+        """
+        sql, parameters = self.species_selection(taxonomy, countries, years)
+        groups = f'SELECT DISTINCT risk_category AS key, "taxon.sis_id" AS ID FROM assessments WHERE "taxon.sis_id" IN ({sql})'
+        return self.grouped_uses_count(groups, parameters, categories)
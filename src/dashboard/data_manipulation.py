@@ -8,6 +8,8 @@ import geopandas as gpd
 import datetime
 import os
 import gc
+from assessments_database import AssessmentsDatabase
+from species_index import SpeciesIndex
 
 def clean_input(input_string: str) -> str:
     """
@@ -58,128 +60,24 @@ def filter_dataframe_by_specie(df: pd.DataFrame, species: str) -> pd.DataFrame:
     return df_plot
     
 
-def filter_taxonomy(dataframe: pd.DataFrame, 
-                   selected_kingdom: str, 
-                   selected_phylum: str, 
-                   selected_class: str, 
-                   selected_order: str, 
-                   selected_family: str, 
-                   selected_species: str) -> pd.DataFrame:
+def taxonomy_values(column: str, taxonomy: list) -> list:
     """
-    Filters the DataFrame based on selected taxonomic criteria.
+    Lists the values of a taxonomic rank among the assessments of the selected ranks above it, for the taxonomy dropdowns.
     
     Args:
-        dataframe (pd.DataFrame): DataFrame containing taxonomic columns such as 'taxon.kingdom_name', 'taxon.phylum_name', etc.
-        selected_kingdom (str): The kingdom to filter by, or None to skip filtering by kingdom.
-        selected_phylum (str): The phylum to filter by, or None to skip filtering by phylum.
-        selected_class (str): The class to filter by, or None to skip filtering by class.
-        selected_order (str): The order to filter by, or None to skip filtering by order.
-        selected_family (str): The family to filter by, or None to skip filtering by family.
-        selected_species (str): The species to filter by, or None to skip filtering by species.
+        column (str): The column of the rank, e.g. 'taxon.class_name'.
+        taxonomy (list): The selected values of the ranks above it, from kingdom down.
         
     Returns:
-        pd.DataFrame: A filtered DataFrame containing only entries matching the selected taxonomic criteria.
+        list: The unique values of the column, in order of appearance.
     """
-    filtered_df = dataframe.copy()
-    if selected_kingdom:
-        filtered_df = dataframe[dataframe["taxon.kingdom_name"] == selected_kingdom]
-    if selected_phylum:
-        filtered_df = filtered_df[filtered_df["taxon.phylum_name"] == selected_phylum]
-    if selected_class:
-        filtered_df = filtered_df[filtered_df["taxon.class_name"] == selected_class]
-    if selected_order:
-        filtered_df = filtered_df[filtered_df["taxon.order_name"] == selected_order]
-    if selected_family:
-        filtered_df = filtered_df[filtered_df["taxon.family_name"] == selected_family]
-    if selected_species:
-        filtered_df = filtered_df[filtered_df["taxon.scientific_name"] == selected_species]
-    return filtered_df
-
-def filter_years(dataframe: pd.DataFrame, 
-		        countries_dataframe: pd.DataFrame, 
-		        selected_species: str, 
-		        selected_family: str, 
-		        selected_order: str, 
-		        selected_class: str, 
-		        selected_phylum: str, 
-		        selected_kingdom: str, 
-		        selected_countries: list) -> list:
-    """
-    Generates list of unique years of assessments given taxonomic criteria and country subset.
-    
-    Args:
-        dataframe (pd.DataFrame): DataFrame containing taxonomic columns such as 'taxon.kingdom_name', 'taxon.phylum_name', etc.
-        countries_dataframe (pd.DataFrame): DataFrame containing status of species in countries it inhabits
-        selected_kingdom (str): The kingdom to filter by, or None to skip filtering by kingdom.
-        selected_phylum (str): The phylum to filter by, or None to skip filtering by phylum.
-        selected_class (str): The class to filter by, or None to skip filtering by class.
-        selected_order (str): The order to filter by, or None to skip filtering by order.
-        selected_family (str): The family to filter by, or None to skip filtering by family.
-        selected_species (str): The species to filter by, or None to skip filtering by species.
-        selected_countries (list): Countries to filter by
-        
-    Returns:
-        list of years with at least one assessment fitting the given criteria
-    """
-    
-    if selected_kingdom is None:
-        ids_species = []
-    if selected_phylum is None:
-        ids_species = list(dataframe[dataframe["taxon.kingdom_name"] == selected_kingdom]["taxon.sis_id"].dropna().unique())
-    elif selected_class is None:
-        ids_species = list(dataframe[(dataframe["taxon.kingdom_name"] == selected_kingdom) & 
-                  (dataframe["taxon.phylum_name"] == selected_phylum)]["taxon.sis_id"].dropna().unique())
-    elif selected_order is None:
-        ids_species = list(dataframe[(dataframe["taxon.kingdom_name"] == selected_kingdom) & 
-                  (dataframe["taxon.phylum_name"] == selected_phylum) &
-                  (dataframe["taxon.class_name"] == selected_class)]["taxon.sis_id"].dropna().unique())
-    elif selected_family is None:
-        ids_species = list(dataframe[(dataframe["taxon.kingdom_name"] == selected_kingdom) & 
-                  (dataframe["taxon.phylum_name"] == selected_phylum) &
-                  (dataframe["taxon.class_name"] == selected_class) &
-                  (dataframe["taxon.order_name"] == selected_order)]["taxon.sis_id"].dropna().unique())
-    elif selected_species is None:
-        ids_species = list(dataframe[(dataframe["taxon.kingdom_name"] == selected_kingdom) & 
-                  (dataframe["taxon.phylum_name"] == selected_phylum) &
-                  (dataframe["taxon.class_name"] == selected_class) &
-                  (dataframe["taxon.order_name"] == selected_order) &
-                  (dataframe["taxon.family_name"] == selected_family)]["taxon.sis_id"].dropna().unique())
-    else:
-        ids_species = list(dataframe[(dataframe["taxon.kingdom_name"] == selected_kingdom) & 
-                  (dataframe["taxon.phylum_name"] == selected_phylum) &
-                  (dataframe["taxon.class_name"] == selected_class) &
-                  (dataframe["taxon.order_name"] == selected_order) &
-                  (dataframe["taxon.family_name"] == selected_family) &
-                  (dataframe["taxon.scientific_name"] == selected_species)]["taxon.sis_id"].dropna().unique())
-    if selected_countries:
-        ids_countries = list(countries_dataframe[countries_dataframe['Country'].isin(selected_countries)]['ID'].dropna().unique())
-    if selected_countries and selected_kingdom:    
-        ids = list(set(ids_countries) & set(ids_species))
-        filtered_years = list(dataframe[dataframe["taxon.sis_id"].isin(ids)]["year_published"].dropna().unique())
-    elif selected_kingdom:
-        filtered_years = list(dataframe[dataframe["taxon.sis_id"].isin(ids_species)]["year_published"].dropna().unique())
-    elif selected_countries:
-        filtered_years = list(dataframe[dataframe["taxon.sis_id"].isin(ids_countries)]["year_published"].dropna().unique())
-    else: 
-        filtered_years = list(dataframe["year_published"].dropna().unique())
-    filtered_years.sort()
-    return filtered_years
-    
-
-def filter_some_years(dataframe: pd.DataFrame, list_years: list) -> pd.DataFrame:
-    """
-    Filters the DataFrame to include only assessments published in specified years.
-    
-    Args:
-        dataframe (pd.DataFrame): Assessments DataFrame.
-        list_years (list): List of years to filter the data by.
-        
-    Returns:
-        pd.DataFrame: Filtered DataFrame containing only assessments with publication years in 
-        list_years.
-    """
-    return dataframe[dataframe['year_published'].isin(list_years)]
-
+    if DATABASE:
+        return DATABASE.taxonomy_values(column, taxonomy)
+    df = ASSESSMENT_DATAFRAME
+    mask = pd.Series(True, index=df.index)
+    for rank, value in zip(["taxon.kingdom_name", "taxon.phylum_name", "taxon.class_name", "taxon.order_name", "taxon.family_name"], taxonomy):
+        mask &= df[rank] == value
+    return list(df[mask][column].unique())
 
 def calculate_values_per_mode(list_of_values: list, total: int, percentage_mode: bool) -> list:
     """
@@ -219,25 +117,37 @@ def create_list_unique_years(dataframe: pd.DataFrame) -> list:
     UNIQUE_YEARS.sort()
     return UNIQUE_YEARS
 
-def generate_uses_count(dataframe: pd.DataFrame, uses_dataframe: pd.DataFrame) -> dict:
+def is_species(species: str) -> bool:
     """
-    Create dictionary with frequencies of uses of certain species
-    
+    Checks if a scientific name is one of the species of the assessments, in the database if there is one.
+
     Args:
-        dataframe (pd.DataFrame): DataFrame containing taxonomic columns such as 'taxon.kingdom_name', 'taxon.phylum_name', etc.
-        uses_dataframe (pd.Dataframe): DataFrame containing uses of species
-        
+        species (str): The scientific name.
+
+    Returns:
+        bool: True if the species has at least one assessment.
+    """
+    if DATABASE:
+        return DATABASE.is_species(species)
+    return species in UNIQUE_SPECIES
+
+def read_table(base_dir: str, name: str) -> pd.DataFrame:
+    """
+    Reads an output table of clear_assessments.py, preferring its typed columnar file over the CSV file.
+
+    Args:
+        base_dir (str): path to base directory
+        name (str): name of the table, e.g. "assessments"
+
     Returns:
-        dict: frequencies of uses, determined by the species contained in "dataframe"
+        pd.DataFrame: the table, with categorical and integer columns if read from a Parquet or Feather file
     """
-    ids = list(dataframe['taxon.sis_id'].unique())
-    filtered_dataframe = uses_dataframe[uses_dataframe['ID'].isin(ids)]
-    usage_counts = filtered_dataframe['Use'].value_counts().to_dict()
-    try:
-        del usage_counts['Unknown']
-    except:
-        pass
-    return usage_counts
+    path = os.path.join(base_dir, "../../data", name)
+    if os.path.exists(path + ".parquet"):
+        return pd.read_parquet(path + ".parquet")
+    if os.path.exists(path + ".feather"):
+        return pd.read_feather(path + ".feather")
+    return pd.read_csv(path + ".csv")
 
 def read_shapefiles(base_dir: str):
     """
@@ -282,11 +192,24 @@ def read_shapefiles(base_dir: str):
 base_dir = os.path.dirname(os.path.abspath(__file__))
 gdf = read_shapefiles(base_dir)
 
-ASSESSMENT_DATAFRAME = pd.read_csv(os.path.join(base_dir, "../../data/assessments.csv"))
-USES_DATAFRAME = pd.read_csv(os.path.join(base_dir, "../../data/uses.csv"))
-COUNTRIES_DATAFRAME = pd.read_csv(os.path.join(base_dir, "../../data/countries.csv"))
+# The database of clear_assessments.py is queried when it exists, instead of loading the tables in memory. FILTERS answers the
+# filters and aggregations of the charts, from the database or from the indexes of the loaded tables
+DATABASE_FILE = os.path.join(base_dir, "../../data/assessments.db")
+DATABASE = AssessmentsDatabase(DATABASE_FILE) if os.path.exists(DATABASE_FILE) else None
 
-UNIQUE_YEARS = create_list_unique_years(ASSESSMENT_DATAFRAME)
-UNIQUE_COUNTRIES = list(COUNTRIES_DATAFRAME["Country"].unique())
 UNIQUE_CATEGORIES = ["NE", "LC", "LT", "VU", "EN", "CR", "RE", "EW", "EX"]
-UNIQUE_SPECIES = list(ASSESSMENT_DATAFRAME['taxon.scientific_name'].unique())
\ No newline at end of file
+if DATABASE:
+    ASSESSMENT_DATAFRAME = USES_DATAFRAME = COUNTRIES_DATAFRAME = None
+    UNIQUE_YEARS = DATABASE.unique_years()
+    UNIQUE_COUNTRIES = DATABASE.unique_countries()
+    UNIQUE_SPECIES = None # See is_species
+    FILTERS = DATABASE
+else:
+    ASSESSMENT_DATAFRAME = read_table(base_dir, "assessments")
+    USES_DATAFRAME = read_table(base_dir, "uses")
+    COUNTRIES_DATAFRAME = read_table(base_dir, "countries")
+
+    UNIQUE_YEARS = create_list_unique_years(ASSESSMENT_DATAFRAME)
+    UNIQUE_COUNTRIES = list(COUNTRIES_DATAFRAME["Country"].unique())
+    UNIQUE_SPECIES = set(ASSESSMENT_DATAFRAME['taxon.scientific_name'].unique())
+    FILTERS = SpeciesIndex(ASSESSMENT_DATAFRAME, USES_DATAFRAME, COUNTRIES_DATAFRAME)
\ No newline at end of file
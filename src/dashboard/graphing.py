@@ -55,7 +55,7 @@ def create_bars(fig,
     Args:
         fig (plotly.graph_objs.Figure): plotly figure
         all_uses (list): list of all possible uses, including some that might not be included in dict_uses
-        dict_uses (dict): dictionary of dictionaries of frequencies of uses (see function generate_uses_count), grouped by other parameters (year, country, vulnerability category)
+        dict_uses (dict): dictionary of dictionaries of frequencies of uses (see method uses_count of FILTERS), grouped by other parameters (year, country, vulnerability category)
         list_selected_items (list): list of parameters used in dict_uses
         total (int): The total value used to calculate percentages.
         percentage_mode (bool): if true, the figure uses percentages as the x-axis
@@ -104,12 +104,11 @@ def update_graph_country(selected_species: str,
                          selected_kingdom: str, 
                          selected_countries: list, 
                          selected_years: list, 
-                         filtered_df: pd.DataFrame, 
                          total_by_use: dict) -> tuple:
     """
     Updates a stacked barplot grouped by country.
 
-    This method filters the assessments dataframe based on selected 
+    This method filters the species based on selected 
     taxonomy (species, family, order, class, phylum, kingdom), countries, and years.
     It calculates the total counts of uses for each species within the selected countries
     and generates a dictionary of usage counts by country.
@@ -123,7 +122,6 @@ def update_graph_country(selected_species: str,
         selected_kingdom (str): Selected taxonomic kingdom name.
         selected_countries (list): List of selected country names.
         selected_years (list): List of selected years.
-        filtered_df (pd.DataFrame): Assessments DataFrame.
         total_by_use (dict): Dictionary to accumulate usage counts.
 
     Returns:
@@ -133,23 +131,11 @@ def update_graph_country(selected_species: str,
     if selected_countries is None or len(selected_countries) == 0:
         selected_countries = UNIQUE_COUNTRIES
 
-    dict_country_uses = {}
-    for country in selected_countries:
-        # Filter by country
-        list_ids_country = list(COUNTRIES_DATAFRAME[COUNTRIES_DATAFRAME['Country'] == country]["ID"])
-        filtered_df = filtered_df[filtered_df['taxon.sis_id'].isin(list_ids_country)]
-        # Filter by taxonomy
-        filtered_df = filter_taxonomy(filtered_df, selected_kingdom, selected_phylum, selected_class, selected_order, selected_family, selected_species)
-        # Filter by years
-        if selected_years:
-            years_dataframe = filter_some_years(filtered_df, selected_years)
-            ids = list(years_dataframe['taxon.sis_id'].unique())
-            filtered_df = filtered_df[filtered_df['taxon.sis_id'].isin(ids)]
-        # Count usage
-        usage_counts = generate_uses_count(filtered_df, USES_DATAFRAME)
-        dict_country_uses[country] = usage_counts
+    taxonomy = [selected_kingdom, selected_phylum, selected_class, selected_order, selected_family, selected_species]
+    dict_country_uses = FILTERS.uses_count_by_country(taxonomy, selected_countries, selected_years)
 
-        # Update total counts
+    # Update total counts
+    for usage_counts in dict_country_uses.values():
         for use in usage_counts.keys():
             total_by_use[use] += usage_counts[use]
             total += usage_counts[use]
@@ -165,12 +151,11 @@ def update_graph_year(selected_species: str,
                       selected_kingdom: str, 
                       selected_countries: list, 
                       selected_years: list, 
-                      filtered_df: pd.DataFrame, 
                       total_by_use: dict) -> tuple:
     """
     Updates a stacked barplot grouped by year.
 
-    This method filters the assessments dataframe based on selected 
+    This method filters the species based on selected 
     taxonomy (species, family, order, class, phylum, kingdom), countries, and years.
     It calculates the total counts of uses for each species within the selected years
     and generates a dictionary of usage counts by year.
@@ -184,35 +169,21 @@ def update_graph_year(selected_species: str,
         selected_kingdom (str): Selected taxonomic kingdom name.
         selected_countries (list): List of selected country names.
         selected_years (list): List of selected years.
-        filtered_df (pd.DataFrame): Assessments DataFrame.
         total_by_use (dict): Dictionary to accumulate usage counts.
 
     Returns:
         tuple: Selected years, dictionary of usage counts by year, total usage count.
     """
-    dict_year_uses = {}
     total = 0
+    taxonomy = [selected_kingdom, selected_phylum, selected_class, selected_order, selected_family, selected_species]
     if selected_years is None or len(selected_years) == 0:
         # Determine available years if none are selected
-        selected_years = filter_years(ASSESSMENT_DATAFRAME, COUNTRIES_DATAFRAME, selected_species, selected_family, selected_order, selected_class, selected_phylum, selected_kingdom, selected_countries)
+        selected_years = FILTERS.filter_years(taxonomy, selected_countries)
 
-    if selected_countries:
-        # Filter by country
-        ids = list(COUNTRIES_DATAFRAME[COUNTRIES_DATAFRAME['Country'].isin(selected_countries)]['ID'].unique())
-        filtered_df = filtered_df[filtered_df["taxon.sis_id"].isin(ids)]
-    # Filter by taxonomy
-    filtered_df = filter_taxonomy(filtered_df, selected_kingdom, selected_phylum, selected_class, selected_order, selected_family, selected_species)
+    dict_year_uses = FILTERS.uses_count_by_year(taxonomy, selected_countries, selected_years)
 
-    for year in selected_years:
-        # Filter by year
-        years_dataframe = filter_some_years(filtered_df, [year])
-        ids = list(years_dataframe['taxon.sis_id'].unique())
-        temp_df = filtered_df[filtered_df['taxon.sis_id'].isin(ids)]
-        # Count usage
-        usage_counts = generate_uses_count(temp_df, USES_DATAFRAME)
-        dict_year_uses[year] = usage_counts
-
-        # Update total counts
+    # Update total counts
+    for usage_counts in dict_year_uses.values():
         for use in usage_counts.keys():
             total_by_use[use] += usage_counts[use]
             total += usage_counts[use]
@@ -228,12 +199,11 @@ def update_graph_risk(selected_species: str,
                       selected_kingdom: str, 
                       selected_countries: str, 
                       selected_years: str, 
-                      filtered_df: pd.DataFrame, 
                       total_by_use: dict) -> tuple:
     """
     Updates a stacked barplot grouped by risk category.
 
-    This method filters the assessments dataframe based on selected 
+    This method filters the species based on selected 
     taxonomy (species, family, order, class, phylum, kingdom), countries, and years.
     It calculates the total counts of uses for each species within the selected risk 
     categories and generates a dictionary of usage counts by risk category.
@@ -247,34 +217,17 @@ def update_graph_risk(selected_species: str,
         selected_kingdom (str): Selected taxonomic kingdom name.
         selected_countries (str): List of selected country names.
         selected_years (str): List of selected years.
-        filtered_df (pd.DataFrame): Assessments DataFrame.
         total_by_use (dict): Dictionary to accumulate usage counts.
 
     Returns:
         tuple: Dictionary of usage counts by risk category, total usage count.
     """
-    if selected_countries:
-        # Filter by country
-        ids = list(COUNTRIES_DATAFRAME[COUNTRIES_DATAFRAME['Country'].isin(selected_countries)]['ID'].unique())
-        filtered_df = filtered_df[filtered_df["taxon.sis_id"].isin(ids)]
-    # Filter by taxonomy
-    filtered_df = filter_taxonomy(filtered_df, selected_kingdom, selected_phylum, selected_class, selected_order, selected_family, selected_species)
-    # Filter by years
-    if selected_years:
-        years_dataframe = filter_some_years(filtered_df, selected_years)
-        ids = list(years_dataframe['taxon.sis_id'].unique())
-        filtered_df = filtered_df[filtered_df['taxon.sis_id'].isin(ids)]
-
-    dict_categories = {}
     total = 0
-    for category in UNIQUE_CATEGORIES:
-        # Filter by risk category
-        temp_dataframe = filtered_df[filtered_df["risk_category"] == category]
-        # Count usage
-        usage_counts = generate_uses_count(temp_dataframe, USES_DATAFRAME)
-        dict_categories[category] = usage_counts
+    taxonomy = [selected_kingdom, selected_phylum, selected_class, selected_order, selected_family, selected_species]
+    dict_categories = FILTERS.uses_count_by_risk(taxonomy, selected_countries, selected_years, UNIQUE_CATEGORIES)
 
-        # Update total counts
+    # Update total counts
+    for usage_counts in dict_categories.values():
         for use in usage_counts.keys():
             total_by_use[use] += usage_counts[use]
             total += usage_counts[use]
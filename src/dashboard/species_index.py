@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+
+TAXONOMY_COLUMNS = ['taxon.kingdom_name', 'taxon.phylum_name', 'taxon.class_name', 'taxon.order_name', 'taxon.family_name',
+                    'taxon.scientific_name']
+
+class ValueIndex:
+    """
+    Species of each value of a column, as sorted positions in the dense species index and, for columns with few values, as
+    bitmaps packed 8 species per byte, so the species of any selection of values are a single OR.
+    """
+
+    def __init__(self, values: pd.Series, positions: np.ndarray, species_count: int, bitmaps: bool):
+        """
+        Args:
+            values (pd.Series): values of the column, one per row
+            positions (np.ndarray): position of the species of each row in the dense index, -1 to skip the row
+            species_count (int): number of species of the dense index
+            bitmaps (bool): also build the packed bitmap of each value
+        """
+        codes, values = pd.factorize(values)
+        self.values = np.asarray(values, dtype=object)
+        keep = (codes >= 0) & (positions >= 0)
+        pairs = np.unique(codes[keep].astype(np.int64) * species_count + positions[keep])
+        self.codes = pairs // species_count # Each (value, species) pair once, sorted by value and species
+        self.positions = pairs % species_count
+        self.starts = np.searchsorted(self.codes, np.arange(len(self.values) + 1))
+        self.lookup = {value: code for code, value in enumerate(self.values)}
+        self.species_count = species_count
+        self.bits = None
+        if bitmaps:
+            self.bits = np.zeros((len(self.values), (species_count + 7) // 8), dtype=np.uint8)
+            for code in range(len(self.values)):
+                self.bits[code] = np.packbits(self.mask([self.values[code]]))
+
+    def mask(self, values: list) -> np.ndarray:
+        """
+        Args:
+            values (list): values of the column
+
+        Returns:
+            np.ndarray: boolean mask of the species with any of the values
+        """
+        mask = np.zeros(self.species_count, dtype=bool)
+        for value in values:
+            code = self.lookup.get(value)
+            if code is None:
+                continue
+            positions = self.positions[self.starts[code]:self.starts[code + 1]]
+            if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+                mask[positions[0]:positions[-1] + 1] = True # Contiguous, as the species are sorted by taxonomy
+            else:
+                mask[positions] = True
+        return mask
+
+    def packed_mask(self, values: list) -> np.ndarray:
+        """
+        Args:
+            values (list): values of the column
+
+        Returns:
+            np.ndarray: packed bitmap of the species with any of the values. Requires the bitmaps.
+        """
+        codes = [self.lookup[value] for value in values if value in self.lookup]
+        if not codes:
+            return np.zeros(self.bits.shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bits[codes], axis=0)
+
+class SpeciesIndex:
+    """
+    Indexes of the species of the assessments, built once from the loaded tables, which answer the filters and aggregations of
+    the dashboard with bitwise operations over a dense index of the species instead of filtering the tables. The species are
+    numbered in taxonomic order, so each taxon is a contiguous range. Has the same methods as AssessmentsDatabase.
+
+    The filters take the selected taxonomy as a list of values, from kingdom to species, where None skips a rank.
+    """
+
+    def __init__(self, assessments: pd.DataFrame, uses: pd.DataFrame, countries: pd.DataFrame):
+        """
+        Args:
+            assessments (pd.DataFrame): the assessments table
+            uses (pd.DataFrame): the uses of each species
+            countries (pd.DataFrame): the countries of each species
+        """
+        species = assessments.drop_duplicates('taxon.sis_id').sort_values(TAXONOMY_COLUMNS + ['taxon.sis_id'])
+        self.ids = pd.Index(species['taxon.sis_id'].to_numpy())
+        n = len(self.ids)
+        positions = self.ids.get_indexer(assessments['taxon.sis_id'])
+        self.taxonomy = {column: ValueIndex(assessments[column], positions, n, bitmaps=False) for column in TAXONOMY_COLUMNS}
+        self.years = ValueIndex(assessments['year_published'], positions, n, bitmaps=True)
+        self.categories = ValueIndex(assessments['risk_category'], positions, n, bitmaps=True)
+        self.countries = ValueIndex(countries['Country'], self.ids.get_indexer(countries['ID']), n, bitmaps=True)
+
+        # Number of rows of each use of each species, without unknown uses
+        uses = uses[uses['Use'].notna() & (uses['Use'] != 'Unknown')]
+        use_positions = self.ids.get_indexer(uses['ID'])
+        use_codes, self.use_names = pd.factorize(uses['Use'])
+        keep = use_positions >= 0
+        self.use_counts = np.zeros((n, len(self.use_names)), dtype=np.int32)
+        np.add.at(self.use_counts, (use_positions[keep], use_codes[keep]), 1)
+
+    def species_mask(self, taxonomy: list, countries: list = None, years: list = None) -> np.ndarray:
+        """
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species, or None to not filter by a rank
+            countries (list): selected countries, or None to not filter by country
+            years (list): selected years, or None to not filter by year. Species with an assessment in any of them are kept.
+
+        Returns:
+            np.ndarray: boolean mask of the species matching the filters
+        """
+        packed = None
+        if countries:
+            packed = self.countries.packed_mask(countries)
+        if years:
+            packed = self.years.packed_mask(years) if packed is None else packed & self.years.packed_mask(years)
+        if packed is None:
+            mask = np.ones(len(self.ids), dtype=bool)
+        else:
+            mask = np.unpackbits(packed, count=len(self.ids)).view(bool)
+        for column, value in zip(TAXONOMY_COLUMNS, taxonomy):
+            if value:
+                mask &= self.taxonomy[column].mask([value])
+        return mask
+
+    def counts(self, totals: np.ndarray) -> dict:
+        """
+        Args:
+            totals (np.ndarray): number of rows of each use
+
+        Returns:
+            dict: frequencies of the uses found
+        """
+        return {use: int(count) for use, count in zip(self.use_names, totals) if count > 0}
+
+    def filter_years(self, taxonomy: list, countries: list) -> list:
+        """
+        The ranks are read from kingdom down to the first one not selected, and all of them are ignored if the kingdom is not
+        selected.
+
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species
+            countries (list): selected countries
+
+        Returns:
+            list: sorted years with at least one assessment of the species matching the filters
+        """
+        selected = []
+        for value in taxonomy:
+            if value is None:
+                break
+            selected.append(value)
+        packed = np.packbits(self.species_mask(selected, countries))
+        found = (self.years.bits & packed).any(axis=1)
+        return sorted(self.years.values[found])
+
+    def uses_count(self, taxonomy: list, countries: list, years: list) -> dict:
+        """
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species
+            countries (list): selected countries
+            years (list): selected years
+
+        Returns:
+            dict: frequencies of uses of the species matching the filters, without 'Unknown'
+        """
+        return self.counts(self.use_counts[self.species_mask(taxonomy, countries, years)].sum(axis=0))
+
+    def grouped_uses_count(self, index: ValueIndex, mask: np.ndarray, keys: list) -> dict:
+        """
+        Args:
+            index (ValueIndex): index of the column the species are grouped by
+            mask (np.ndarray): boolean mask of the selected species
+            keys (list): values of the column to count the uses of
+
+        Returns:
+            dict: frequencies of uses of the selected species with each value, without 'Unknown'
+        """
+        requested = np.zeros(len(index.values), dtype=bool)
+        requested[[index.lookup[key] for key in keys if key in index.lookup]] = True
+        keep = mask[index.positions] & requested[index.codes]
+        totals = np.zeros((len(index.values), len(self.use_names)), dtype=np.int64)
+        np.add.at(totals, index.codes[keep], self.use_counts[index.positions[keep]])
+        return {key: self.counts(totals[index.lookup[key]]) if key in index.lookup else {} for key in keys}
+
+    def uses_count_by_country(self, taxonomy: list, countries: list, years: list) -> dict:
+        """
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species
+            countries (list): countries to count the uses of
+            years (list): selected years
+
+        Returns:
+            dict: frequencies of uses of the species matching the filters in each country
+        """
+        return self.grouped_uses_count(self.countries, self.species_mask(taxonomy, None, years), countries)
+
+    def uses_count_by_year(self, taxonomy: list, countries: list, years: list) -> dict:
+        """
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species
+            countries (list): selected countries
+            years (list): years to count the uses of
+
+        Returns:
+            dict: frequencies of uses of the species matching the filters with an assessment in each year
+        """
+        return self.grouped_uses_count(self.years, self.species_mask(taxonomy, countries), years)
+
+    def uses_count_by_risk(self, taxonomy: list, countries: list, years: list, categories: list) -> dict:
+        """
+        Args:
+            taxonomy (list): selected values of each rank, from kingdom to species
+            countries (list): selected countries
+            years (list): selected years
+            categories (list): risk categories to count the uses of
+
+        Returns:
+            dict: frequencies of uses of the species matching the filters with an assessment in each risk category
+        """
+        return self.grouped_uses_count(self.categories, self.species_mask(taxonomy, countries, years), categories)
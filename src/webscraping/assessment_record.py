@@ -0,0 +1,249 @@
+from operator import itemgetter
+from json import dumps, loads
+
+TAXON_KEYS = ["scientific_name", "sis_id", "kingdom_name", "phylum_name", "class_name", "order_name", "family_name"]
+# Columns of a table of records, named as pd.json_normalize names them
+COLUMNS = ["assessment_id", "year_published", "locations", "use_and_trade", "threats", "red_list_category"] + \
+          [f"taxon.{key}" for key in TAXON_KEYS]
+
+taxon_values = itemgetter(*TAXON_KEYS)
+
+class MalformedRecord(ValueError):
+    """
+    A record, or an API response, without the fields of an assessment or with fields of the
+    wrong type.
+    """
+
+def record_values(record: dict) -> tuple:
+    """
+    Reads the fields of a decoded record, checking their types as they are read: integer IDs,
+    a string scientific name and countries, lists of strings for the uses and threats, and
+    strings or nulls elsewhere (the year may also be an integer). The assessment ID may be
+    null or missing, as in the files written before it was recorded. The record is walked
+    only once, while its values are read, which adds about a tenth to the time json.loads
+    takes to decode it.
+
+    Parameters:
+        record (dict): Decoded record.
+
+    Returns:
+        tuple: Values of the COLUMNS, if the record is valid.
+    """
+    try:
+        assessment_id = record.get("assessment_id")
+        if assessment_id is not None and type(assessment_id) is not int:
+            raise MalformedRecord(f"assessment_id is {assessment_id!r}")
+        year_published = record["year_published"]
+        if not (year_published is None or type(year_published) is str or type(year_published) is int):
+            raise MalformedRecord(f"year_published is {year_published!r}")
+        red_list_category = record["red_list_category"]
+        if red_list_category is not None and type(red_list_category) is not str:
+            raise MalformedRecord(f"red_list_category is {red_list_category!r}")
+        taxon = taxon_values(record["taxon"])
+        if type(taxon[0]) is not str or type(taxon[1]) is not int:
+            raise MalformedRecord(f"taxon is {record['taxon']!r}")
+        for value in taxon[2:]:
+            if value is not None and type(value) is not str:
+                raise MalformedRecord(f"taxon is {record['taxon']!r}")
+        locations = record["locations"]
+        if type(locations) is not list:
+            raise MalformedRecord(f"locations is {locations!r}")
+        for location in locations:
+            presence = location["presence"]
+            if type(location["country"]) is not str or (presence is not None and type(presence) is not str) or len(location) != 2:
+                raise MalformedRecord(f"location is {location!r}")
+        use_and_trade = record["use_and_trade"]
+        threats = record["threats"]
+        for field, values in (("use_and_trade", use_and_trade), ("threats", threats)):
+            if type(values) is not list:
+                raise MalformedRecord(f"{field} is {values!r}")
+            for value in values:
+                if type(value) is not str:
+                    raise MalformedRecord(f"{field} is {values!r}")
+    except (KeyError, TypeError) as e:
+        raise MalformedRecord(f"missing field {e}") from e
+    return (assessment_id, year_published, locations, use_and_trade, threats, red_list_category) + taxon
+
+def validate(record: dict) -> dict:
+    """
+    Checks that a decoded record has every field of an assessment, with the right types (see
+    record_values).
+
+    Parameters:
+        record (dict): Decoded record.
+
+    Returns:
+        dict: The record, if it is valid.
+    """
+    record_values(record)
+    return record
+
+def parse(line) -> dict:
+    """
+    Parameters:
+        line (str or bytes): Record serialized as a single line.
+
+    Returns:
+        dict: The decoded record, not validated.
+    """
+    try:
+        record = loads(line)
+    except ValueError as e:
+        raise MalformedRecord(f"invalid JSON: {e}") from e
+    if type(record) is not dict:
+        raise MalformedRecord(f"record is {record!r}")
+    return record
+
+def decode(line) -> dict:
+    """
+    Parameters:
+        line (str or bytes): Record serialized as a single line.
+
+    Returns:
+        dict: The decoded record, if it is valid.
+    """
+    return validate(parse(line))
+
+class Taxon:
+    """
+    Taxonomy of the species of an assessment.
+    """
+    __slots__ = tuple(TAXON_KEYS)
+
+    def __init__(self, scientific_name, sis_id, kingdom_name, phylum_name, class_name, order_name, family_name):
+        self.scientific_name = scientific_name
+        self.sis_id = sis_id
+        self.kingdom_name = kingdom_name
+        self.phylum_name = phylum_name
+        self.class_name = class_name
+        self.order_name = order_name
+        self.family_name = family_name
+
+    def values(self) -> tuple:
+        """
+        Returns:
+            tuple: Values of the fields, in the order of TAXON_KEYS.
+        """
+        return (self.scientific_name, self.sis_id, self.kingdom_name, self.phylum_name, self.class_name, self.order_name,
+                self.family_name)
+
+class Location:
+    """
+    Country where the species of an assessment is found, and its presence there.
+    """
+    __slots__ = ("country", "presence")
+
+    def __init__(self, country, presence):
+        self.country = country
+        self.presence = presence
+
+class AssessmentRecord:
+    """
+    Assessment in the format written by pull-api.py, one JSON object per line, and read by
+    json-test.py and clear_assessments.py. Records are validated when they are built or
+    decoded, so malformed responses and lines fail here rather than later in the pipeline.
+    Records of files written before the assessment ID was recorded are read with a null one.
+
+    The lists are stored as tuples and the nested objects as slotted classes, which take less
+    than half the memory of the decoded dictionaries.
+    """
+    __slots__ = ("assessment_id", "year_published", "taxon", "locations", "use_and_trade", "threats", "red_list_category")
+
+    def __init__(self, assessment_id: int, year_published, taxon: Taxon, locations: tuple, use_and_trade: tuple, threats: tuple,
+                 red_list_category):
+        self.assessment_id = assessment_id
+        self.year_published = year_published
+        self.taxon = taxon
+        self.locations = locations
+        self.use_and_trade = use_and_trade
+        self.threats = threats
+        self.red_list_category = red_list_category
+
+    @classmethod
+    def from_response(cls, response: dict) -> "AssessmentRecord":
+        """
+        Selects the fields of a response of the /assessment endpoint of the API.
+
+        Parameters:
+            response (dict): Decoded JSON body of the response.
+
+        Returns:
+            AssessmentRecord: The record.
+        """
+        try:
+            record = {"assessment_id": response["assessment_id"],
+                      "year_published": response["year_published"],
+                      "taxon": {i: response["taxon"][i] for i in TAXON_KEYS},
+                      "locations": [{"country": i["description"]["en"], "presence": i["presence"]} for i in response["locations"]],
+                      "use_and_trade": [i["description"]["en"] for i in response["use_and_trade"]],
+                      "threats": [i["description"]["en"] for i in response["threats"]],
+                      "red_list_category": response["red_list_category"]["code"]}
+        except (KeyError, TypeError) as e:
+            raise MalformedRecord(f"missing field {e}") from e
+        return cls.from_dict(record)
+
+    @classmethod
+    def from_dict(cls, record: dict, check: bool = True) -> "AssessmentRecord":
+        """
+        Parameters:
+            record (dict): Decoded record, as written by to_json.
+            check (bool): Validate the record. False if it was already validated.
+
+        Returns:
+            AssessmentRecord: The record, if it is valid.
+        """
+        if check:
+            assessment_id, year_published, locations, use_and_trade, threats, red_list_category, *taxon = record_values(record)
+        else:
+            assessment_id, year_published, locations, use_and_trade, threats, red_list_category = \
+                record.get("assessment_id"), record["year_published"], record["locations"], record["use_and_trade"], \
+                record["threats"], record["red_list_category"]
+            taxon = taxon_values(record["taxon"])
+        return cls(assessment_id, year_published, Taxon(*taxon), tuple(Location(i["country"], i["presence"]) for i in locations),
+                   tuple(use_and_trade), tuple(threats), red_list_category)
+
+    @classmethod
+    def from_json(cls, line) -> "AssessmentRecord":
+        """
+        Parameters:
+            line (str or bytes): Record serialized as a single line.
+
+        Returns:
+            AssessmentRecord: The record, if it is valid.
+        """
+        return cls.from_dict(parse(line))
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: The record as a JSON object, with the keys in the order of the output files.
+        """
+        return {"assessment_id": self.assessment_id,
+                "year_published": self.year_published,
+                "taxon": dict(zip(TAXON_KEYS, self.taxon.values())),
+                "locations": [{"country": i.country, "presence": i.presence} for i in self.locations],
+                "use_and_trade": list(self.use_and_trade),
+                "threats": list(self.threats),
+                "red_list_category": self.red_list_category}
+
+    def to_json(self) -> str:
+        """
+        Returns:
+            str: The record serialized as a single line, without the newline.
+        """
+        return dumps(self.to_dict())
+
+    @staticmethod
+    def row_from_json(line) -> tuple:
+        """
+        Decodes and validates a line straight into its row of a table of records, without
+        building the record, for readers that only need the table.
+
+        Parameters:
+            line (str or bytes): Record serialized as a single line.
+
+        Returns:
+            tuple: Values of the COLUMNS. The lists are lists and each location a dictionary,
+            as in the decoded JSON.
+        """
+        return record_values(parse(line))
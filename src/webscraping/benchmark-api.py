@@ -0,0 +1,122 @@
+from contextlib import redirect_stdout
+from time import perf_counter
+from json import dumps
+import importlib.util
+import tempfile
+import sys
+import io
+import os
+from mock_api import MockConfig, start_server
+from crawl_journal import CrawlJournal
+from ndjson_io import open_ndjson
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SPECIES_COUNT = 500 # Species requested by each configuration
+FIRST_SPECIES_ID = 10000
+BENCHMARK_FILE = "" # JSON lines file to append the results to. Empty to only print them
+
+# Mock API: 30 requests per second on average, enforced over 10-second windows, with rare bursts of 429
+MOCK_CONFIG = MockConfig(latency=0.05, jitter=0.1, not_found_rate=0.01, burst_rate=0.002, burst_duration=2.0,
+                         quota=300, window=10.0)
+
+# Each configuration overrides constants of pull-api.py
+CONFIGURATIONS = [
+    {"FETCH_MODE": "threads", "THREAD_COUNT": 16, "REQUESTS_PER_SECOND": 30, "BURST_SIZE": 10},
+    {"FETCH_MODE": "async", "ASYNC_WORKERS": 16, "ADAPTIVE_CONCURRENCY": False, "REQUESTS_PER_SECOND": 30, "BURST_SIZE": 10},
+    {"FETCH_MODE": "async", "ASYNC_WORKERS": 64, "ADAPTIVE_CONCURRENCY": False, "REQUESTS_PER_SECOND": 30, "BURST_SIZE": 10},
+    {"FETCH_MODE": "async", "ASYNC_WORKERS": 64, "ADAPTIVE_CONCURRENCY": True, "REQUESTS_PER_SECOND": 30, "BURST_SIZE": 10},
+    {"FETCH_MODE": "async", "ASYNC_WORKERS": 64, "ADAPTIVE_CONCURRENCY": True, "REQUESTS_PER_SECOND": 1000, "BURST_SIZE": 10},
+]
+
+def load_crawler():
+    """
+    Imports a fresh copy of pull-api.py, so each configuration starts from its default
+    constants.
+
+    Returns:
+        module: The pull-api.py module.
+    """
+    spec = importlib.util.spec_from_file_location("pull_api", os.path.join(BASE_DIR, "pull-api.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["pull_api"] = module # Lets multiprocessing find its functions
+    spec.loader.exec_module(module)
+    return module
+
+def run_configuration(server, overrides: dict) -> dict:
+    """
+    Runs a full crawl of SPECIES_COUNT species against the mock API in a temporary
+    directory.
+
+    Parameters:
+        server (MockServer): Running mock API.
+        overrides (dict): Constants of pull-api.py to change.
+
+    Returns:
+        dict: Completion time, request rates, quota utilisation and completeness of the crawl.
+    """
+    crawler = load_crawler()
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            with open("ids.txt", "w") as file:
+                for i in range(FIRST_SPECIES_ID, FIRST_SPECIES_ID + SPECIES_COUNT):
+                    file.write(f"{i}\n")
+            crawler.ID_LIST_FILE = "ids.txt"
+            crawler.API_URL = server.url
+            crawler.CACHE_DIR = ""
+            for key, value in overrides.items():
+                setattr(crawler, key, value)
+
+            server.reset()
+            start = perf_counter()
+            with redirect_stdout(io.StringIO()):
+                crawler.main()
+            elapsed = perf_counter() - start
+
+            with open_ndjson(crawler.OUTPUT_FILE) as file:
+                records = sum(1 for line in file)
+            journal = CrawlJournal(crawler.JOURNAL_FILE)
+            counts = journal.counts()
+            journal.close()
+        finally:
+            os.chdir(previous_directory)
+
+    statuses = dict(server.statuses)
+    requests = sum(statuses.values())
+    answered = requests - statuses.get(429, 0)
+    config = server.config
+    # The quota is counted over fixed windows, so a full quota can be answered at once at the start of the run, on top of its
+    # average rate
+    allowed = config.quota * (elapsed / config.window + 1) if config.quota else None
+    return {"configuration": overrides,
+            "seconds": round(elapsed, 2),
+            "requests": requests,
+            "requests_per_second": round(requests / elapsed, 2),
+            "successful_per_second": round(statuses.get(200, 0) / elapsed, 2),
+            "answered_per_second": round(answered / elapsed, 2),
+            "quota_per_second": round(config.quota / config.window, 2) if config.quota else None,
+            "throttled": statuses.get(429, 0),
+            "quota_utilisation": round(answered / allowed, 3) if allowed else None,
+            "assessments_written": records,
+            "journal": counts}
+
+def main():
+    server = start_server(MOCK_CONFIG)
+    quota_per_second = f" (quota {MOCK_CONFIG.quota / MOCK_CONFIG.window:g}/s)" if MOCK_CONFIG.quota else ""
+    print(f"{'configuration':<80} {'time (s)':>9} {'req/s':>7} {'ok/s':>7} {'answered/s':>10} {'429s':>6} {'quota':>6} {'records':>8}"
+          f"{quota_per_second}")
+    for overrides in CONFIGURATIONS:
+        result = run_configuration(server, overrides)
+        name = ", ".join(f"{k}={v}" for k, v in overrides.items())
+        quota = f"{result['quota_utilisation']:.0%}" if result["quota_utilisation"] is not None else "-"
+        print(f"{name:<80} {result['seconds']:>9} {result['requests_per_second']:>7} {result['successful_per_second']:>7} "
+              f"{result['answered_per_second']:>10} {result['throttled']:>6} {quota:>6} {result['assessments_written']:>8}")
+        if BENCHMARK_FILE:
+            with open(BENCHMARK_FILE, "a") as file:
+                file.write(dumps(result))
+                file.write("\n")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
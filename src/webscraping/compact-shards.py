@@ -0,0 +1,180 @@
+from heapq import merge
+from glob import glob
+import tempfile
+import re
+import os
+from ndjson_io import open_binary
+from assessment_record import decode
+
+INPUT_FILES = [] # Output files or shards of pull-api.py (e.g. "*.json" for the shards of old crawls), plain or compressed. Glob patterns are expanded
+OUTPUT_FILE = "assessments.json.gz" # Merged, sorted and deduplicated output. Compressed according to the extension (.gz, .zst or .json)
+RUN_SIZE = 256 * 1024 * 1024 # Bytes of records sorted in memory at once. Larger inputs are sorted in runs written to TEMP_DIR and merged
+TEMP_DIR = None # Directory of the sorted runs, None for the system default
+
+# The records are written by json.dumps, so the key can be read without decoding the lines
+SIS_ID = re.compile(rb'"sis_id": (\d+)')
+YEAR = re.compile(rb'"year_published": (?:"(\d*)"|null)')
+CATEGORY = re.compile(rb'"red_list_category": (?:"([^"]*)"|null)')
+
+def record_key(line: bytes) -> tuple:
+    """
+    Reads the deduplication key of a record: the species, the year and the category of the
+    assessment.
+
+    Parameters:
+        line (bytes): Record written by pull-api.py, as one JSON line.
+
+    Returns:
+        tuple: (sis_id, year, category). A missing year sorts first as -1 and a missing
+        category as "".
+    """
+    sis_id, year, category = SIS_ID.search(line), YEAR.search(line), CATEGORY.search(line)
+    if sis_id and year and category:
+        return (int(sis_id.group(1)), int(year.group(1) or -1), (category.group(1) or b"").decode())
+    record = decode(line) # Records not written by json.dumps with the default separators
+    year = record.get("year_published")
+    return (int(record["taxon"]["sis_id"]), int(year) if year else -1, record.get("red_list_category") or "")
+
+def read_records(paths: list):
+    """
+    Streams the records of several files, skipping empty lines.
+
+    Parameters:
+        paths (list): Paths of the files, read in order.
+
+    Yields:
+        bytes: Each record, ending with a newline.
+    """
+    for path in paths:
+        with open_binary(path) as file:
+            for line in file:
+                if line.strip():
+                    yield line if line.endswith(b"\n") else line + b"\n"
+
+def sorted_runs(records, run_size: int):
+    """
+    Splits the records in runs of about run_size bytes, each sorted by key and
+    deduplicated. Python's sort is stable, so the first of duplicate records is kept.
+
+    Parameters:
+        records (iterable): Records as bytes.
+        run_size (int): Bytes of records per run.
+
+    Yields:
+        list: Sorted (key, record) pairs of each run.
+    """
+    run = []
+    size = 0
+    for line in records:
+        run.append((record_key(line), line))
+        size += len(line)
+        if size >= run_size:
+            yield unique(sorted(run, key=lambda item: item[0]))
+            run = []
+            size = 0
+    if run:
+        yield unique(sorted(run, key=lambda item: item[0]))
+
+def unique(items):
+    """
+    Parameters:
+        items (iterable): (key, record) pairs sorted by key.
+
+    Returns:
+        list: The first pair of each key.
+    """
+    result = []
+    last = None
+    for key, line in items:
+        if key != last:
+            result.append((key, line))
+            last = key
+    return result
+
+def write_run(run: list, directory: str) -> str:
+    """
+    Writes a sorted run to a temporary file, each record preceded by its key.
+
+    Parameters:
+        run (list): Sorted (key, record) pairs.
+        directory (str): Directory of the temporary file.
+
+    Returns:
+        str: Path of the run.
+    """
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "wb") as file:
+        for (sis_id, year, category), line in run:
+            file.write(f"{sis_id}\t{year}\t{category}\t".encode())
+            file.write(line)
+    return path
+
+def read_run(path: str):
+    """
+    Parameters:
+        path (str): Path of a run written by write_run.
+
+    Yields:
+        tuple: (key, record) pairs of the run, in order.
+    """
+    with open(path, "rb") as file:
+        for line in file:
+            sis_id, year, category, record = line.split(b"\t", 3)
+            yield (int(sis_id), int(year), category.decode()), record
+
+def compact(paths: list, output: str, run_size: int = RUN_SIZE, temp_dir=None) -> tuple:
+    """
+    Merges record files into a single file sorted by (sis_id, year, category), keeping the
+    first record of each key. Inputs larger than run_size are sorted in runs on disk, which
+    are then merged k-way, so memory stays bounded by run_size.
+
+    Parameters:
+        paths (list): Input files.
+        output (str): Output file.
+        run_size (int): Bytes of records sorted in memory at once.
+        temp_dir (str): Directory of the sorted runs, None for the system default.
+
+    Returns:
+        tuple: Number of records read and written.
+    """
+    records = 0
+    def counted():
+        nonlocal records
+        for line in read_records(paths):
+            records += 1
+            yield line
+
+    with tempfile.TemporaryDirectory(dir=temp_dir) as directory:
+        runs = []
+        first = None
+        for run in sorted_runs(counted(), run_size):
+            if first is None:
+                first = run # Kept in memory in case it is the only run
+                continue
+            if not runs:
+                runs.append(write_run(first, directory))
+            runs.append(write_run(run, directory))
+        if runs:
+            merged = merge(*(read_run(path) for path in runs), key=lambda item: item[0])
+        else:
+            merged = iter(first or [])
+
+        written = 0
+        last = None
+        with open_binary(output, "w") as file:
+            for key, line in merged:
+                if key != last:
+                    file.write(line)
+                    written += 1
+                    last = key
+    return records, written
+
+def main():
+    paths = [f for pattern in INPUT_FILES for f in (sorted(glob(pattern)) or [pattern])]
+    if os.path.abspath(OUTPUT_FILE) in {os.path.abspath(f) for f in paths}:
+        raise ValueError("OUTPUT_FILE must not be one of the input files")
+    records, written = compact(paths, OUTPUT_FILE, RUN_SIZE, TEMP_DIR)
+    print(f"{records} records read from {len(paths)} files, {written} written to {OUTPUT_FILE} ({records - written} duplicates removed)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+from threading import Lock
+import sqlite3
+
+PENDING = "pending"
+DONE = "done"
+NOT_FOUND = "404"
+FAILED = "failed"
+
+class CrawlJournal:
+    """
+    SQLite journal of the state of every species and assessment of a crawl.
+
+    A species is "done" once its list of assessments has been stored; an assessment is
+    "done" once its formatted record has been written to the output file. Updates are
+    committed in batches, so an interrupted crawl restarts from the last commit and never
+    requests again an assessment that is already saved.
+    """
+
+    def __init__(self, path: str, commit_every: int = 200):
+        """
+        Parameters:
+            path (str): Path of the SQLite file, created if it does not exist.
+            commit_every (int): Number of updates grouped in a single transaction.
+        """
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS species (sis_id INTEGER PRIMARY KEY, state TEXT NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS assessments (assessment_id INTEGER PRIMARY KEY, sis_id INTEGER NOT NULL, state TEXT NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS assessments_sis_id ON assessments (sis_id)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value)")
+        self.connection.commit()
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        self.lock = Lock()
+
+    def execute(self, query: str, parameters=()) -> None:
+        """
+        Runs an update and commits it once enough updates are pending.
+
+        Parameters:
+            query (str): SQL statement.
+            parameters (iterable): Parameters for a single statement, or a list of parameter
+                tuples to run it once per tuple.
+        """
+        with self.lock:
+            if isinstance(parameters, list):
+                self.connection.executemany(query, parameters)
+                self.uncommitted += len(parameters)
+            else:
+                self.connection.execute(query, parameters)
+                self.uncommitted += 1
+            if self.uncommitted >= self.commit_every:
+                self.connection.commit()
+                self.uncommitted = 0
+
+    def commit(self) -> None:
+        """
+        Commits all pending updates.
+        """
+        with self.lock:
+            self.connection.commit()
+            self.uncommitted = 0
+
+    def close(self) -> None:
+        """
+        Commits pending updates and closes the database.
+        """
+        self.commit()
+        self.connection.close()
+
+    def add_species(self, species_ids: list) -> None:
+        """
+        Registers species as pending. Species already in the journal keep their state.
+
+        Parameters:
+            species_ids (list): Species IDs to register.
+        """
+        self.execute("INSERT OR IGNORE INTO species VALUES (?, ?)", [(i, PENDING) for i in species_ids])
+        self.commit()
+
+    def refresh_species(self) -> None:
+        """
+        Marks every species as pending again, so their assessment lists are requested anew.
+        Assessments keep their state, so only the ones not seen before will be fetched.
+        """
+        self.execute("UPDATE species SET state = ? WHERE state IN (?, ?)", (PENDING, DONE, NOT_FOUND))
+        self.commit()
+
+    def set_species(self, sis_id: int, state: str, assessment_ids: list = ()) -> None:
+        """
+        Updates the state of a species. Its assessments are registered as pending.
+
+        Parameters:
+            sis_id (int): Species ID.
+            state (str): New state of the species.
+            assessment_ids (list): IDs of the assessments listed by the API for the species.
+        """
+        if assessment_ids:
+            self.execute("INSERT OR IGNORE INTO assessments VALUES (?, ?, ?)", [(i, sis_id, PENDING) for i in assessment_ids])
+        self.execute("UPDATE species SET state = ? WHERE sis_id = ?", (state, sis_id))
+
+    def set_assessments(self, assessment_ids: list, state: str) -> None:
+        """
+        Updates the state of a group of assessments.
+
+        Parameters:
+            assessment_ids (list): Assessment IDs.
+            state (str): New state of the assessments.
+        """
+        self.execute("UPDATE assessments SET state = ? WHERE assessment_id = ?", [(state, i) for i in assessment_ids])
+
+    def unfinished_species(self) -> list:
+        """
+        Returns:
+            list: IDs of species whose assessment list was not fetched yet, or that still have
+            assessments to fetch.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT sis_id FROM species WHERE state IN (?, ?) "
+                "UNION SELECT sis_id FROM assessments WHERE state IN (?, ?)",
+                (PENDING, FAILED, PENDING, FAILED)).fetchall()
+        return [row[0] for row in rows]
+
+    def assessments_of(self, sis_id: int):
+        """
+        Returns the assessments already known for a species.
+
+        Parameters:
+            sis_id (int): Species ID.
+
+        Returns:
+            dict | None: Mapping of assessment ID to state, or None if the assessment list of
+            the species was not fetched yet.
+        """
+        with self.lock:
+            state = self.connection.execute("SELECT state FROM species WHERE sis_id = ?", (sis_id,)).fetchone()
+            if state is None or state[0] != DONE:
+                return None
+            rows = self.connection.execute("SELECT assessment_id, state FROM assessments WHERE sis_id = ?", (sis_id,)).fetchall()
+        return dict(rows)
+
+    def species(self) -> list:
+        """
+        Returns:
+            list: (sis_id, state) of every species of the journal.
+        """
+        with self.lock:
+            return self.connection.execute("SELECT sis_id, state FROM species").fetchall()
+
+    def known_assessments(self) -> list:
+        """
+        Returns:
+            list: (sis_id, assessment_id) of every assessment listed by the API for the
+            species of the journal, except the ones the API answered 404 for.
+        """
+        with self.lock:
+            return self.connection.execute("SELECT sis_id, assessment_id FROM assessments WHERE state != ?", (NOT_FOUND,)).fetchall()
+
+    def get_value(self, key: str):
+        """
+        Parameters:
+            key (str): Name of a value stored with set_value.
+
+        Returns:
+            The stored value, or None if there is none.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_value(self, key: str, value) -> None:
+        """
+        Stores a value, such as the size of the output file at the last checkpoint, in the
+        same transactions as the states.
+
+        Parameters:
+            key (str): Name of the value.
+            value (int | float | str): Value to store.
+        """
+        self.execute("INSERT OR REPLACE INTO settings VALUES (?, ?)", (key, value))
+
+    def counts(self) -> dict:
+        """
+        Returns:
+            dict: Number of species and assessments in each state.
+        """
+        with self.lock:
+            species = self.connection.execute("SELECT state, COUNT(*) FROM species GROUP BY state").fetchall()
+            assessments = self.connection.execute("SELECT state, COUNT(*) FROM assessments GROUP BY state").fetchall()
+        return {"species": dict(species), "assessments": dict(assessments)}
@@ -0,0 +1,271 @@
+from threading import Thread, Lock, Event
+from time import monotonic, time
+from bisect import bisect_left
+from json import dumps
+import os
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0) # Upper bounds, in seconds, of the latency histograms
+
+class CrawlMetrics:
+    """
+    Thread-safe counters of a crawl: responses by endpoint and status code, latency
+    histograms, bytes downloaded, cache hits, retries, records produced and jobs left.
+
+    Gauges are callables evaluated at each snapshot, so values owned by other objects, such
+    as the adaptive concurrency or the writer queue, are read without being copied here.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Parameters:
+            buckets (tuple): Upper bounds of the latency histogram buckets, in seconds.
+        """
+        self.buckets = tuple(buckets)
+        self.lock = Lock()
+        self.started = monotonic()
+        self.statuses = {} # (endpoint, status) -> responses
+        self.histograms = {} # endpoint -> [count per bucket, last one for larger values]
+        self.latency_sum = {}
+        self.bytes = {}
+        self.cache_hits = {}
+        self.retries = {}
+        self.records = 0
+        self.jobs_total = 0
+        self.jobs_finished = 0
+        self.processing_seconds = 0.0
+        self.throttled_seconds = 0.0
+        self.gauges = {}
+        self.previous = (self.started, 0, 0) # Time, finished jobs and records of the last snapshot
+
+    def observe(self, endpoint: str, status, seconds: float, size: int = 0) -> None:
+        """
+        Records a response from the API.
+
+        Parameters:
+            endpoint (str): Key of ENDPOINTS requested.
+            status (int): Status code, or None if no response was received.
+            seconds (float): Time between sending the request and reading the body.
+            size (int): Bytes of the response body.
+        """
+        status = "error" if status is None else str(status)
+        with self.lock:
+            self.statuses[(endpoint, status)] = self.statuses.get((endpoint, status), 0) + 1
+            histogram = self.histograms.setdefault(endpoint, [0] * (len(self.buckets) + 1))
+            histogram[bisect_left(self.buckets, seconds)] += 1
+            self.latency_sum[endpoint] = self.latency_sum.get(endpoint, 0.0) + seconds
+            self.bytes[endpoint] = self.bytes.get(endpoint, 0) + size
+
+    def cache_hit(self, endpoint: str) -> None:
+        """
+        Parameters:
+            endpoint (str): Key of ENDPOINTS answered from the cache.
+        """
+        with self.lock:
+            self.cache_hits[endpoint] = self.cache_hits.get(endpoint, 0) + 1
+
+    def retry(self, endpoint: str) -> None:
+        """
+        Parameters:
+            endpoint (str): Key of ENDPOINTS of a job queued again after a failure.
+        """
+        with self.lock:
+            self.retries[endpoint] = self.retries.get(endpoint, 0) + 1
+
+    def add_jobs(self, n: int = 1) -> None:
+        """
+        Parameters:
+            n (int): Number of jobs added to the queue.
+        """
+        with self.lock:
+            self.jobs_total += n
+
+    def finish_job(self, seconds: float, record: bool = False) -> None:
+        """
+        Records a job that will not be queued again, whether it succeeded or not.
+
+        Parameters:
+            seconds (float): Time spent processing the response (decoding, formatting and
+                updating the journal).
+            record (bool): True if the job produced an assessment for the output.
+        """
+        with self.lock:
+            self.jobs_finished += 1
+            self.processing_seconds += seconds
+            if record:
+                self.records += 1
+
+    def throttled(self, seconds: float) -> None:
+        """
+        Parameters:
+            seconds (float): Time a worker spent waiting after being throttled.
+        """
+        with self.lock:
+            self.throttled_seconds += seconds
+
+    def gauge(self, name: str, function) -> None:
+        """
+        Registers a gauge.
+
+        Parameters:
+            name (str): Name of the gauge.
+            function (callable): Returns the current value of the gauge.
+        """
+        self.gauges[name] = function
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: Current values of all counters and gauges, with the record and job rates
+            and the estimated time left, computed over the interval since the previous
+            snapshot.
+        """
+        now = monotonic()
+        with self.lock:
+            previous_time, previous_jobs, previous_records = self.previous
+            interval = max(now - previous_time, 1e-9)
+            job_rate = (self.jobs_finished - previous_jobs) / interval
+            record_rate = (self.records - previous_records) / interval
+            left = self.jobs_total - self.jobs_finished
+            elapsed = now - self.started
+            snapshot = {"time": round(time(), 3),
+                        "elapsed_seconds": round(elapsed, 3),
+                        "responses": {f"{e} {s}": n for (e, s), n in sorted(self.statuses.items())},
+                        "latency_buckets": list(self.buckets),
+                        "latency_histograms": {e: list(h) for e, h in self.histograms.items()},
+                        "latency_sum_seconds": {e: round(s, 3) for e, s in self.latency_sum.items()},
+                        "bytes": dict(self.bytes),
+                        "cache_hits": dict(self.cache_hits),
+                        "retries": dict(self.retries),
+                        "records": self.records,
+                        "records_per_second": round(record_rate, 3),
+                        "records_per_second_overall": round(self.records / max(elapsed, 1e-9), 3),
+                        "jobs_total": self.jobs_total,
+                        "jobs_finished": self.jobs_finished,
+                        "jobs_per_second": round(job_rate, 3),
+                        "eta_seconds": round(left / job_rate, 1) if job_rate > 0 else None,
+                        "processing_seconds": round(self.processing_seconds, 3),
+                        "throttled_seconds": round(self.throttled_seconds, 3)}
+            self.previous = (now, self.jobs_finished, self.records)
+        for name, function in self.gauges.items():
+            snapshot[name] = function()
+        return snapshot
+
+def prometheus_text(snapshot: dict, prefix: str = "iucn_crawl") -> str:
+    """
+    Formats a snapshot in the Prometheus text exposition format, e.g. for the textfile
+    collector of node_exporter.
+
+    Parameters:
+        snapshot (dict): Result of CrawlMetrics.snapshot.
+        prefix (str): Prefix of the metric names.
+
+    Returns:
+        str: Metrics in Prometheus text format.
+    """
+    lines = [f"# TYPE {prefix}_responses_total counter"]
+    for name, n in snapshot["responses"].items():
+        endpoint, status = name.split(" ")
+        lines.append(f'{prefix}_responses_total{{endpoint="{endpoint}",status="{status}"}} {n}')
+
+    lines.append(f"# TYPE {prefix}_request_seconds histogram")
+    bounds = [str(b) for b in snapshot["latency_buckets"]] + ["+Inf"]
+    for endpoint, histogram in snapshot["latency_histograms"].items():
+        cumulative = 0
+        for bound, n in zip(bounds, histogram):
+            cumulative += n
+            lines.append(f'{prefix}_request_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+        lines.append(f'{prefix}_request_seconds_sum{{endpoint="{endpoint}"}} {snapshot["latency_sum_seconds"][endpoint]}')
+        lines.append(f'{prefix}_request_seconds_count{{endpoint="{endpoint}"}} {cumulative}')
+
+    for key, metric in (("bytes", "bytes_total"), ("cache_hits", "cache_hits_total"), ("retries", "retries_total")):
+        lines.append(f"# TYPE {prefix}_{metric} counter")
+        for endpoint, n in snapshot[key].items():
+            lines.append(f'{prefix}_{metric}{{endpoint="{endpoint}"}} {n}')
+
+    for key in ("records", "jobs_finished", "processing_seconds", "throttled_seconds"):
+        lines.append(f"# TYPE {prefix}_{key}_total counter")
+        lines.append(f"{prefix}_{key}_total {snapshot[key]}")
+    skipped = {"time", "responses", "latency_buckets", "latency_histograms", "latency_sum_seconds", "bytes", "cache_hits",
+               "retries", "records", "jobs_finished", "processing_seconds", "throttled_seconds"}
+    for key, value in snapshot.items():
+        if key not in skipped and isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+    return "\n".join(lines) + "\n"
+
+def progress_line(snapshot: dict) -> str:
+    """
+    Parameters:
+        snapshot (dict): Result of CrawlMetrics.snapshot.
+
+    Returns:
+        str: One-line summary of the progress of the crawl.
+    """
+    eta = snapshot["eta_seconds"]
+    eta = f"{int(eta // 3600)}h{int(eta % 3600 // 60):02d}m{int(eta % 60):02d}s" if eta is not None else "?"
+    errors = sum(n for name, n in snapshot["responses"].items() if not name.endswith((" 200", " 404")))
+    line = (f"[{snapshot['elapsed_seconds']:.0f}s] {snapshot['jobs_finished']}/{snapshot['jobs_total']} jobs, "
+            f"{snapshot['records']} records ({snapshot['records_per_second']:.1f}/s), "
+            f"{sum(snapshot['bytes'].values()) / 1e6:.1f} MB, {errors} throttled/errors, "
+            f"{sum(snapshot['retries'].values())} retries, ETA {eta}")
+    if snapshot.get("concurrency") is not None:
+        line += f", concurrency {snapshot['concurrency']}"
+    return line
+
+class MetricsReporter(Thread):
+    """
+    Thread taking a snapshot of the metrics every `interval` seconds, printing a progress
+    line and writing the snapshot to a file: appended as a JSON line, or replacing the whole
+    file in Prometheus text format if its name ends with .prom.
+    """
+
+    def __init__(self, metrics: CrawlMetrics, path: str = "", interval: float = 10.0, verbose: bool = True):
+        """
+        Parameters:
+            metrics (CrawlMetrics): Metrics of the crawl.
+            path (str): Metrics file, empty to only print the progress.
+            interval (float): Seconds between snapshots.
+            verbose (bool): Print a progress line with each snapshot.
+        """
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.verbose = verbose
+        self.stopped = Event()
+
+    def report(self) -> dict:
+        """
+        Takes a snapshot and writes it out.
+
+        Returns:
+            dict: The snapshot.
+        """
+        snapshot = self.metrics.snapshot()
+        if self.verbose:
+            print(progress_line(snapshot), flush=True)
+        if self.path.endswith(".prom"):
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w") as file:
+                file.write(prometheus_text(snapshot))
+            os.replace(temporary, self.path) # Scrapers never see a partial file
+        elif self.path:
+            with open(self.path, "a") as file:
+                file.write(dumps(snapshot))
+                file.write("\n")
+        return snapshot
+
+    def stop(self) -> dict:
+        """
+        Stops the thread and writes a final snapshot.
+
+        Returns:
+            dict: The final snapshot.
+        """
+        self.stopped.set()
+        self.join()
+        return self.report()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.report()
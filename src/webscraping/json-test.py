@@ -1,33 +1,237 @@
-from json import loads, dumps
-species = set()
+from multiprocessing import Pool
+from glob import glob
+from itertools import chain
+import numpy as np
+import re
+from crawl_journal import CrawlJournal, DONE, NOT_FOUND, PENDING
+from ndjson_io import open_binary
+from assessment_record import MalformedRecord, decode
 
 # File paths
-ID_LIST_FILE = ""  # File containing original species IDs
-ASSESSMENTS_FILE = ""  # JSON file containing pulled species data
+ID_LIST_FILE = ""  # File containing original species IDs, one per line, or links to species pages
+ASSESSMENTS_FILES = []  # Output files or shards of pull-api.py, plain or compressed (.gz, .zst). Glob patterns are expanded
+JOURNAL_FILE = ""  # Journal of pull-api.py, used to also check the assessments of each species. Empty to only check species
 NEW_ID_LIST_FILE = ""  # Output file for missing species IDs
+MISSING_ASSESSMENTS_FILE = ""  # Output file for missing assessments, one "sis_id,assessment_id" per line. Requires JOURNAL_FILE
+REQUEUE_MISSING = False  # Mark missing species and assessments as pending in JOURNAL_FILE, so the next run of pull-api.py fetches them
+VALIDATE_RECORDS = False  # Also decode and validate every record (see assessment_record.py), reporting malformed lines. Slower than only finding the IDs
+MALFORMED_EXAMPLES = 5  # Malformed lines printed for each file
 
-# Set to store all species IDs from the original file
-total_species = set()
-
-# Read the ID list file and extract species IDs
-with open(ID_LIST_FILE, 'r') as f:
-    l = f.read().split("\n")
-    
-    # Exclude non-species links
-    total_species = {int(s.strip().split("/")[-2]) for s in l if s.strip().split("/")[-3] == "species"}
-
-# Set to store species IDs already pulled
-pulled_species = set()
-
-# Read the assessments JSON file and collect pulled species IDs
-with open(ASSESSMENTS_FILE, 'r') as sample:
-    for line in sample:
-        if len(line) > 0: # Skip empty lines
-            d = loads(line)
-            pulled_species.add(d["taxon"]["sis_id"])
-
-# Find the difference between all species and pulled species
-# Write missing species IDs to a new file
-with open(NEW_ID_LIST_FILE, "w") as f:
-    for i in total_species.difference(pulled_species):
-        f.write(f"{i}\n")
+PROCESSES = 4  # Files scanned in parallel
+BLOCK_SIZE = 1 << 22  # Bytes read at once from each file
+
+# The records are written by json.dumps, so the IDs can be found without decoding the lines
+SIS_ID = re.compile(rb'"sis_id": (\d+)')
+ASSESSMENT_ID = re.compile(rb'"assessment_id": (\d+)')
+
+def sorted_unique(ids) -> np.ndarray:
+    """
+    Parameters:
+        ids (np.ndarray): Integer IDs, in any order and possibly repeated.
+
+    Returns:
+        np.ndarray: Sorted unique IDs. Same as np.unique, which can be much slower on large
+        integer arrays.
+    """
+    ids = np.sort(ids)
+    if len(ids):
+        ids = ids[np.concatenate(([True], ids[1:] != ids[:-1]))]
+    return ids
+
+class IdArray:
+    """
+    Sorted array of unique integer IDs. Added IDs are buffered and merged once the buffer is
+    as large as the array, so adding n IDs costs O(n log n) and memory stays proportional to
+    the number of distinct IDs rather than to the number of lines read.
+    """
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.parts = []
+        self.buffered = 0
+
+    def add(self, ids) -> None:
+        """
+        Parameters:
+            ids (np.ndarray): IDs to add, in any order and possibly repeated.
+        """
+        if len(ids):
+            self.parts.append(sorted_unique(ids))
+            self.buffered += len(self.parts[-1])
+        if self.buffered > max(len(self.ids), 1 << 20):
+            self.compact()
+
+    def compact(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Sorted unique IDs added so far.
+        """
+        if self.parts:
+            self.ids = sorted_unique(np.concatenate([self.ids] + self.parts))
+            self.parts = []
+            self.buffered = 0
+        return self.ids
+
+def parse_ids(matches: list) -> np.ndarray:
+    """
+    Parameters:
+        matches (list): Digits captured by a regular expression, as bytes.
+
+    Returns:
+        np.ndarray: The IDs as integers.
+    """
+    if not matches:
+        return np.empty(0, dtype=np.int64)
+    return np.array(matches).astype(np.int64)
+
+def scan_file(path: str):
+    """
+    Streams an output file of pull-api.py block by block and collects the species and
+    assessment IDs of its records.
+
+    Parameters:
+        path (str): Path of the file.
+
+    Returns:
+        tuple: Path, number of lines, sorted unique species and assessment IDs, number of
+        malformed lines, and the line number and error of the first MALFORMED_EXAMPLES of them.
+    """
+    species = IdArray()
+    assessments = IdArray()
+    lines = 0
+    malformed = 0
+    examples = []
+    rest = b""
+    with open_binary(path) as file:
+        while True:
+            block = file.read(BLOCK_SIZE)
+            if not block:
+                block, rest = rest, b""
+                if not block:
+                    break
+            else:
+                block = rest + block
+                end = block.rfind(b"\n") + 1 # Lines cut at the end of the block are kept for the next one
+                block, rest = block[:end], block[end:]
+            if VALIDATE_RECORDS:
+                for number, line in enumerate(block.splitlines(), lines + 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        decode(line)
+                    except MalformedRecord as e:
+                        malformed += 1
+                        if len(examples) < MALFORMED_EXAMPLES:
+                            examples.append((number, str(e)))
+            lines += block.count(b"\n") + (0 if block.endswith(b"\n") or not block else 1)
+            species.add(parse_ids(SIS_ID.findall(block)))
+            assessments.add(parse_ids(ASSESSMENT_ID.findall(block)))
+    return path, lines, species.compact(), assessments.compact(), malformed, examples
+
+def read_species_list(path: str) -> np.ndarray:
+    """
+    Reads the ID list file, which contains either one species ID per line or links to
+    species pages.
+
+    Parameters:
+        path (str): Path of the file.
+
+    Returns:
+        np.ndarray: Sorted unique species IDs.
+    """
+    ids = []
+    with open(path, 'r') as f:
+        for line in f:
+            s = line.strip()
+            if s.isdigit():
+                ids.append(int(s))
+            elif s:
+                parts = s.split("/")
+                # Exclude non-species links
+                if len(parts) > 3 and parts[-3] == "species":
+                    ids.append(int(parts[-2]))
+    return sorted_unique(np.array(ids, dtype=np.int64))
+
+def expected_from_journal(journal: CrawlJournal):
+    """
+    Parameters:
+        journal (CrawlJournal): Journal of the crawl.
+
+    Returns:
+        tuple: Sorted unique IDs of the species that should have records, of the species that
+        should not (the API answered 404, or listed no assessment for them), and the species
+        and assessment IDs of every assessment that should be in the files.
+    """
+    rows = journal.known_assessments()
+    pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows)).reshape(-1, 2)
+    states = journal.species()
+    sis_ids = np.fromiter((sis_id for sis_id, state in states), dtype=np.int64, count=len(states))
+    state_names = np.array([state for sis_id, state in states])
+    # Species whose list of assessments was fetched are only expected if it is not empty
+    without_assessments = np.setdiff1d(sis_ids[state_names == DONE], pairs[:, 0])
+    excluded = np.union1d(sis_ids[state_names == NOT_FOUND], without_assessments)
+    return np.setdiff1d(sis_ids, excluded), excluded, pairs[:, 0], pairs[:, 1]
+
+def main():
+    files = sorted({f for pattern in ASSESSMENTS_FILES for f in (glob(pattern) or [pattern])})
+    species = IdArray()
+    assessments = IdArray()
+    total_lines = 0
+    total_malformed = 0
+    with Pool(min(PROCESSES, max(len(files), 1))) as pool:
+        for path, lines, file_species, file_assessments, malformed, examples in pool.imap_unordered(scan_file, files):
+            print(f"{path}: {lines} lines, {len(file_species)} species, {len(file_assessments)} assessments"
+                  + (f", {malformed} malformed" if VALIDATE_RECORDS else ""))
+            for number, error in examples:
+                print(f"  line {number}: {error}")
+            total_lines += lines
+            total_malformed += malformed
+            species.add(file_species)
+            assessments.add(file_assessments)
+    pulled_species = species.compact()
+    pulled_assessments = assessments.compact()
+    print(f"Total: {total_lines} lines, {len(pulled_species)} species, {len(pulled_assessments)} assessments"
+          + (f", {total_malformed} malformed" if VALIDATE_RECORDS else ""))
+
+    expected_species = np.empty(0, dtype=np.int64)
+    if ID_LIST_FILE:
+        expected_species = read_species_list(ID_LIST_FILE)
+    journal = CrawlJournal(JOURNAL_FILE) if JOURNAL_FILE else None
+    missing_sis_ids = missing_assessment_ids = np.empty(0, dtype=np.int64)
+    if journal:
+        journal_species, excluded, sis_ids, assessment_ids = expected_from_journal(journal)
+        if ID_LIST_FILE:
+            expected_species = np.setdiff1d(expected_species, excluded, assume_unique=True)
+        else:
+            expected_species = journal_species
+        missing = ~np.isin(assessment_ids, pulled_assessments, assume_unique=True)
+        order = np.lexsort((assessment_ids[missing], sis_ids[missing]))
+        missing_sis_ids, missing_assessment_ids = sis_ids[missing][order], assessment_ids[missing][order]
+        print(f"{len(missing_assessment_ids)} of {len(assessment_ids)} assessments missing, "
+              f"from {len(np.unique(missing_sis_ids))} species")
+
+    # Find the difference between all species and pulled species
+    missing_species = np.setdiff1d(expected_species, pulled_species, assume_unique=True)
+    print(f"{len(missing_species)} of {len(expected_species)} species missing")
+
+    # Write missing species IDs to a new file
+    if NEW_ID_LIST_FILE:
+        with open(NEW_ID_LIST_FILE, "w") as f:
+            for i in missing_species:
+                f.write(f"{i}\n")
+    if MISSING_ASSESSMENTS_FILE:
+        with open(MISSING_ASSESSMENTS_FILE, "w") as f:
+            for sis_id, assessment_id in zip(missing_sis_ids, missing_assessment_ids):
+                f.write(f"{sis_id},{assessment_id}\n")
+    if journal:
+        if REQUEUE_MISSING:
+            journal.add_species(missing_species.tolist())
+            journal.set_assessments(missing_assessment_ids.tolist(), PENDING)
+            with_missing = set(missing_sis_ids.tolist())
+            for sis_id in missing_species.tolist():
+                if sis_id not in with_missing:
+                    journal.set_species(sis_id, PENDING) # Its list of assessments is fetched again
+        journal.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread, Lock
+from time import sleep, monotonic
+from json import dumps
+import random
+
+HOST = "127.0.0.1"
+PORT = 8089
+
+KINGDOMS = {"ANIMALIA": ["CHORDATA", "ARTHROPODA", "MOLLUSCA"], "PLANTAE": ["TRACHEOPHYTA", "BRYOPHYTA"], "FUNGI": ["BASIDIOMYCOTA"]}
+COUNTRIES = ["Brazil", "Mexico", "Indonesia", "Madagascar", "China", "India", "Peru", "Colombia", "Australia", "United States of America",
+             "Ecuador", "Philippines", "Viet Nam", "Papua New Guinea", "Malaysia", "Democratic Republic of the Congo", "Tanzania, United Republic of",
+             "South Africa", "Cameroon", "Kenya", "Thailand", "Myanmar", "Bolivia, Plurinational State of", "Venezuela, Bolivarian Republic of",
+             "Argentina", "Chile", "Japan", "Russian Federation", "Canada", "New Caledonia", "New Zealand", "Sri Lanka", "Nigeria", "Gabon",
+             "Ethiopia", "Costa Rica", "Panama", "Guatemala", "Cuba", "Spain", "France", "Italy", "Greece", "Türkiye", "Iran, Islamic Republic of"]
+USES = ["Food - human", "Food - animal", "Pets/display animals, horticulture", "Medicine - human & veterinary", "Sport hunting/specimen collecting",
+        "Construction or structural materials", "Fuels", "Handicrafts, jewellery, etc.", "Wearing apparel, accessories", "Research",
+        "Manufacturing chemicals", "Other chemicals", "Poisons", "Other household goods", "Unknown"]
+THREATS = ["Agriculture & aquaculture", "Biological resource use", "Natural system modifications", "Residential & commercial development",
+           "Invasive and other problematic species, genes & diseases", "Pollution", "Climate change & severe weather", "Energy production & mining"]
+# Codes of the current categories and of those used before 2001, with their approximate share of assessments
+CATEGORIES = {"LC": 50, "DD": 14, "NT": 7, "VU": 11, "EN": 9, "CR": 6, "EX": 1, "EW": 0.3, "RE": 0.2}
+LEGACY_CATEGORIES = {"LR/lc": 35, "LR/nt": 15, "LR/cd": 3, "V": 15, "E": 10, "R": 5, "I": 4, "K": 4, "T": 1, "Ex": 1, "Ex?": 0.5,
+                     "DD": 5, "VU": 1.5, "EN": 1}
+PRESENCES = ["Extant", "Possibly Extinct", "Extinct Post-1500", "Presence Uncertain"]
+
+class MockConfig:
+    """
+    Behaviour of the mock API.
+
+    Attributes:
+        latency (float): Minimum time, in seconds, to answer a request.
+        jitter (float): Maximum random time added to the latency.
+        not_found_rate (float): Fraction of species and assessment IDs that answer 404.
+        burst_rate (float): Probability that a request starts a burst of 429 responses.
+        burst_duration (float): Seconds during which every request is answered with 429 in a
+            burst. The Retry-After header tells the time left.
+        quota (int): Requests allowed per quota window, 0 for no quota.
+        window (float): Length of the quota window, in seconds.
+        max_assessments (int): Upper bound of assessments per species.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.05, not_found_rate=0.01, burst_rate=0.0, burst_duration=2.0,
+                 quota=0, window=60.0, max_assessments=30):
+        self.latency = latency
+        self.jitter = jitter
+        self.not_found_rate = not_found_rate
+        self.burst_rate = burst_rate
+        self.burst_duration = burst_duration
+        self.quota = quota
+        self.window = window
+        self.max_assessments = max_assessments
+
+def assessment_ids(sis_id: int, config: MockConfig) -> list:
+    """
+    Generates the assessment IDs of a species. Most species have one or two assessments and
+    a few have many, as in the Red List.
+
+    Parameters:
+        sis_id (int): Species ID.
+        config (MockConfig): Mock API settings.
+
+    Returns:
+        list: Assessment IDs of the species.
+    """
+    rng = random.Random(sis_id)
+    n = min(config.max_assessments, int(rng.paretovariate(1.2)))
+    return [sis_id * 100 + k for k in range(n)]
+
+def species_payload(sis_id: int, config: MockConfig) -> dict:
+    """
+    Parameters:
+        sis_id (int): Species ID.
+        config (MockConfig): Mock API settings.
+
+    Returns:
+        dict: Body of /taxa/sis/{sis_id}.
+    """
+    return {"taxon": {"sis_id": sis_id}, "assessments": [{"assessment_id": i} for i in assessment_ids(sis_id, config)]}
+
+def assessment_payload(assessment_id: int) -> dict:
+    """
+    Parameters:
+        assessment_id (int): Assessment ID.
+
+    Returns:
+        dict: Body of /assessment/{assessment_id}, with the fields read by formatted_json.
+    """
+    sis_id = assessment_id // 100
+    species_rng = random.Random(sis_id)
+    rng = random.Random(assessment_id)
+    kingdom = species_rng.choice(list(KINGDOMS))
+    phylum = species_rng.choice(KINGDOMS[kingdom])
+    genus = f"Genus{species_rng.randrange(5000)}"
+    taxon = {"scientific_name": f"{genus} species{sis_id}",
+             "sis_id": sis_id,
+             "kingdom_name": kingdom,
+             "phylum_name": phylum,
+             "class_name": f"{phylum}CLASS{species_rng.randrange(8)}",
+             "order_name": f"ORDER{species_rng.randrange(60)}",
+             "family_name": f"FAMILY{species_rng.randrange(400)}"}
+    year = max(1986, 2024 - int(rng.expovariate(0.1))) # Mostly recent assessments
+    categories = LEGACY_CATEGORIES if year < 2001 else CATEGORIES
+    # Most species live in a few countries and have few known uses, a few are widespread or widely used
+    countries = min(len(COUNTRIES), int(rng.paretovariate(1.1)))
+    uses = min(len(USES), int(rng.paretovariate(2.0)) - 1)
+    return {"assessment_id": assessment_id,
+            "year_published": str(year),
+            "taxon": taxon,
+            "locations": [{"description": {"en": c}, "presence": rng.choices(PRESENCES, [85, 6, 3, 6])[0]} for c in rng.sample(COUNTRIES, countries)],
+            "use_and_trade": [{"description": {"en": u}} for u in rng.sample(USES, uses)],
+            "threats": [{"description": {"en": t}} for t in rng.sample(THREATS, rng.randrange(0, 4))],
+            "red_list_category": {"code": rng.choices(list(categories), list(categories.values()))[0]}}
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    Answers /api/v4/taxa/sis/{id} and /api/v4/assessment/{id} according to the MockConfig
+    of the server.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body=None, headers=None) -> None:
+        """
+        Sends a JSON response.
+
+        Parameters:
+            status (int): Status code.
+            body (dict): Response body.
+            headers (dict): Extra response headers.
+        """
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        data = dumps(body).encode() if body is not None else b""
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        config = server.config
+        throttle = server.admit()
+        sleep(config.latency + random.random() * config.jitter)
+        if throttle is not None:
+            server.count(429)
+            return self.send_json(429, {"error": "Too Many Requests"}, {"Retry-After": f"{throttle:.2f}"})
+
+        parts = self.path.rstrip("/").split("/")
+        try:
+            key = int(parts[-1])
+        except ValueError:
+            server.count(404)
+            return self.send_json(404, {"error": "Not found"})
+        if random.Random(key * 7919).random() < config.not_found_rate:
+            server.count(404)
+            return self.send_json(404, {"error": "Not found"})
+
+        if self.path.startswith("/api/v4/taxa/sis/"):
+            body = species_payload(key, config)
+        elif self.path.startswith("/api/v4/assessment/"):
+            body = assessment_payload(key)
+        else:
+            server.count(404)
+            return self.send_json(404, {"error": "Not found"})
+        server.count(200)
+        self.send_json(200, body)
+
+class MockServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server standing in for the IUCN API v4, with request statistics.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, config: MockConfig):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clears the statistics and the quota window.
+        """
+        with self.lock:
+            self.statuses = {}
+            self.window_start = monotonic()
+            self.window_requests = 0
+            self.burst_until = 0.0
+
+    def admit(self):
+        """
+        Applies the quota window and the 429 bursts to an incoming request.
+
+        Returns:
+            float | None: Seconds the client should wait if the request is throttled, None if
+            it may be answered.
+        """
+        config = self.config
+        with self.lock:
+            now = monotonic()
+            if config.quota:
+                if now - self.window_start >= config.window:
+                    self.window_start = now
+                    self.window_requests = 0
+                self.window_requests += 1
+                if self.window_requests > config.quota:
+                    return self.window_start + config.window - now
+            if random.random() < config.burst_rate:
+                self.burst_until = max(self.burst_until, now + config.burst_duration)
+            if self.burst_until > now:
+                return self.burst_until - now
+        return None
+
+    def count(self, status: int) -> None:
+        """
+        Parameters:
+            status (int): Status code of an answered request.
+        """
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/api/v4"
+
+def start_server(config: MockConfig, host: str = HOST, port: int = 0) -> MockServer:
+    """
+    Starts the mock API in a background thread.
+
+    Parameters:
+        config (MockConfig): Mock API settings.
+        host (str): Address to listen on.
+        port (int): Port to listen on, 0 for any free port.
+
+    Returns:
+        MockServer: The running server. Its url attribute replaces API_URL in pull-api.py.
+    """
+    server = MockServer((host, port), config)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    server = MockServer((HOST, PORT), MockConfig(quota=600, window=60.0, burst_rate=0.001))
+    print(f"Mock IUCN API listening on {server.url}")
+    server.serve_forever()
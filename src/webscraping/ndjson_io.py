@@ -0,0 +1,194 @@
+from threading import Thread
+from queue import Queue, Empty
+from time import monotonic
+import gzip
+import io
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def open_binary(path: str, mode: str = "r"):
+    """
+    Opens a file as bytes, decompressing or compressing it according to its extension (.gz,
+    .zst or none), for readers that parse raw lines without decoding them.
+
+    Parameters:
+        path (str): Path of the file.
+        mode (str): "r" to read, "w" to write or "a" to append.
+
+    Returns:
+        file: Binary file object.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "b")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("The zstandard package is required for .zst files")
+        raw = open(path, mode + "b")
+        if mode == "r":
+            # The reader of zstandard cannot be iterated by lines, the buffered reader can
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True))
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+    return open(path, mode + "b")
+
+def open_ndjson(path: str, mode: str = "r"):
+    """
+    Opens a newline-delimited JSON file as text, decompressing or compressing it according
+    to its extension (.gz, .zst or none). Files made of several concatenated gzip members
+    or zstd frames are read as a single stream.
+
+    Parameters:
+        path (str): Path of the file.
+        mode (str): "r" to read, "w" to write or "a" to append.
+
+    Returns:
+        file: Text file object.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        return io.TextIOWrapper(open_binary(path, mode), encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class WriterError(RuntimeError):
+    """
+    The writer thread of a RecordWriter failed, so the records given to it are not written.
+    """
+
+class RecordWriter(Thread):
+    """
+    Single thread writing the records produced by all crawler workers to one NDJSON file,
+    compressed according to its extension.
+
+    Workers hand records over through a bounded queue, so they are slowed down instead of
+    piling records up in memory if the disk falls behind. Every `checkpoint_every` records
+    or `checkpoint_interval` seconds the compressed stream is flushed and fsynced, then
+    `on_checkpoint` is called with the IDs of the records made durable and the size of the
+    file, which can be given back as `start_offset` to drop a partial tail after a crash.
+
+    If writing fails, the error is kept in `error`, the queue is still emptied so workers are
+    never blocked on it, and `put` and `close` raise WriterError.
+    """
+
+    def __init__(self, path: str, on_checkpoint, start_offset=None, queue_size: int = 10000,
+                 checkpoint_every: int = 500, checkpoint_interval: float = 30.0):
+        """
+        Parameters:
+            path (str): Output file, appended to if it exists.
+            on_checkpoint (callable): Called as on_checkpoint(ids, offset) after each fsync.
+            start_offset (int): Size of the file at the last checkpoint, or None if unknown.
+            queue_size (int): Maximum number of records waiting to be written.
+            checkpoint_every (int): Records written between checkpoints.
+            checkpoint_interval (float): Maximum number of seconds between checkpoints.
+        """
+        super().__init__(daemon=True)
+        self.path = path
+        self.on_checkpoint = on_checkpoint
+        self.queue = Queue(queue_size)
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+        self.written = 0
+        self.error = None
+
+        if start_offset is not None and os.path.exists(path) and os.path.getsize(path) > start_offset:
+            with open(path, "r+b") as file:
+                file.truncate(start_offset)
+        self.raw = open(path, "ab")
+        self.stream = self.open_stream()
+
+    def open_stream(self):
+        """
+        Returns:
+            file: Binary stream compressing into the raw output file.
+        """
+        if self.path.endswith(".gz"):
+            return gzip.GzipFile(fileobj=self.raw, mode="ab")
+        if self.path.endswith(".zst"):
+            if zstandard is None:
+                raise ImportError("The zstandard package is required for .zst files")
+            return zstandard.ZstdCompressor().stream_writer(self.raw, closefd=False)
+        return self.raw
+
+    def put(self, key, record: dict) -> None:
+        """
+        Queues a record to be written, blocking while the queue is full.
+
+        Parameters:
+            key: ID passed to on_checkpoint once the record is durable.
+            record (AssessmentRecord): Record to write.
+        """
+        self.raise_error()
+        self.queue.put((key, record))
+        self.raise_error() # The writer may have failed while the queue was full
+
+    def close(self) -> None:
+        """
+        Writes the remaining records, makes them durable and closes the file.
+        """
+        self.queue.put(None)
+        self.join()
+        self.raise_error()
+
+    def raise_error(self) -> None:
+        """
+        Raises WriterError if the writer thread failed.
+        """
+        if self.error is not None:
+            raise WriterError(f"Writing {self.path} failed: {self.error!r}") from self.error
+
+    def checkpoint(self, keys: list) -> None:
+        """
+        Ends the current compressed member, fsyncs the file and reports the durable records.
+
+        Parameters:
+            keys (list): IDs of the records written since the last checkpoint.
+        """
+        if self.stream is not self.raw:
+            self.stream.close() # Ends the gzip member / zstd frame, so the file is always readable
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+        self.on_checkpoint(keys, self.raw.tell())
+        if self.stream is not self.raw:
+            self.stream = self.open_stream()
+
+    def run(self):
+        try:
+            self.write_records()
+        except Exception as e:
+            self.error = e
+            while self.queue.get() is not None: # Discards the records left, until close
+                pass
+        finally:
+            try:
+                if self.stream is not self.raw:
+                    self.stream.close()
+            finally:
+                self.raw.close()
+
+    def write_records(self) -> None:
+        """
+        Writes the queued records until close is called, with a checkpoint at the end.
+        """
+        keys = []
+        last_checkpoint = monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=1.0)
+            except Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                key, record = item
+                self.stream.write(record.to_json().encode())
+                self.stream.write(b"\n")
+                keys.append(key)
+                self.written += 1
+            if len(keys) >= self.checkpoint_every or (keys and monotonic() - last_checkpoint >= self.checkpoint_interval):
+                self.checkpoint(keys)
+                keys = []
+                last_checkpoint = monotonic()
+        self.checkpoint(keys)
@@ -1,147 +1,540 @@
 from threading import Thread
 from requests import get
-from time import sleep
-from json import dumps
+from requests.exceptions import RequestException
+from queue import Queue
+from time import monotonic
+from json import loads
+from multiprocessing import Pool
+import asyncio
+import aiohttp
+from rate_limiting import TokenBucket, AdaptiveConcurrency, retry_after
+from crawl_journal import CrawlJournal, DONE, NOT_FOUND, FAILED, PENDING
+from response_cache import ResponseCache, read_entry
+from ndjson_io import RecordWriter, WriterError, open_ndjson
+from assessment_record import AssessmentRecord
+from crawl_metrics import CrawlMetrics, MetricsReporter
+import os
 
 AUTH_TOKEN = "" # Authorization token for API
 ID_LIST_FILE = ""
 THREAD_COUNT = 16
 
-# Load species IDs from the input file
-with open(ID_LIST_FILE, 'r') as f:
-    l = f.read().split("\n")
-    species = [int(i.strip()) for i in l]
+FETCH_MODE = "threads" # "threads" or "async"
+API_URL = "https://api.iucnredlist.org/api/v4"
+REQUESTS_PER_SECOND = 2 # Quota of the authorization token, shared by all requests of the threads or coroutines
+BURST_SIZE = 10 # Requests that can be sent at once after an idle period
+ASYNC_WORKERS = 32 # Coroutines fetching concurrently in async mode
+ADAPTIVE_CONCURRENCY = True # Adjust the in-flight requests of async mode between 1 and ASYNC_WORKERS from 429s and latency
+ADAPTIVE_INITIAL = 4 # In-flight requests when the adaptive concurrency starts
+MAX_RETRIES = 5 # Attempts per request before marking it as failed in the journal
+THROTTLE_WAIT = 60 # Seconds to wait when throttled and the API does not send Retry-After
 
-taxon_keys = ["scientific_name","sis_id","kingdom_name","phylum_name","class_name","order_name","family_name"]
+OUTPUT_FILE = "assessments.json.gz" # Single output of all workers. Compressed according to the extension (.gz, .zst or .json)
+WRITER_QUEUE_SIZE = 10000 # Formatted assessments waiting to be written before workers are held back
+CHECKPOINT_EVERY = 500 # Assessments written between fsyncs of the output, after which they are marked as done
+CHECKPOINT_INTERVAL = 30 # Maximum number of seconds between checkpoints
 
-def write_to_file(thread_id, formatted_list):
+JOURNAL_FILE = "crawl_journal.sqlite" # Progress of the crawl, used to resume after an interruption
+JOURNAL_COMMIT_EVERY = 200 # Journal updates grouped in a single transaction
+
+METRICS_FILE = "crawl_metrics.jsonl" # Periodic snapshots of the crawl metrics: JSON lines, or Prometheus text if it ends with .prom. Empty to only print the progress
+METRICS_INTERVAL = 10 # Seconds between metrics snapshots and progress lines
+
+CRAWL_MODE = "full" # "full" to fetch what is missing, "refresh" to also look for new assessments, "reproject" to rebuild the output from CACHE_DIR only
+CACHE_DIR = "response_cache" # Raw API responses, reused instead of requesting them again. Empty to disable
+REPROJECT_FILE = "reprojected.json.gz" # Output of the "reproject" mode
+REPROJECT_PROCESSES = 4 # Processes formatting cached responses in the "reproject" mode
+
+ENDPOINTS = {"taxa": "/taxa/sis/{}", "assessment": "/assessment/{}"}
+
+journal = None
+cache = None
+metrics = None
+
+def load_species(path):
     """
-    Writes a list of formatted JSON objects to a file.
+    Loads species IDs from the input file.
 
     Parameters:
-        thread_id (int): The ID of the thread writing the file.
-        formatted_list (list): List of formatted JSON objects to write.
+        path (str): Text file with one species ID per line.
+
+    Returns:
+        list: Species IDs as integers.
     """
-    with open(f"{thread_id}.json", "a+") as file:
-        for json in formatted_list:
-            file.write(dumps(json))
-            file.write("\n")
+    with open(path, 'r') as f:
+        l = f.read().split("\n")
+        return [int(i.strip()) for i in l if i.strip()]
 
-def wait_timeout(thread_id, formatted_list):
+def checkpoint(done_ids, offset):
     """
-    Implements a timeout mechanism when an API request limit is reached.
+    Marks assessments as done once the writer has made them durable, together with the size
+    of the output file, so a restart can cut off records written after the last checkpoint.
 
     Parameters:
-        thread_id (int): ID of the current thread.
-        formatted_list (list): List of formatted JSON objects collected so far.
+        done_ids (list): IDs of the assessments made durable.
+        offset (int): Size of the output file after the checkpoint.
+    """
+    journal.set_assessments(done_ids, DONE)
+    journal.set_value(output_key(), offset)
+    journal.commit()
 
+def output_key():
+    """
     Returns:
-        bool: True if the API is responsive after the timeout, False otherwise.
+        str: Journal key of the checkpoint offset of OUTPUT_FILE.
     """
-    write_to_file(thread_id, formatted_list) # Save progress before waiting
+    return f"offset {os.path.abspath(OUTPUT_FILE)}"
 
-    sleep(60)
-    #random url just to test if timeout has ended and we can fetch the API again
-    url = f"https://api.iucnredlist.org/api/v4/taxa/sis/49830106"
-    headers = {"Authorization":AUTH_TOKEN}
-    response = get(url, headers=headers)
-    return int(response.status_code) == 200
+def pending_assessments(species_id, species_response):
+    """
+    Registers the assessment list of a species in the journal and returns the assessments
+    that still have to be fetched.
+
+    Parameters:
+        species_id (int): Species ID.
+        species_response (dict): Response of /taxa/sis/{species_id}, or None if the list was
+            already stored in the journal.
+
+    Returns:
+        list: IDs of assessments that are neither done nor missing from the API.
+    """
+    if species_response is not None:
+        assessment_list = [int(x["assessment_id"]) for x in species_response["assessments"]]
+        journal.set_species(species_id, DONE, assessment_list)
+    known = journal.assessments_of(species_id)
+    return [i for i, state in known.items() if state in (PENDING, FAILED)]
+
+def initial_jobs():
+    """
+    Lists the work left in the journal. A job is a tuple (endpoint, key, species_id,
+    attempts): species whose assessment list is unknown get a "taxa" job, and the pending
+    assessments of the other species get one "assessment" job each.
+
+    Returns:
+        list: Jobs to put in the queue shared by the workers.
+    """
+    jobs = []
+    for species_id in journal.unfinished_species():
+        known = journal.assessments_of(species_id)
+        if known is None:
+            jobs.append(("taxa", species_id, species_id, 0))
+        else:
+            jobs.extend(("assessment", i, species_id, 0) for i, state in known.items() if state in (PENDING, FAILED))
+    return jobs
+
+def set_state(endpoint, key, state):
+    """
+    Updates the journal state of the species or assessment requested by a job.
+
+    Parameters:
+        endpoint (str): Key of ENDPOINTS of the job.
+        key (int): ID requested from the endpoint.
+        state (str): New state.
+    """
+    if endpoint == "taxa":
+        journal.set_species(key, state)
+    else:
+        journal.set_assessments([key], state)
+
+def handle_response(job, status, data, enqueue, output):
+    """
+    Processes the response to a job. The assessments of a species are queued as separate
+    jobs, so any worker can take them, and failed jobs go back to the end of the queue until
+    they have been tried MAX_RETRIES times.
+
+    Parameters:
+        job (tuple): Job that was requested (see initial_jobs).
+        status (int): Status code of the response, or None if no response was received.
+        data (dict): Decoded JSON body of the response.
+        enqueue (callable): Puts a new job in the shared queue.
+        output (callable): Hands a formatted assessment over to the writer.
+
+    Returns:
+        bool: True if the job is finished, False if it failed.
+    """
+    endpoint, key, species_id, attempts = job
+    started = monotonic()
+    if status == 200:
+        try:
+            if endpoint == "taxa":
+                assessment_ids = pending_assessments(species_id, data)
+                metrics.add_jobs(len(assessment_ids))
+                for assessment_id in assessment_ids:
+                    enqueue(("assessment", assessment_id, species_id, 0))
+            else:
+                output(key, formatted_json(data))
+            metrics.finish_job(monotonic() - started, endpoint == "assessment")
+            return True
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Malformed response for {endpoint} {key}: {e!r}")
+            set_state(endpoint, key, FAILED)
+            metrics.finish_job(monotonic() - started)
+            return False
+    if status == 404:
+        set_state(endpoint, key, NOT_FOUND)
+        metrics.finish_job(monotonic() - started)
+        return True
+    if attempts + 1 < MAX_RETRIES:
+        metrics.retry(endpoint)
+        enqueue((endpoint, key, species_id, attempts + 1))
+    else:
+        print(f"Giving up on {endpoint} {key}")
+        set_state(endpoint, key, FAILED)
+        metrics.finish_job(monotonic() - started)
+    return False
 
 def formatted_json(response):
     """
-    Formats the API response data into a structured JSON object.
+    Formats the API response data into a structured record.
 
     Parameters:
         response (dict): Raw API response.
 
     Returns:
-        dict: Formatted JSON object with selected fields.
+        AssessmentRecord: Record with the selected fields. Raises MalformedRecord if a field
+        is missing or has the wrong type.
+    """
+    return AssessmentRecord.from_response(response)
+
+def cached_json(endpoint, key):
+    """
+    Reads a response from the cache. In the "refresh" mode, assessment lists of species
+    are never read from the cache, as they are what is being refreshed.
+
+    Parameters:
+        endpoint (str): Key of ENDPOINTS.
+        key (int): ID requested from the endpoint.
+
+    Returns:
+        dict | None: Decoded JSON body, or None if it must be requested from the API,
+        including when the cached entry cannot be decoded.
+    """
+    if not cache or (CRAWL_MODE == "refresh" and endpoint == "taxa"):
+        return None
+    body = cache.get(endpoint, key)
+    if body is None:
+        return None
+    try:
+        return loads(body)
+    except ValueError:
+        return None
+
+def fetch_json(endpoint, key, headers, limiter):
+    """
+    Gets an API response from the cache, or requests it respecting the shared rate limiter
+    and stores its raw body in the cache.
+
+    Throttled responses pause the limiter for every thread, using the Retry-After header
+    when present.
+
+    Parameters:
+        endpoint (str): Key of ENDPOINTS to request.
+        key (int): ID requested from the endpoint.
+        headers (dict): Request headers.
+        limiter (TokenBucket): Rate limiter shared by all threads.
+
+    Returns:
+        tuple: Status code (None if no response was received) and the decoded JSON body,
+        which is None unless the status is 200.
     """
-    formatted = dict()
-    
-    formatted["year_published"] = response["year_published"]
-    formatted["taxon"] = {i: response["taxon"][i] for i in taxon_keys}
-    formatted["locations"] = [{"country":i["description"]["en"], "presence":i["presence"]} for i in response["locations"]]
-    formatted["use_and_trade"] = [i["description"]["en"] for i in response["use_and_trade"]]
-    formatted["threats"] = [i["description"]["en"] for i in response["threats"]]
-    formatted["red_list_category"] = response["red_list_category"]["code"]
-    
-    return formatted
+    data = cached_json(endpoint, key)
+    if data is not None:
+        metrics.cache_hit(endpoint)
+        return 200, data
+    url = API_URL + ENDPOINTS[endpoint].format(key)
+    limiter.acquire()
+    started = monotonic()
+    try:
+        response = get(url, headers=headers)
+    except RequestException as e:
+        metrics.observe(endpoint, None, monotonic() - started)
+        print(url, e)
+        return None, None
+    metrics.observe(endpoint, int(response.status_code), monotonic() - started, len(response.content))
+    status = int(response.status_code)
+    if status != 200:
+        if status == 429 or status >= 500:
+            wait = retry_after(response.headers, THROTTLE_WAIT)
+            metrics.throttled(wait)
+            limiter.pause(wait) # Every thread waits for the request limit to reset
+        return status, None
+    try:
+        data = loads(response.content)
+    except ValueError as e:
+        print(url, f"undecodable body: {e}")
+        return None, None # Retried like a request without response
+    if cache:
+        cache.put(endpoint, key, response.content)
+    return 200, data
 
-def thread_func(start, end, result, idx):
+def thread_func(jobs, limiter, writer, result, idx):
     """
-    Fetches data for a range of species IDs using the API and formats the responses.
+    Takes jobs from the shared queue and fetches them until a None sentinel is received.
 
     Parameters:
-        start (int): Start index of species IDs for the thread.
-        end (int): End index of species IDs for the thread.
+        jobs (Queue): Queue of jobs shared by all threads (see initial_jobs).
+        limiter (TokenBucket): Rate limiter shared by all threads.
+        writer (RecordWriter): Writer of the output file.
         result (list): Shared list to store the count of successful requests for each thread.
         idx (int): Thread index.
     """
     j = 0 # Counter for successful requests
     headers = {"Authorization":AUTH_TOKEN}
 
-    formatted_list = []
-    i = start
-    while i < end:
-        species_id = species[i]
-        url = f"https://api.iucnredlist.org/api/v4/taxa/sis/{species_id}"
-        print(url)
-        response = get(url, headers=headers)
-        
-        if int(response.status_code) != 200:
-            print(response.status_code)
-            r = wait_timeout(idx, formatted_list)
-            if not r:
-                result[idx] = j
-                print("1 min nao foi suficiente")
-                return
-            
-            formatted_list = [] # Reset the list after waiting
-            
-            if int(response.status_code) == 404:
-                j += 1 # Skip to the next ID
-            continue
-              
-        # Process assessments for the species
-        j += 1
-        species_response = response.json()
-        assessment_list = [int(x["assessment_id"]) for x in species_response["assessments"]]     
-
-        m = len(assessment_list)
-        k = 0
-        while k < m:
-            url = f"https://api.iucnredlist.org/api/v4/assessment/{assessment_list[k]}"
-            response = get(url, headers=headers)
-            if int(response.status_code) != 200:
-                print(response.status_code)
-                r = wait_timeout(idx, formatted_list)
-                if not r:
-                    result[idx] = j
-                    print("1 min was not long enough")
-                    return  
-                formatted_list = [] # Reset the list after waiting
-                if int(response.status_code) == 404:
-                    k += 1 # Skip to the next assessment
-                continue
-            
-            formatted_list.append(formatted_json(response.json()))
-            j += 1
-            k += 1
-        i += 1
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        try:
+            if writer.error is None: # Once the writer failed, the jobs left are drained and writer.close() raises its error
+                status, data = fetch_json(job[0], job[1], headers, limiter)
+                if handle_response(job, status, data, jobs.put, writer.put):
+                    j += 1
+                elif status is not None and status != 200:
+                    print(API_URL + ENDPOINTS[job[0]].format(job[1]), status)
+        except WriterError:
+            pass
+        finally:
+            jobs.task_done() # Even if the job raised, so jobs.join() does not wait for it forever
     result[idx] = j  # Save the count of successful requests
-    write_to_file(idx, formatted_list) # Save collected data to file
 
-# Split the workload across threads
-n = len(species)
-threads = []
-result = [0 for i in range(THREAD_COUNT)]
-for i in range(THREAD_COUNT):
-    threads.append(Thread(target=thread_func,args=(int(i * n / THREAD_COUNT), int((i+1) * n / THREAD_COUNT), result, i)))
-    threads[i].start()
+def run_threads(initial, writer):
+    """
+    Runs THREAD_COUNT threads that share a single job queue, so threads that finish early
+    keep taking work until the whole crawl is done, and a single token bucket, so all the
+    threads together respect the quota of the token, as in async mode.
+
+    Parameters:
+        initial (list): Jobs to start with (see initial_jobs).
+        writer (RecordWriter): Writer of the output file.
+
+    Returns:
+        list: Count of successful requests of each thread.
+    """
+    jobs = Queue()
+    for job in initial:
+        jobs.put(job)
+    threads = []
+    result = [0 for i in range(THREAD_COUNT)]
+    limiter = TokenBucket(REQUESTS_PER_SECOND, BURST_SIZE)
+    metrics.gauge("concurrency", lambda: THREAD_COUNT)
+    metrics.gauge("paused_seconds", lambda: round(limiter.remaining_pause(), 3))
+    for i in range(THREAD_COUNT):
+        threads.append(Thread(target=thread_func,args=(jobs, limiter, writer, result, i)))
+        threads[i].start()
+
+    # Wait for all jobs, including the ones queued by the threads, then stop the threads
+    jobs.join()
+    for i in range(THREAD_COUNT):
+        jobs.put(None)
+    for i in range(THREAD_COUNT):
+        threads[i].join()
+    return result
+
+async def fetch_json_async(session, limiter, concurrency, endpoint, key):
+    """
+    Gets an API response from the cache, or requests it respecting the shared rate limiter
+    and stores its raw body in the cache.
+
+    Throttled responses pause the limiter for every worker, using the Retry-After header
+    when present.
+
+    Parameters:
+        session (aiohttp.ClientSession): Session holding the authorization header.
+        limiter (TokenBucket): Rate limiter shared by all in-flight requests.
+        concurrency (AdaptiveConcurrency): Limit on in-flight requests, or None to only be
+            limited by the number of workers.
+        endpoint (str): Key of ENDPOINTS to request.
+        key (int): ID requested from the endpoint.
+
+    Returns:
+        tuple: Status code (None if no response was received) and the decoded JSON body,
+        which is None unless the status is 200.
+    """
+    data = cached_json(endpoint, key)
+    if data is not None:
+        metrics.cache_hit(endpoint)
+        return 200, data
+    url = API_URL + ENDPOINTS[endpoint].format(key)
+    if concurrency:
+        await concurrency.acquire()
+    await limiter.acquire_async()
+    started = monotonic()
+    status = None
+    size = 0
+    try:
+        async with session.get(url) as response:
+            status = response.status
+            if status == 200:
+                body = await response.read()
+                size = len(body)
+                try:
+                    data = loads(body)
+                except ValueError as e:
+                    print(url, f"undecodable body: {e}")
+                    return None, None # Retried like a request without response, and not cached
+                if cache:
+                    cache.put(endpoint, key, body)
+                return status, data
+            if status != 404:
+                print(url, status)
+            if status == 429 or status >= 500:
+                limiter.pause(retry_after(response.headers, THROTTLE_WAIT))
+            return status, None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(url, repr(e))
+        return None, None
+    finally:
+        metrics.observe(endpoint, status, monotonic() - started, size)
+        if concurrency:
+            await concurrency.release(started, status is None or status == 429 or status >= 500)
+
+async def async_worker(session, limiter, concurrency, jobs, writer, result, idx):
+    """
+    Takes jobs from the shared queue and fetches them until the worker is cancelled.
+
+    Parameters:
+        session (aiohttp.ClientSession): Session holding the authorization header.
+        limiter (TokenBucket): Rate limiter shared by all workers.
+        concurrency (AdaptiveConcurrency): Limit on in-flight requests, or None.
+        jobs (asyncio.Queue): Queue of jobs shared by all workers (see initial_jobs).
+        writer (RecordWriter): Writer of the output file. When its queue is full, the event
+            loop waits for it, which holds back all workers.
+        result (list): Shared list to store the count of successful requests for each worker.
+        idx (int): Worker index.
+    """
+    while True:
+        job = await jobs.get()
+        try:
+            if writer.error is None: # Once the writer failed, the jobs left are drained and writer.close() raises its error
+                status, data = await fetch_json_async(session, limiter, concurrency, job[0], job[1])
+                if handle_response(job, status, data, jobs.put_nowait, writer.put):
+                    result[idx] += 1
+        except WriterError:
+            pass
+        finally:
+            jobs.task_done()
+
+async def run_async(initial, writer):
+    """
+    Runs ASYNC_WORKERS coroutines that share a job queue and a single token bucket, so the
+    API quota is used continuously instead of alternating between bursts and long sleeps.
+    With ADAPTIVE_CONCURRENCY, the number of requests in flight follows what the API
+    sustains instead of always being ASYNC_WORKERS.
+
+    Parameters:
+        initial (list): Jobs to start with (see initial_jobs).
+        writer (RecordWriter): Writer of the output file.
+
+    Returns:
+        list: Count of successful requests of each worker.
+    """
+    jobs = asyncio.Queue()
+    for job in initial:
+        jobs.put_nowait(job)
+
+    limiter = TokenBucket(REQUESTS_PER_SECOND, BURST_SIZE)
+    concurrency = AdaptiveConcurrency(ADAPTIVE_INITIAL, 1, ASYNC_WORKERS) if ADAPTIVE_CONCURRENCY else None
+    metrics.gauge("concurrency", lambda: concurrency.concurrency if concurrency else ASYNC_WORKERS)
+    metrics.gauge("paused_seconds", lambda: round(limiter.remaining_pause(), 3))
+    result = [0 for i in range(ASYNC_WORKERS)]
+    headers = {"Authorization":AUTH_TOKEN}
+    connector = aiohttp.TCPConnector(limit=ASYNC_WORKERS)
+    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+        workers = [asyncio.ensure_future(async_worker(session, limiter, concurrency, jobs, writer, result, i)) for i in range(ASYNC_WORKERS)]
+        await jobs.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    if concurrency:
+        print(f"Final concurrency: {concurrency.concurrency}")
+    return result
+
+def reproject_entry(path):
+    """
+    Formats a cached assessment response.
+
+    Parameters:
+        path (str): Path of a cache entry of the assessment endpoint.
+
+    Returns:
+        str: Formatted JSON object serialized as a single line, or None if the entry is
+        corrupt or is not a valid assessment.
+    """
+    try:
+        return formatted_json(loads(read_entry(path))).to_json()
+    except (OSError, EOFError, ValueError, KeyError, TypeError) as e: # MalformedRecord is a ValueError
+        print(f"Skipping cache entry {path}: {e!r}")
+        return None
+
+def reproject():
+    """
+    Rebuilds the formatted output from the cached assessment responses alone, without any
+    request to the API, so changes to formatted_json do not require a new crawl. The output
+    is written to a temporary file that replaces REPROJECT_FILE once every entry is read.
+
+    Returns:
+        tuple: Number of assessments written to REPROJECT_FILE, and number of cache entries
+        skipped because they could not be formatted.
+    """
+    n = 0
+    skipped = 0
+    directory, name = os.path.split(REPROJECT_FILE)
+    stem, dot, extension = name.partition(".")
+    partial_file = os.path.join(directory, f"{stem}.partial{dot}{extension}") # Keeps the extension, which sets the compression
+    with Pool(REPROJECT_PROCESSES) as pool, open_ndjson(partial_file, "w") as file:
+        for line in pool.imap_unordered(reproject_entry, cache.paths("assessment"), chunksize=256):
+            if line is None:
+                skipped += 1
+                continue
+            file.write(line)
+            file.write("\n")
+            n += 1
+    os.replace(partial_file, REPROJECT_FILE)
+    return n, skipped
+
+def main():
+    """
+    Registers the species of ID_LIST_FILE in the journal and fetches every species or
+    assessment that is not done yet, so running the script again resumes an interrupted
+    crawl. In the "refresh" mode, the assessment list of every species is requested again
+    and only assessments missing from the journal are fetched. In the "reproject" mode, the
+    output is rebuilt from the cache instead.
+    """
+    global journal, cache, metrics
+    if CACHE_DIR:
+        cache = ResponseCache(CACHE_DIR)
+    if CRAWL_MODE == "reproject":
+        written, skipped = reproject()
+        print(f"{written} assessments written to {REPROJECT_FILE}, {skipped} cache entries skipped")
+        return
 
-# Wait for all threads to complete
-for i in range(THREAD_COUNT):
-    threads[i].join()
+    journal = CrawlJournal(JOURNAL_FILE, JOURNAL_COMMIT_EVERY)
+    if CRAWL_MODE == "refresh":
+        journal.refresh_species()
+    if ID_LIST_FILE:
+        journal.add_species(load_species(ID_LIST_FILE))
+    initial = initial_jobs()
+    writer = RecordWriter(OUTPUT_FILE, checkpoint, journal.get_value(output_key()), WRITER_QUEUE_SIZE,
+                          CHECKPOINT_EVERY, CHECKPOINT_INTERVAL)
+    metrics = CrawlMetrics()
+    metrics.add_jobs(len(initial))
+    metrics.gauge("writer_queue", writer.queue.qsize)
+    metrics.gauge("records_written", lambda: writer.written)
+    reporter = MetricsReporter(metrics, METRICS_FILE, METRICS_INTERVAL)
+    writer.start()
+    reporter.start()
+    try:
+        if FETCH_MODE == "async":
+            result = asyncio.run(run_async(initial, writer))
+        else:
+            result = run_threads(initial, writer)
+    finally:
+        writer.close()
+        reporter.stop()
+    print(result)
+    print(journal.counts())
+    journal.close()
 
-print(result)
+if __name__ == '__main__':
+    main()
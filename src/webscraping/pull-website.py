@@ -1,14 +1,157 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.firefox.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from threading import Thread, Lock, Timer
+from queue import Queue
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from search_payloads import SEARCH_RESULTS_URL, species_ids_from_text, save_payloads, load_payloads
 
 ID_LIST_FILE = ""
 UNFINISHED_URL_FILE = ""
 
+GECKODRIVER_PATH = '/snap/bin/firefox.geckodriver' # Replace with the path to your geckodriver
+BROWSER_WORKERS = 4 # Browsers harvesting URLs in parallel, each one reused for all the URLs it takes
+HEADLESS = True # Run the browsers without a window
+ATTEMPTS = 5 # Harvests of a URL before reporting it as unfinished
+RETRY_DELAY = 60 # Seconds before a URL that was not fully harvested is taken again. Other URLs are harvested meanwhile
+PAGE_TIMEOUT = 30 # Maximum seconds to wait for the page to show its number of results or to load more of them
+SCROLL_TIMEOUT = 3 # Maximum seconds to wait for the page to grow after scrolling to the bottom
+BUTTON_TIMEOUT = 5 # Maximum seconds to wait for the "Show more" button before considering the list fully expanded
+
+HARVEST_MODE = "intercept" # "intercept" to parse IDs from the responses loaded by the page, "anchors" to read the links of the fully rendered page, "offline" to parse the payloads recorded in PAYLOAD_DIR
+PAYLOAD_DIR = "" # Directory where the payloads captured in "intercept" mode are recorded, and read from in "offline" mode. Empty to not record them
+
+LOADABLE_LIMIT = 5000 # Largest number of results the search page loads reliably. Larger searches are split without trying to expand them
+# Filters added, in order, to split searches that are too large or could not be fully harvested. A search is split by the first
+# parameter it does not already use, into one sub-search per value. Names and values as in the URLs of the search page.
+# The land regions are only the ones with the most species: species found only elsewhere are missed by that split, which is
+# then reported in UNFINISHED_URL_FILE as any split whose sub-searches do not find all the results of the search
+SPLIT_PARAMETERS = [
+    ("redListCategory", ["ex", "ew", "cr", "en", "vu", "nt", "lc", "dd"]),
+    ("landRegions", ["AF", "AL", "DZ", "AO", "AR", "AU", "BD", "BO", "BR", "CM", "CA", "CL", "CN", "CO", "CD", "CR", "CU", "EC", "ET", "FR",
+                     "GA", "GT", "IN", "ID", "IR", "JP", "KE", "MG", "MY", "MX", "MZ", "MM", "NP", "NZ", "NG", "PK", "PA", "PG", "PE", "PH",
+                     "RU", "ZA", "ES", "LK", "TZ", "TH", "TR", "US", "VE", "VN"]),
+]
+
+RESULT_COUNT_SELECTOR = "h1[class='heading heading--list']"
+LIST_LAYOUT_SELECTOR = "a[class='nav-page__item nav-page__item--list']"
+SHOW_MORE_SELECTOR = "a.section__link-out[role='link']"
+COUNT_RESULTS_SCRIPT = "return document.querySelectorAll(\"a[href*='/species/']\").length"
+
+# Wraps fetch and XMLHttpRequest so the URL and body of every JSON response whose URL matches the pattern passed as argument
+# (SEARCH_RESULTS_URL) are kept in window.__payloads
+INTERCEPT_SCRIPT = """
+if (!window.__payloads) {
+    window.__payloads = [];
+    const pattern = new RegExp(arguments[0]);
+    const keep = (url, type, text) => { if (pattern.test(url || "") && /json/.test(type || "")) window.__payloads.push({url: url, text: text}); };
+    const originalFetch = window.fetch;
+    window.fetch = function() {
+        return originalFetch.apply(this, arguments).then(response => {
+            response.clone().text().then(text => keep(response.url, response.headers.get("content-type"), text)).catch(() => {});
+            return response;
+        });
+    };
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        this.addEventListener("load", function() {
+            const text = this.responseType === "" || this.responseType === "text" ? this.responseText : JSON.stringify(this.response);
+            keep(this.responseURL, this.getResponseHeader("content-type"), text);
+        });
+        return originalSend.apply(this, arguments);
+    };
+}
+"""
+# Requests again, through the wrapped fetch, the search results loaded before INTERCEPT_SCRIPT was installed
+REPLAY_SCRIPT = """
+const done = arguments[arguments.length - 1];
+const pattern = new RegExp(arguments[0]);
+const urls = performance.getEntriesByType("resource")
+    .filter(entry => entry.initiatorType === "fetch" || entry.initiatorType === "xmlhttprequest")
+    .map(entry => entry.name)
+    .filter(url => pattern.test(url));
+Promise.all(urls.map(url => window.fetch(url, {credentials: "include"}).catch(() => null))).then(() => done(urls.length));
+"""
+DRAIN_SCRIPT = "return window.__payloads ? window.__payloads.splice(0) : [];"
+
+# List of URLs containing filters for the general species list
+# Modify this variable to include your urls
+urls = []
+
+def new_driver():
+    """
+    Starts a Firefox instance.
+
+    Returns:
+        webdriver.Firefox: The Selenium WebDriver instance controlling the browser.
+    """
+    options = webdriver.FirefoxOptions()
+    if HEADLESS:
+        options.add_argument("-headless")
+    return webdriver.Firefox(service=Service(GECKODRIVER_PATH), options=options)
+
+def quit_driver(driver):
+    """
+    Closes a browser, ignoring the errors of a browser or driver that already crashed.
+
+    Parameters:
+        driver (webdriver): The Selenium WebDriver instance controlling the browser.
+    """
+    try:
+        driver.quit()
+    except Exception as e:
+        print(f"Unable to close the browser: {e}")
+
+def loaded_results(driver):
+    """
+    Parameters:
+        driver (webdriver): The Selenium WebDriver instance controlling the browser.
+
+    Returns:
+        int: Number of links to species pages currently in the page, counted in a single
+        call to the browser.
+    """
+    return driver.execute_script(COUNT_RESULTS_SCRIPT)
+
+def wait_until(driver, condition, timeout):
+    """
+    Waits for a condition on the page, returning as soon as it holds.
+
+    Parameters:
+        driver (webdriver): The Selenium WebDriver instance controlling the browser.
+        condition (callable): Takes the driver and returns a true value when satisfied.
+        timeout (float): Maximum number of seconds to wait.
+
+    Returns:
+        The value returned by the condition, or None if it did not hold before the timeout.
+    """
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.2).until(condition)
+    except TimeoutException:
+        return None
+
+def result_count(driver):
+    """
+    Reads the number of results announced in the heading of a search page, e.g. "(1234)".
+
+    Parameters:
+        driver (webdriver): The Selenium WebDriver instance controlling the browser.
+
+    Returns:
+        int | None: Number of results of the search, None if the page could not be loaded.
+    """
+    def announced(d):
+        try:
+            text = d.find_element(By.CSS_SELECTOR, RESULT_COUNT_SELECTOR).find_element(By.XPATH, ".//span").text
+            return [int(text[1:-1].replace(",", ""))] # In a list, so that 0 results also ends the wait
+        except (WebDriverException, ValueError):
+            return None
+    count = wait_until(driver, announced, PAGE_TIMEOUT)
+    return count[0] if count else None
+
 def scroll_to_bottom(driver):
     """
     Scrolls to the bottom of a webpage to load all dynamic content.
@@ -17,130 +160,390 @@ def scroll_to_bottom(driver):
         driver (webdriver): The Selenium WebDriver instance controlling the browser.
 
     Notes:
-        - The function repeatedly scrolls down until the page height no longer changes, 
+        - The function repeatedly scrolls down until the page height no longer changes,
           indicating that all content has been loaded.
-        - A delay is included to allow new content to load dynamically.
+        - After each scroll it waits for the page height to change, for at most
+          SCROLL_TIMEOUT seconds, instead of sleeping for a fixed time.
     """
-    # Get current page height
-    last_height = driver.execute_script("return document.body.scrollHeight")
-
+    height = "return document.body.scrollHeight"
+    last_height = driver.execute_script(height)
     while True:
-        # Scroll to the bottom of the page
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-
-        # Wait for the page to load new content
-        time.sleep(2)  # Adjust the time as needed
-
-        # Calculate new page height and compare with previous height
-        new_height = driver.execute_script("return document.body.scrollHeight")
-
-        if new_height == last_height:
+        new_height = wait_until(driver, lambda d: (h := d.execute_script(height)) != last_height and h, SCROLL_TIMEOUT)
+        if not new_height:
             break  # If the height hasn't changed, we are at the bottom of the page.
         last_height = new_height
 
-# Call the function to scroll to the bottom of the page
-
-def scrolling_loop():
+def expand_results(driver, number_of_results, count=loaded_results, scroll=True):
     """
-    Scrolls through a webpage and attempts to click the "Show more" button repeatedly.
+    Clicks the "Show more" button repeatedly until every result is loaded or the list stops
+    growing.
+
+    Parameters:
+        driver (webdriver): The Selenium WebDriver instance controlling the browser.
+        number_of_results (int): Number of results announced by the page.
+        count (callable): Takes the driver and returns the number of results loaded.
+        scroll (bool): Scroll to the bottom before each click, so lazily rendered results
+            are in the page.
 
     Notes:
-        - The function waits for the "Show more" button to appear and become clickable. 
-          Once clicked, it waits for new content to load before scrolling further.
-        - If the button cannot be found for 10 consecutive attempts, the loop exits.
-        - Used to dynamically expand content-heavy pages.
+        - After each click, it waits until more results are in the page, for at most
+          PAGE_TIMEOUT seconds, instead of sleeping for a fixed time.
+        - The loop exits when the button does not appear within BUTTON_TIMEOUT seconds or a
+          click does not load any new result.
     """
-    cont = 0 # Counter to track failed attempts to find the "Show more" button
-    while True:
-        try:  
-            # Wait until the "Show more" button is present and visible
-            show_more_button = WebDriverWait(driver, 1).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "a.section__link-out[role='link']"))
-            )
+    loaded = count(driver)
+    while loaded < number_of_results:
+        if scroll:
             scroll_to_bottom(driver)
-            # Click on the "Show more" button
-            driver.execute_script("arguments[0].click();", show_more_button)
+        show_more_button = wait_until(driver, EC.element_to_be_clickable((By.CSS_SELECTOR, SHOW_MORE_SELECTOR)), BUTTON_TIMEOUT)
+        if show_more_button is None:
+            break
+        driver.execute_script("arguments[0].click();", show_more_button)
+        previous = loaded
+        loaded = wait_until(driver, lambda d: (n := count(d)) > previous and n, PAGE_TIMEOUT)
+        if not loaded:
+            print(f"No new results after {previous} of {number_of_results}.")
+            break
 
-            # Please wait a while to allow the content to load.
-            time.sleep(1)
-            scroll_to_bottom(driver)
-            cont = 0 # Reset the counter after a successful action
-        except Exception as e:
-            # If we don't find the button, we exit the loop.
-            cont += 1
-            if cont == 10:
-                break
-            print(e)
-            print("All elements were loaded or an error occurred.")
+def species_ids(driver):
+    """
+    Parameters:
+        driver (webdriver): The Selenium WebDriver instance controlling the browser.
 
-links = None
-species = set()
+    Returns:
+        set: IDs of the species linked from the page.
+    """
+    ids = set()
+    links = driver.find_elements(By.TAG_NAME, 'a')
+    for link in links:
+        href = link.get_attribute('href')
+        if href:  # Checks if href is not None
+            s = href.strip().split("/")
+            if len(s) > 3 and s[-3] == "species":
+                ids.add(int(s[-2]))
+    return ids
 
-service = Service('/snap/bin/firefox.geckodriver')  # Replace with the path to your ChromeDriver
+class PayloadCollector:
+    """
+    Parses the species IDs out of the responses captured by INTERCEPT_SCRIPT, as they
+    arrive, so the results never have to be rendered and read link by link. Only the
+    results of the search are kept (see species_ids_from_text), so the number of IDs can be
+    compared with the number of results of the search.
+    """
 
-# List of URLs containing filters for the general species list
-# Modify this variable to include your urls
-urls = []
+    def __init__(self):
+        self.payloads = []
+        self.ids = set()
+
+    def add(self, payload):
+        """
+        Parameters:
+            payload (dict): Captured response, as {"url": ..., "text": ...}.
+        """
+        self.payloads.append(payload)
+        self.ids |= species_ids_from_text(payload["text"], payload["url"])
+
+    def __call__(self, driver):
+        """
+        Moves the responses captured since the last call out of the page.
 
-for url in urls:
-    driver = webdriver.Firefox(service=service)
+        Parameters:
+            driver (webdriver): The Selenium WebDriver instance controlling the browser.
+
+        Returns:
+            int: Number of species IDs found so far.
+        """
+        for payload in driver.execute_script(DRAIN_SCRIPT):
+            self.add(payload)
+        return len(self.ids)
+
+def harvest_intercepted(driver, url, number_of_results):
+    """
+    Collects the IDs of a loaded search from the responses of the search results endpoint
+    (SEARCH_RESULTS_URL) instead of its rendered links. The results the page already loaded
+    are requested again, then the list is expanded, parsing each new response.
+
+    Parameters:
+        driver (webdriver): The Selenium WebDriver instance controlling the browser.
+        url (str): URL of the search.
+        number_of_results (int): Number of results announced by the page.
+
+    Returns:
+        set: IDs of the species found.
+    """
+    collector = PayloadCollector()
+    driver.execute_script(INTERCEPT_SCRIPT, SEARCH_RESULTS_URL.pattern)
+    driver.execute_async_script(REPLAY_SCRIPT, SEARCH_RESULTS_URL.pattern)
+    collector(driver)
+    expand_results(driver, number_of_results, collector, scroll=False)
+    collector(driver)
+    if PAYLOAD_DIR:
+        save_payloads(PAYLOAD_DIR, url, collector.payloads, number_of_results)
+    return collector.ids
+
+def harvest_offline(url):
+    """
+    Collects the IDs of a search from the payloads recorded in PAYLOAD_DIR.
+
+    Parameters:
+        url (str): URL of the search.
+
+    Returns:
+        tuple: Set of species IDs found and number of results announced by the page (None
+        if the search was not recorded).
+    """
+    recording = load_payloads(PAYLOAD_DIR, url)
+    if recording is None:
+        print(f"No recording of {url}.")
+        return set(), None
+    payloads, number_of_results = recording
+    collector = PayloadCollector()
+    for payload in payloads:
+        collector.add(payload)
+    return collector.ids, number_of_results
+
+def harvest(driver, url, limit=None):
+    """
+    Loads a saved search and collects the IDs of all its species.
+
+    Parameters:
+        driver (webdriver): The Selenium WebDriver instance controlling the browser.
+        url (str): URL of the search.
+        limit (int): If the search has more results, return without expanding it.
+
+    Returns:
+        tuple: Set of species IDs found and number of results announced by the page (None
+        if the page could not be loaded).
+    """
     driver.get(url)
-    number_of_results = 0
-    count = 0
-
-    while number_of_results == 0 and count < 10:  
-        try:   
-            time.sleep(3)
-            number_of_results = int(driver.find_element(By.CSS_SELECTOR, "h1[class='heading heading--list']").find_element(By.XPATH, ".//span").text[1:-1])
-        except: 
-            count += 1
-    if number_of_results == 0:
-        print("Unable to load page.")
-        break
-    driver.quit()
-
-    url_species = set()
-    print(number_of_results)
-    for i in range(5):
-        driver = webdriver.Firefox(service=service)
-        driver.get(url)
-        try:
-            # Change the page layout from "grid" to "list"
-            element = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "a[class='nav-page__item nav-page__item--list']"))
-            )
-            element.click()
-            time.sleep(5)     
-        except:
-            print("Unable to click on the list.")
-        
-        # Loop to scroll to the bottom of the page until the list of results can no longer be expanded
-        scrolling_loop()
-        
-        links = driver.find_elements(By.TAG_NAME, 'a')
-        # Extract and print the 'href' attributes of each link
-        for link in links:
-            href = link.get_attribute('href')
-            if href:  # Checks if href is not None
-                s = href.strip().split("/")
-                if len(s) > 3 and s[-3] == "species":
-                    url_species.add(int(s[-2]))
-        driver.quit()
+    number_of_results = result_count(driver)
+    if number_of_results is None:
+        print(f"Unable to load {url}.")
+        return set(), None
+    if number_of_results == 0 or (limit is not None and number_of_results > limit):
+        if HARVEST_MODE == "intercept" and PAYLOAD_DIR:
+            save_payloads(PAYLOAD_DIR, url, [], number_of_results) # Lets the "offline" mode follow the same splits
+        return set(), number_of_results
 
-        print(url_species)
-        if len(url_species) == number_of_results:
-            break
+    if HARVEST_MODE == "intercept":
+        return harvest_intercepted(driver, url, number_of_results), number_of_results
+
+    # Change the page layout from "grid" to "list"
+    element = wait_until(driver, EC.element_to_be_clickable((By.CSS_SELECTOR, LIST_LAYOUT_SELECTOR)), PAGE_TIMEOUT)
+    if element is None:
+        print("Unable to click on the list.")
+    else:
+        element.click()
+        wait_until(driver, loaded_results, PAGE_TIMEOUT)
+
+    # Expand the list of results until every result is loaded
+    expand_results(driver, number_of_results)
+    return species_ids(driver), number_of_results
+
+def split_search(url):
+    """
+    Splits a search into narrower sub-searches, adding the first parameter of
+    SPLIT_PARAMETERS that the URL does not use yet, with one sub-search per value.
+
+    Parameters:
+        url (str): URL of the search.
+
+    Returns:
+        list: URLs of the sub-searches, empty if every parameter is already used.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    used = {key for key, value in query}
+    for parameter, values in SPLIT_PARAMETERS:
+        if parameter not in used and values:
+            return [urlunsplit(parts._replace(query=urlencode(query + [(parameter, value)]))) for value in values]
+    return []
+
+def is_complete(url_species, number_of_results):
+    """
+    Parameters:
+        url_species (set): IDs found for a search.
+        number_of_results (int): Number of results announced by the page, None if unknown.
+
+    Returns:
+        bool: True if every result of the search was found.
+    """
+    return number_of_results is not None and len(url_species) >= number_of_results
+
+def retry_later(jobs, job):
+    """
+    Puts a URL back in the queue after RETRY_DELAY seconds, without holding a worker.
+    The URL it retries is only marked as done once it is queued again, so the queue is not
+    finished while retries are waiting.
+
+    Parameters:
+        jobs (Queue): Queue shared by the workers.
+        job (tuple): (url, attempts) to queue.
+    """
+    def requeue():
+        jobs.put(job)
+        jobs.task_done()
+    timer = Timer(RETRY_DELAY, requeue)
+    timer.daemon = True
+    timer.start()
+
+def split_species(url, found, children):
+    """
+    Parameters:
+        url (str): URL of a search.
+        found (dict): Mapping of each URL to the set of IDs found and its number of results.
+        children (dict): Mapping of each split URL to the URLs of its sub-searches.
+
+    Returns:
+        set: IDs found by the search and, recursively, by all its sub-searches.
+    """
+    url_species = set(found.get(url, (set(), None))[0])
+    for subsearch in children.get(url, []):
+        url_species |= split_species(subsearch, found, children)
+    return url_species
+
+def browser_worker(jobs, found, children, lock):
+    """
+    Takes URLs from the shared queue and harvests them with a single browser until a None
+    sentinel is received. URLs that are not fully harvested go back to the queue after
+    RETRY_DELAY seconds (see retry_later), until they have been tried ATTEMPTS times.
+    Searches with more than LOADABLE_LIMIT results, or that still miss results after the
+    last attempt, are split with split_search and their sub-searches are queued instead, to
+    be harvested in parallel by all the workers.
+    Any error of a URL, including a browser that crashed or could not be started, counts as
+    a failed attempt, so every URL taken is marked as done or retried and harvest_all never
+    waits for a URL that no worker holds. The browser is restarted for the next URL.
+
+    Parameters:
+        jobs (Queue): Queue of (url, attempts) shared by all workers.
+        found (dict): Shared mapping of each URL to the set of IDs found so far and its
+            number of results.
+        children (dict): Shared mapping of each split URL to the URLs of its sub-searches.
+        lock (Lock): Protects found and children.
+    """
+    driver = None
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            url, attempts = job
+            retried = False
+            try:
+                subsearches = split_search(url)
+                try:
+                    if driver is None:
+                        driver = new_driver()
+                    ids, number_of_results = harvest(driver, url, LOADABLE_LIMIT if subsearches else None)
+                except Exception as e: # The browser or its driver may have crashed, or the page was unexpected
+                    print(url, e)
+                    ids, number_of_results = set(), None
+                    if driver is not None:
+                        quit_driver(driver)
+                        driver = None # A new browser is started for the next URL
+                with lock:
+                    url_species, expected = found.setdefault(url, (set(), None))
+                    url_species |= ids
+                    if number_of_results is not None:
+                        expected = max(expected or 0, number_of_results)
+                    found[url] = (url_species, expected)
+                print(f"{url}: {len(url_species)} of {expected}")
+                if not is_complete(url_species, expected):
+                    too_large = expected is not None and expected > LOADABLE_LIMIT
+                    if subsearches and expected is not None and (too_large or attempts + 1 >= ATTEMPTS):
+                        print(f"Splitting {url} into {len(subsearches)} searches.")
+                        with lock:
+                            children[url] = subsearches
+                        for subsearch in subsearches:
+                            jobs.put((subsearch, 0))
+                    elif attempts + 1 < ATTEMPTS:
+                        retry_later(jobs, (url, attempts + 1))
+                        retried = True # Marked as done by retry_later
+            except Exception as e:
+                print(url, e) # Reported as unfinished by main
+            finally:
+                if not retried:
+                    jobs.task_done()
+    finally:
+        if driver is not None:
+            quit_driver(driver)
+
+def harvest_all(url_list):
+    """
+    Harvests the URLs with BROWSER_WORKERS browsers sharing a single queue, so slow, retried
+    or split URLs do not hold back the others.
+
+    Parameters:
+        url_list (list): URLs of saved searches.
+
+    Returns:
+        tuple: Mapping of each URL harvested, including sub-searches, to the set of IDs found
+        and its number of results, and mapping of each split URL to its sub-searches.
+    """
+    jobs = Queue()
+    for url in url_list:
+        jobs.put((url, 0))
+    found = {}
+    children = {}
+    lock = Lock()
+    workers = [Thread(target=browser_worker, args=(jobs, found, children, lock)) for i in range(min(BROWSER_WORKERS, len(url_list)))]
+    for worker in workers:
+        worker.start()
+    jobs.join()
+    for worker in workers:
+        jobs.put(None)
+    for worker in workers:
+        worker.join()
+    return found, children
+
+def harvest_all_offline(url_list):
+    """
+    Harvests the URLs from the recordings of PAYLOAD_DIR, following the same splits as
+    harvest_all.
+
+    Parameters:
+        url_list (list): URLs of saved searches.
+
+    Returns:
+        tuple: Same as harvest_all.
+    """
+    found = {}
+    children = {}
+    pending = list(url_list)
+    while pending:
+        url = pending.pop()
+        found[url] = harvest_offline(url)
+        subsearches = split_search(url)
+        if found[url][1] is not None and not is_complete(*found[url]) and subsearches:
+            children[url] = subsearches
+            pending.extend(subsearches)
+    return found, children
 
-        time.sleep(60)
-    
-    species = species.union(url_species)
-    if len(url_species) != number_of_results:
-        with open(UNFINISHED_URL_FILE, "a+") as f:
-            f.write(f"{url} needs to be split, couldn't get all ids.\n")
+def main():
+    if HARVEST_MODE == "offline":
+        found, children = harvest_all_offline(urls)
+    else:
+        found, children = harvest_all(urls)
+    species = set()
+    for url, (url_species, number_of_results) in found.items():
+        species = species.union(url_species)
+        if url in children:
+            # The sub-searches must find together every result announced by the search
+            url_species = split_species(url, found, children)
+            if not is_complete(url_species, number_of_results):
+                with open(UNFINISHED_URL_FILE, "a+") as f:
+                    f.write(f"{url} was split, but its searches only got {len(url_species)} of {number_of_results} ids.\n")
+        elif not is_complete(url_species, number_of_results):
+            with open(UNFINISHED_URL_FILE, "a+") as f:
+                if number_of_results is None:
+                    f.write(f"{url} couldn't be loaded.\n")
+                else:
+                    f.write(f"{url} needs to be split, couldn't get all ids.\n")
 
-with open(ID_LIST_FILE, "w") as file:
-    for i in species:
-        file.write(f"{i}\n")
+    with open(ID_LIST_FILE, "w") as file:
+        for i in species:
+            file.write(f"{i}\n")
 
-    
-        
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+from threading import Lock
+from time import monotonic, sleep
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+
+class TokenBucket:
+    """
+    Token bucket shared by every request of a crawl.
+
+    Tokens are refilled continuously at `rate` per second, up to `capacity`. Every request
+    reserves one token before being sent, so all workers together never go over the quota
+    of the API token. When the API answers with a throttling status, `pause` stops the whole
+    bucket at once instead of letting each worker sleep and probe on its own.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Parameters:
+            rate (float): Number of tokens added per second.
+            capacity (int): Maximum number of tokens that can be accumulated (burst size).
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+        self.paused_until = 0.0
+        self.lock = Lock()
+
+    def refill(self, now: float) -> None:
+        """
+        Adds the tokens generated since the last update. Must be called with the lock held.
+
+        Parameters:
+            now (float): Current value of time.monotonic().
+        """
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self) -> float:
+        """
+        Takes one token from the bucket.
+
+        Returns:
+            float: Number of seconds the caller must wait before sending its request.
+        """
+        with self.lock:
+            now = monotonic()
+            self.refill(now)
+            self.tokens -= 1
+            delay = self.updated - now
+            if self.tokens < 0:
+                delay += -self.tokens / self.rate
+            return delay
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stops handing out tokens for the given number of seconds.
+
+        Overlapping pauses are merged, so a burst of throttled responses only stops the
+        bucket once.
+
+        Parameters:
+            seconds (float): Time to wait before requests can be sent again.
+        """
+        with self.lock:
+            now = monotonic()
+            self.refill(now)
+            resume = now + seconds
+            if resume > self.paused_until:
+                self.paused_until = resume
+                self.tokens = min(self.tokens, 0)
+                self.updated = max(self.updated, resume)
+
+    def remaining_pause(self) -> float:
+        """
+        Returns:
+            float: Seconds until the current pause ends, or 0 if the bucket is not paused.
+        """
+        return max(0.0, self.paused_until - monotonic())
+
+    def acquire(self) -> None:
+        """
+        Blocks the calling thread until a request may be sent.
+        """
+        sleep(self.reserve())
+        while self.remaining_pause() > 0:
+            sleep(self.remaining_pause())
+
+    async def acquire_async(self) -> None:
+        """
+        Suspends the calling coroutine until a request may be sent.
+        """
+        await asyncio.sleep(self.reserve())
+        while self.remaining_pause() > 0:
+            await asyncio.sleep(self.remaining_pause())
+
+def retry_after(headers, default: float) -> float:
+    """
+    Reads the number of seconds to wait from a Retry-After header.
+
+    Parameters:
+        headers (Mapping): Response headers.
+        default (float): Value used when the header is missing or cannot be parsed.
+
+    Returns:
+        float: Seconds to wait before the next request.
+    """
+    value = headers.get("Retry-After")
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+        return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase/multiplicative-decrease limit on the number of in-flight requests.
+
+    Every healthy response raises the limit by 1/limit, i.e. by about one request per round
+    trip of the whole window. A throttled or failed response, or a smoothed latency far above
+    the best observed, divides it by `decrease`, at most once per round trip, since responses
+    to requests sent before the last decrease say nothing about the new limit. The crawl thus
+    settles around the highest concurrency the API currently sustains.
+
+    Must be created inside the running event loop.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, decrease: float = 2.0, latency_tolerance: float = 3.0):
+        """
+        Parameters:
+            initial (int): Starting number of in-flight requests.
+            minimum (int): Lowest limit.
+            maximum (int): Highest limit.
+            decrease (float): Divisor applied to the limit on congestion.
+            latency_tolerance (float): Latency, as a multiple of the baseline, considered a
+                sign of congestion.
+        """
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.smoothed = None
+        self.baseline = None
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.condition = asyncio.Condition()
+
+    @property
+    def concurrency(self) -> int:
+        """
+        Returns:
+            int: Current maximum number of in-flight requests.
+        """
+        return int(self.limit)
+
+    async def acquire(self) -> None:
+        """
+        Waits until a request may be sent without going over the limit.
+        """
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, started: float, congested: bool) -> None:
+        """
+        Frees the slot of a finished request and adjusts the limit.
+
+        Parameters:
+            started (float): Value of time.monotonic() when the request was sent.
+            congested (bool): True if the response shows the API is overloaded (429, 5xx or
+                no response).
+        """
+        now = monotonic()
+        latency = now - started
+        async with self.condition:
+            self.in_flight -= 1
+            if not congested:
+                self.smoothed = latency if self.smoothed is None else 0.9 * self.smoothed + 0.1 * latency
+                self.baseline = self.smoothed if self.baseline is None else min(self.baseline * 1.001, self.smoothed)
+                congested = self.smoothed > self.latency_tolerance * self.baseline
+            if congested:
+                if started >= self.last_decrease:
+                    self.limit = max(self.minimum, self.limit / self.decrease)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
@@ -0,0 +1,97 @@
+from hashlib import sha1
+from threading import get_ident
+import gzip
+import os
+
+class ResponseCache:
+    """
+    Compressed on-disk cache of raw API responses.
+
+    Each response is stored as a gzip file whose name is the SHA-1 of its endpoint and key,
+    under a directory per endpoint, e.g. cache/assessment/3f/3f2a....json.gz. Writes go to a
+    temporary file that is then renamed, so an interrupted crawl never leaves a truncated
+    entry behind.
+    """
+
+    def __init__(self, directory: str, compression_level: int = 6):
+        """
+        Parameters:
+            directory (str): Root directory of the cache, created if it does not exist.
+            compression_level (int): gzip compression level, from 1 (fastest) to 9 (smallest).
+        """
+        self.directory = directory
+        self.compression_level = compression_level
+
+    def path(self, endpoint: str, key) -> str:
+        """
+        Parameters:
+            endpoint (str): Name of the API endpoint, e.g. "taxa" or "assessment".
+            key (int | str): ID requested from the endpoint.
+
+        Returns:
+            str: Path of the cache entry.
+        """
+        digest = sha1(f"{endpoint}/{key}".encode()).hexdigest()
+        return os.path.join(self.directory, endpoint, digest[:2], f"{digest}.json.gz")
+
+    def get(self, endpoint: str, key):
+        """
+        Parameters:
+            endpoint (str): Name of the API endpoint.
+            key (int | str): ID requested from the endpoint.
+
+        Returns:
+            bytes | None: Raw response body, or None if it is not cached or the entry is
+            corrupt, so it is requested again.
+        """
+        try:
+            with gzip.open(self.path(endpoint, key), "rb") as file:
+                return file.read()
+        except (OSError, EOFError): # Missing, or not a complete gzip file
+            return None
+
+    def put(self, endpoint: str, key, body: bytes) -> None:
+        """
+        Stores a raw response body.
+
+        Parameters:
+            endpoint (str): Name of the API endpoint.
+            key (int | str): ID requested from the endpoint.
+            body (bytes): Raw response body.
+        """
+        path = self.path(endpoint, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(gzip.compress(body, self.compression_level))
+        os.replace(temporary, path)
+
+    def paths(self, endpoint: str):
+        """
+        Lists every cached response of an endpoint.
+
+        Parameters:
+            endpoint (str): Name of the API endpoint.
+
+        Yields:
+            str: Path of each cache entry, to be read with read_entry.
+        """
+        root = os.path.join(self.directory, endpoint)
+        if not os.path.isdir(root):
+            return
+        for prefix in sorted(os.listdir(root)):
+            with os.scandir(os.path.join(root, prefix)) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json.gz"):
+                        yield entry.path
+
+def read_entry(path: str) -> bytes:
+    """
+    Parameters:
+        path (str): Path of a cache entry.
+
+    Returns:
+        bytes: Raw response body stored in the entry.
+    """
+    with gzip.open(path, "rb") as file:
+        return file.read()
@@ -0,0 +1,119 @@
+from hashlib import sha1
+from json import loads, dumps
+import gzip
+import re
+import os
+
+SEARCH_RESULTS_URL = re.compile(r"/api/v\d+/[^?#]*search") # URLs of the responses holding the results of a search. Other responses of the page are ignored
+RESULT_LIST_KEYS = ("results", "data", "items", "species", "assessments") # Keys of the list of results in a response, possibly nested
+SPECIES_ID_KEYS = ("sis_id", "sisId", "sis_taxon_id") # Keys holding the species ID of a result, in the result or in its "taxon"
+
+def is_search_results(url: str) -> bool:
+    """
+    Parameters:
+        url (str): URL of a response captured from the search page.
+
+    Returns:
+        bool: True if the response holds results of the search, according to SEARCH_RESULTS_URL.
+    """
+    return bool(url) and SEARCH_RESULTS_URL.search(url) is not None
+
+def search_results(obj) -> list:
+    """
+    Parameters:
+        obj: Decoded JSON of a response of the search results endpoint.
+
+    Returns:
+        list: The results: the payload itself if it is a list, otherwise the first list found
+        under the keys of RESULT_LIST_KEYS, looking into nested objects under the same keys.
+    """
+    if isinstance(obj, list):
+        return obj
+    if isinstance(obj, dict):
+        for key in RESULT_LIST_KEYS:
+            results = search_results(obj.get(key))
+            if results:
+                return results
+    return []
+
+def result_species_id(result):
+    """
+    Parameters:
+        result: One result of a search.
+
+    Returns:
+        int | None: Species ID of the result, read from the keys of SPECIES_ID_KEYS of the
+        result or of its "taxon", None if it has none.
+    """
+    if not isinstance(result, dict):
+        return None
+    for item in (result, result.get("taxon")):
+        if isinstance(item, dict):
+            for key in SPECIES_ID_KEYS:
+                value = item.get(key)
+                if isinstance(value, (int, str)) and type(value) is not bool and str(value).isdigit():
+                    return int(value)
+    return None
+
+def species_ids_from_text(text: str, url: str) -> set:
+    """
+    Parses a response captured from the search page. Only responses of the search results
+    endpoint are read, and only the species of their results, so IDs of other species shown
+    by the page (featured or related species, facets, higher taxa) are not counted as results.
+
+    Parameters:
+        text (str): Body of the response.
+        url (str): URL of the response.
+
+    Returns:
+        set: Species IDs of the results, as integers.
+    """
+    if not is_search_results(url):
+        return set()
+    try:
+        results = search_results(loads(text))
+    except ValueError:
+        return set()
+    return {sis_id for sis_id in map(result_species_id, results) if sis_id is not None}
+
+def payload_path(directory: str, url: str) -> str:
+    """
+    Parameters:
+        directory (str): Directory of the recorded payloads.
+        url (str): URL of the search.
+
+    Returns:
+        str: Path of the recording of the search.
+    """
+    return os.path.join(directory, f"{sha1(url.encode()).hexdigest()}.json.gz")
+
+def save_payloads(directory: str, url: str, payloads: list, number_of_results: int) -> None:
+    """
+    Records the payloads captured for a search, so it can be harvested again offline.
+
+    Parameters:
+        directory (str): Directory of the recorded payloads, created if it does not exist.
+        url (str): URL of the search.
+        payloads (list): Captured responses, as {"url": ..., "text": ...} objects.
+        number_of_results (int): Number of results announced by the page.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with gzip.open(payload_path(directory, url), "wt", encoding="utf-8") as file:
+        file.write(dumps({"url": url, "number_of_results": number_of_results, "payloads": payloads}))
+
+def load_payloads(directory: str, url: str):
+    """
+    Parameters:
+        directory (str): Directory of the recorded payloads.
+        url (str): URL of the search.
+
+    Returns:
+        tuple: Recorded responses and number of results of the search, or None if the search
+        was not recorded.
+    """
+    try:
+        with gzip.open(payload_path(directory, url), "rt", encoding="utf-8") as file:
+            recording = loads(file.read())
+    except FileNotFoundError:
+        return None
+    return recording["payloads"], recording["number_of_results"]
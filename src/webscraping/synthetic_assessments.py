@@ -0,0 +1,64 @@
+import random
+from mock_api import MockConfig, assessment_ids, assessment_payload
+from assessment_record import AssessmentRecord
+from ndjson_io import open_ndjson
+
+OUTPUT_FILE = "assessments.json.gz" # Compressed according to the extension (.gz, .zst or .json)
+ASSESSMENTS = 100000 # Assessments to generate. The last species is completed, so a few more may be written
+FIRST_SPECIES_ID = 10000
+MISSING_CATEGORY_RATE = 0.02 # Fraction of assessments without a category, which clear_assessments.py drops
+SEED = 0 # Seed of the missing categories. The assessments of each species only depend on its ID
+
+def synthetic_assessments(assessments: int, first_species_id: int = FIRST_SPECIES_ID,
+                          missing_category_rate: float = MISSING_CATEGORY_RATE, seed: int = SEED):
+    """
+    Generates records as pull-api.py writes them, from the synthetic assessments of the mock
+    API: a skewed number of assessments per species, a few countries and uses for most
+    species and many for some, and legacy category codes in assessments before 2001.
+
+    Parameters:
+        assessments (int): Number of assessments to generate. The last species is
+            completed, so a few more may be generated.
+        first_species_id (int): ID of the first species. IDs are consecutive.
+        missing_category_rate (float): Fraction of assessments without a category.
+        seed (int): Seed of the missing categories.
+
+    Yields:
+        AssessmentRecord: Each record, species by species.
+    """
+    config = MockConfig()
+    rng = random.Random(seed)
+    count = 0
+    sis_id = first_species_id
+    while count < assessments:
+        for assessment_id in assessment_ids(sis_id, config):
+            record = AssessmentRecord.from_response(assessment_payload(assessment_id))
+            if rng.random() < missing_category_rate:
+                record.red_list_category = None
+            yield record
+            count += 1
+        sis_id += 1
+
+def write_assessments(path: str, assessments: int, **options) -> int:
+    """
+    Writes synthetic records to a file, one JSON object per line.
+
+    Parameters:
+        path (str): Output file, compressed according to its extension.
+        assessments (int): Number of assessments to generate.
+        **options: Other arguments of synthetic_assessments.
+
+    Returns:
+        int: Number of records written.
+    """
+    records = 0
+    with open_ndjson(path, "w") as file:
+        for record in synthetic_assessments(assessments, **options):
+            file.write(record.to_json())
+            file.write("\n")
+            records += 1
+    return records
+
+if __name__ == '__main__':
+    records = write_assessments(OUTPUT_FILE, ASSESSMENTS)
+    print(f"{records} assessments written to {OUTPUT_FILE}")
@@ -0,0 +1,38 @@
+import unittest
+from json import dumps
+
+from assessment_record import AssessmentRecord, MalformedRecord, decode
+
+# A record as written by pull-api.py before the records had an assessment ID
+BASELINE_RECORD = {"year_published": "2021",
+                   "taxon": {"scientific_name": "Panthera leo", "sis_id": 15951, "kingdom_name": "ANIMALIA",
+                             "phylum_name": "CHORDATA", "class_name": "MAMMALIA", "order_name": "CARNIVORA",
+                             "family_name": "FELIDAE"},
+                   "locations": [{"country": "Kenya", "presence": "Extant"}, {"country": "Chad", "presence": None}],
+                   "use_and_trade": ["Sport hunting/specimen collecting"],
+                   "threats": ["Hunting & trapping terrestrial animals"],
+                   "red_list_category": "VU"}
+
+class BaselineRecordTest(unittest.TestCase):
+    def test_decode(self):
+        self.assertEqual(decode(dumps(BASELINE_RECORD)), BASELINE_RECORD)
+
+    def test_from_json(self):
+        record = AssessmentRecord.from_json(dumps(BASELINE_RECORD).encode())
+        self.assertIsNone(record.assessment_id)
+        self.assertEqual(record.taxon.sis_id, 15951)
+        self.assertEqual([(i.country, i.presence) for i in record.locations], [("Kenya", "Extant"), ("Chad", None)])
+        self.assertEqual(record.to_dict(), {"assessment_id": None, **BASELINE_RECORD})
+
+    def test_row_from_json(self):
+        row = AssessmentRecord.row_from_json(dumps(BASELINE_RECORD))
+        self.assertEqual(row[:6], (None, "2021", BASELINE_RECORD["locations"], BASELINE_RECORD["use_and_trade"],
+                                   BASELINE_RECORD["threats"], "VU"))
+        self.assertEqual(row[6:8], ("Panthera leo", 15951))
+
+    def test_invalid_assessment_id(self):
+        with self.assertRaises(MalformedRecord):
+            decode(dumps({"assessment_id": "123", **BASELINE_RECORD}))
+
+if __name__ == "__main__":
+    unittest.main()
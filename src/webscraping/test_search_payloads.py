@@ -0,0 +1,64 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from json import dumps
+
+from search_payloads import save_payloads, species_ids_from_text
+
+URL = "https://www.iucnredlist.org/search/list?query=panthera&searchType=species"
+RESULTS_URL = "https://www.iucnredlist.org/api/v4/taxa/search?query=panthera&page={}"
+
+# Responses recorded for URL: two pages of results, and other responses of the page that also hold species IDs
+PAYLOADS = [
+    {"url": RESULTS_URL.format(1),
+     "text": dumps({"data": {"results": [{"sis_id": 15951, "taxon": {"sis_id": 15951, "genus_taxonId": 15940}},
+                                         {"taxon": {"sisId": "15953"}}],
+                             "facets": [{"taxonId": 1}]}})},
+    {"url": RESULTS_URL.format(2), "text": dumps({"results": [{"sis_taxon_id": 15954}]})},
+    {"url": "https://www.iucnredlist.org/api/v4/featured", "text": dumps({"results": [{"sis_id": 22823}]})},
+    {"url": RESULTS_URL.format(3), "text": "<html>Service unavailable</html>"},
+]
+
+class SpeciesIdsTest(unittest.TestCase):
+    def test_results(self):
+        self.assertEqual(species_ids_from_text(PAYLOADS[0]["text"], PAYLOADS[0]["url"]), {15951, 15953})
+        self.assertEqual(species_ids_from_text(PAYLOADS[1]["text"], PAYLOADS[1]["url"]), {15954})
+
+    def test_other_responses(self):
+        self.assertEqual(species_ids_from_text(PAYLOADS[2]["text"], PAYLOADS[2]["url"]), set())
+        self.assertEqual(species_ids_from_text(PAYLOADS[3]["text"], PAYLOADS[3]["url"]), set())
+
+@unittest.skipUnless(importlib.util.find_spec("selenium"), "pull-website.py requires selenium")
+class OfflineHarvestTest(unittest.TestCase):
+    def setUp(self):
+        spec = importlib.util.spec_from_file_location("pull_website", os.path.join(os.path.dirname(__file__), "pull-website.py"))
+        self.pull_website = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.pull_website)
+        self.directory = tempfile.TemporaryDirectory()
+        self.pull_website.PAYLOAD_DIR = self.directory.name
+        self.pull_website.SPLIT_PARAMETERS = [("redListCategory", ["vu", "en"])]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_complete(self):
+        save_payloads(self.directory.name, URL, PAYLOADS, 3)
+        found, children = self.pull_website.harvest_all_offline([URL])
+        self.assertEqual(found, {URL: ({15951, 15953, 15954}, 3)})
+        self.assertEqual(children, {})
+
+    def test_incomplete(self):
+        # The featured species must not make up for the missing result, so the search is split
+        save_payloads(self.directory.name, URL, PAYLOADS, 4)
+        subsearches = self.pull_website.split_search(URL)
+        save_payloads(self.directory.name, subsearches[0], PAYLOADS[:1], 2)
+        save_payloads(self.directory.name, subsearches[1], PAYLOADS[1:2], 2)
+        found, children = self.pull_website.harvest_all_offline([URL])
+        self.assertEqual(children, {URL: subsearches})
+        self.assertEqual(found[subsearches[0]], ({15951, 15953}, 2))
+        self.assertEqual(found[subsearches[1]], ({15954}, 2))
+        self.assertEqual(self.pull_website.split_species(URL, found, children), {15951, 15953, 15954})
+
+if __name__ == "__main__":
+    unittest.main()